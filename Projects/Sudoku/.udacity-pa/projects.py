@@ -7,7 +7,7 @@ nanodegree = 'nd889'
 projects = ['sudoku']
 
 def submit(args):
-  filenames = ['solution.py', 'README.md']
+  filenames = ['solution.py', 'board.py', 'topology.py', 'recorder.py', 'dlx.py', 'cache.py', 'stats.py', 'parallel.py', 'generator.py', 'budget.py', 'README.md']
 
   udacity.submit(nanodegree, projects[0], filenames, 
                  environment = args.environment,
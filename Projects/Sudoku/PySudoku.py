@@ -1,58 +1,144 @@
 import sys, os, random, pygame
-sys.path.append(os.path.join("objects"))
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(here, "objects"))
 import SudokuSquare
 from GameResources import *
 
 digits = '123456789'
 rows = 'ABCDEFGHI'
 
+# The boxes in reading order, the order of the squares
+boxes = [row + col for row in rows for col in digits]
+
+size = width, height = 700, 700
+background_path = os.path.join(here, "images", "sudoku-board-bare.jpg")
+
+
+def square_origin(x, y):
+    """The top left corner of the square in column x and row y of the board image."""
+    startX = (x * 57) + (38, 99, 159)[x // 3]
+    startY = (y * 57) + (35, 100, 165)[y // 3]
+    return startX, startY
 
-def play(values_list):
-    pygame.init()
 
+def square_number(value):
+    """The digit a box shows, None while it has several candidates."""
+    if len(value) != 1 or value == '.':
+        return None
+    return int(value)
 
-    size = width, height = 700, 700
+
+def setup_board(background=background_path):
+    """
+    Draw the empty board on the screen.
+
+    Returns the background image and the 81 squares, in the order of boxes.
+    """
     screen = pygame.display.set_mode(size)
+    background_image = pygame.image.load(background).convert()
 
-    background_image = pygame.image.load("./images/sudoku-board-bare.jpg").convert()
+    theSquares = [SudokuSquare.SudokuSquare(None, *square_origin(x, y), "N", x, y)
+                  for y in range(9) for x in range(9)]
 
-    clock = pygame.time.Clock()
+    screen.blit(background_image, (0, 0))
+    for square in theSquares:
+        square.draw()
 
-    # The puzzleNumber sets a seed so either generate
-    # a random number to fill in here or accept user
-    # input for a duplicatable puzzle.
-
-    for values in values_list:
-        pygame.event.pump()
-        theSquares = []
-        initXLoc = 0
-        initYLoc = 0
-        startX, startY, editable, number = 0, 0, "N", 0
-        for y in range(9):
-            for x in range(9):
-                if x in (0, 1, 2):  startX = (x * 57) + 38
-                if x in (3, 4, 5):  startX = (x * 57) + 99
-                if x in (6, 7, 8):  startX = (x * 57) + 159
-
-                if y in (0, 1, 2):  startY = (y * 57) + 35
-                if y in (3, 4, 5):  startY = (y * 57) + 100
-                if y in (6, 7, 8):  startY = (y * 57) + 165
-                col = digits[x]
-                row = rows[y]
-                string_number = values[row + col]
-                if len(string_number) > 1 or string_number == '' or string_number == '.':
-                    number = None
-                else:
-                    number = int(string_number)
-                theSquares.append(SudokuSquare.SudokuSquare(number, startX, startY, editable, x, y))
+    return background_image, theSquares
+
+
+def draw_frame(background_image, theSquares, values):
+    """
+    Show the box values, given in the order of boxes, e.g. a grid string.
+
+    Only the squares whose digit changed are redrawn, returns their rects.
+    """
+    dirty = []
+    for value, square in zip(values, theSquares):
+        if square.show(square_number(value)):
+            dirty.append(square.draw(background_image))
+    return dirty
+
+
+def render_frames(frames, background=background_path):
+    """
+    Render frames without a window, with the dummy SDL video driver.
+
+    frames are box values in the order of boxes, e.g. grid strings. Returns a
+    generator of the screen Surface after every frame, the same Surface each time.
+    """
+    driver = os.environ.get("SDL_VIDEODRIVER")
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    try:
+        pygame.display.init()
+        pygame.font.init()
+        background_image, theSquares = setup_board(background)
+        screen = pygame.display.get_surface()
 
-        screen.blit(background_image, (0, 0))
-        for num in theSquares:
-            num.draw()
+        for values in frames:
+            draw_frame(background_image, theSquares, values)
+            yield screen
+    finally:
+        pygame.display.quit()
+        if driver is None:
+            del os.environ["SDL_VIDEODRIVER"]
+        else:
+            os.environ["SDL_VIDEODRIVER"] = driver
 
-        pygame.display.flip()
-        pygame.display.update()
-        clock.tick(5)
+
+def seek(key, index, count, next_backtrack=None):
+    """
+    The frame a key moves to, or None for keys that do not move.
+
+    Left and right step, page up and down move a tenth of the replay, home and end
+    and the digits 0 to 9 jump to the start, the end and that many tenths of the
+    replay, b jumps past the next backtrack if next_backtrack(index) can find it.
+    """
+    tenth = max(1, count // 10)
+    if key == pygame.K_RIGHT:
+        index += 1
+    elif key == pygame.K_LEFT:
+        index -= 1
+    elif key == pygame.K_PAGEDOWN:
+        index += tenth
+    elif key == pygame.K_PAGEUP:
+        index -= tenth
+    elif key == pygame.K_HOME:
+        index = 0
+    elif key == pygame.K_END:
+        index = count - 1
+    elif pygame.K_0 <= key <= pygame.K_9:
+        index = (key - pygame.K_0) * count // 10
+    elif key == pygame.K_b and next_backtrack is not None:
+        index = next_backtrack(index)
+        if index is None:
+            return None
+    else:
+        return None
+    return min(max(index, 0), count - 1)
+
+
+def play(values_list, fps=5):
+    """
+    Replay a sequence of sudokus in dictionary form in a window.
+
+    The font, the square images and the board are rendered once, and every frame
+    only redraws the squares whose digit changed. Frames are fetched by index as
+    they are shown, so a visualize.Replay never holds more than one. Space pauses
+    and resumes, the other keys move through the replay and pause it, see seek().
+    """
+    if not hasattr(values_list, '__getitem__'):
+        values_list = list(values_list)
+    count = len(values_list)
+    next_backtrack = getattr(values_list, 'next_backtrack', None)
+
+    pygame.init()
+
+    background_image, theSquares = setup_board()
+    pygame.display.flip()
+
+    clock = pygame.time.Clock()
+    index, shown, playing = 0, None, True
 
     # leave game showing until closed by user
     while True:
@@ -60,6 +146,26 @@ def play(values_list):
             if event.type == pygame.QUIT:
                 pygame.quit()
                 quit()
+            elif event.type == pygame.KEYDOWN and count:
+                if event.key == pygame.K_SPACE:
+                    playing = not playing
+                else:
+                    moved = seek(event.key, index, count, next_backtrack)
+                    if moved is not None:
+                        index, playing = moved, False
+
+        if count and index != shown:
+            values = values_list[index]
+            dirty = draw_frame(background_image, theSquares, [values[box] for box in boxes])
+            if dirty:
+                pygame.display.update(dirty)
+            shown = index
+
+        if playing and index + 1 < count:
+            index += 1
+            clock.tick(fps)
+        else:
+            clock.tick(30)
 
 if __name__ == "__main__":
     main()
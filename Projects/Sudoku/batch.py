@@ -0,0 +1,225 @@
+import functools
+
+import numpy as np
+
+import board
+from topology import CLASSIC, DIAGONAL
+
+
+#####################################################################################
+# Batch representation
+#
+# N puzzles are held as an (N, 81, 9) boolean tensor where candidates[n, box, d] tells
+# whether digit d + 1 is still possible in the box of puzzle n. Solutions are returned
+# as an (N, 81) uint8 array of digits, with all-zero rows for puzzles without solution.
+
+
+def grids_to_tensor(grids):
+    """
+        Convert grids in string form into a candidates tensor.
+        Args:
+            grids(list) - Grids in string form, see solution.grid_values().
+        Returns:
+            An (N, 81, 9) boolean array of candidates.
+    """
+
+    if any(len(grid) != 81 for grid in grids):
+        raise ValueError("The length of every grid must be 81")
+
+    codes = np.array([list(grid) for grid in grids], dtype='U1').reshape(-1, 81)
+
+    given = np.char.isdigit(codes) & (codes != '0')
+    return digits_to_tensor(np.where(given, codes, '0').astype(np.uint8))
+
+
+def digits_to_tensor(digits):
+    """
+        Convert arrays of digits into a candidates tensor.
+        Args:
+            digits(array) - An (N, 81) array of digits, 0 for empty boxes.
+        Returns:
+            An (N, 81, 9) boolean array of candidates.
+    """
+
+    given = digits > 0
+
+    candidates = np.ones(digits.shape + (9,), dtype=bool)
+    candidates[given] = np.arange(1, 10) == digits[given][:, None]
+
+    return candidates
+
+
+def tensor_to_grids(solutions):
+    """
+        Convert an array of solved digits back into grids in string form.
+        Args:
+            solutions(array) - An (N, 81) array of digits, 0 for unknown boxes.
+        Returns:
+            A list of grids in string form, '.' for unknown boxes.
+    """
+
+    chars = np.array(list('.123456789'))
+    return [''.join(row) for row in chars[solutions]]
+
+
+@functools.lru_cache(maxsize=None)
+def _matrices(topology):
+    """
+        Build the peer and unit incidence matrices of a topology.
+        Args:
+            topology(Topology) - The unit and peer tables of the sudoku variant.
+        Returns:
+            The (81, 81) peer matrix and the (units, 81) unit membership matrix, as float32.
+    """
+
+    size = len(topology.boxes)
+
+    peers = np.zeros((size, size), dtype=np.float32)
+    for cell, cell_peers in enumerate(topology.cell_peers):
+        peers[cell, list(cell_peers)] = 1
+
+    units = np.zeros((len(topology.unit_cells), size), dtype=np.float32)
+    for u, unit in enumerate(topology.unit_cells):
+        units[u, list(unit)] = 1
+
+    return peers, units
+
+
+def _by_cell(tensor, matrix):
+    """
+        Multiply a (boxes, N, 9) float tensor by a box matrix as a single BLAS call.
+        Args:
+            tensor(array) - The tensor in box-major layout.
+            matrix(array) - A (rows, boxes) matrix.
+        Returns:
+            The (rows, N, 9) product.
+    """
+
+    boxes, n, d = tensor.shape
+    return (matrix @ tensor.reshape(boxes, n * d)).reshape(-1, n, d)
+
+
+def reduce_batch(candidates, topology):
+    """
+        Run elimination and hidden singles over every puzzle of a batch until nothing changes.
+            Each pass handles the puzzles that are still changing all at once, so the Python
+            overhead is paid per pass instead of per puzzle and per box.
+        Args:
+            candidates(array) - An (N, 81, 9) boolean array of candidates, updated in place.
+            topology(Topology) - The unit and peer tables of the puzzles.
+        Returns:
+            An (N,) boolean array that is True for the puzzles found to be infeasible.
+    """
+
+    peers, units = _matrices(topology)
+
+    dead = np.zeros(len(candidates), dtype=bool)
+    active = np.arange(len(candidates))
+
+    while len(active):
+
+        # Work in box-major layout so each step is one matrix product over the whole batch
+        cand = candidates[active].transpose(1, 0, 2)
+        before = cand.copy()
+
+        # Eliminate
+        solved = cand & (cand.sum(axis=2) == 1)[:, :, None]
+        cand &= _by_cell(solved.astype(np.float32), peers) == 0
+
+        # Only choice
+        counts = _by_cell(cand.astype(np.float32), units)
+        single = _by_cell((counts == 1).astype(np.float32), units.T) > 0
+        hidden = cand & single
+        cand = np.where(hidden.any(axis=2)[:, :, None], hidden, cand)
+
+        failed = (cand.sum(axis=2) == 0).any(axis=0) | (counts == 0).any(axis=(0, 2))
+        changed = (cand != before).any(axis=(0, 2))
+
+        candidates[active] = cand.transpose(1, 0, 2)
+        dead[active[failed]] = True
+        active = active[changed & ~failed]
+
+    return dead
+
+
+def solve_tensor(candidates, topology):
+    """
+        Solve a batch of puzzles of one sudoku variant.
+            Propagation runs vectorized over the whole batch, and only the puzzles
+            that still need branching are handed to the backtracking board.search().
+        Args:
+            candidates(array) - An (N, 81, 9) boolean array of candidates.
+            topology(Topology) - The unit and peer tables of the puzzles.
+        Returns:
+            An (N, 81) uint8 array of digits, with all-zero rows for puzzles without solution.
+    """
+
+    candidates = candidates.copy()
+    dead = reduce_batch(candidates, topology)
+
+    solutions = np.zeros(candidates.shape[:2], dtype=np.uint8)
+
+    solved = ~dead & (candidates.sum(axis=2) == 1).all(axis=1)
+    solutions[solved] = candidates[solved].argmax(axis=2) + 1
+
+    weights = 1 << np.arange(9)
+    for n in np.flatnonzero(~dead & ~solved):
+        masks = (candidates[n] * weights).sum(axis=1)
+        result = board.search(board.Board(topology, masks.tolist()))
+        if result:
+            solutions[n] = [m.bit_length() for m in result.cells]
+
+    return solutions
+
+
+def solve_batch(grids, topology=None, chunk_size=4096):
+    """
+        Find the solutions to many Sudoku grids at once.
+            Without a topology it follows solution.solve(): puzzles are solved as diagonal sudokus
+            first, and the ones without a diagonal solution are solved again as classic sudokus.
+            Grids are converted and solved chunk_size at a time, so the float temporaries of
+            reduce_batch() stay the same size however many grids there are.
+        Args:
+            grids(list) - Grids in string form, see solution.grid_values().
+            topology(Topology) - Optional topology to solve all the puzzles with.
+            chunk_size(int) - The number of puzzles solved at once.
+        Returns:
+            An (N, 81) uint8 array of digits, with all-zero rows for puzzles without solution.
+    """
+
+    solutions = np.zeros((len(grids), 81), dtype=np.uint8)
+    for start in range(0, len(grids), chunk_size):
+        solutions[start:start + chunk_size] = solve_candidates(grids_to_tensor(grids[start:start + chunk_size]),
+                                                               topology, chunk_size)
+
+    return solutions
+
+
+def solve_candidates(candidates, topology=None, chunk_size=4096):
+    """
+        Find the solutions to a batch of puzzles in tensor form, see solve_batch().
+        Args:
+            candidates(array) - An (N, 81, 9) boolean array of candidates.
+            topology(Topology) - Optional topology to solve all the puzzles with.
+            chunk_size(int) - The number of puzzles solved at once.
+        Returns:
+            An (N, 81) uint8 array of digits, with all-zero rows for puzzles without solution.
+    """
+
+    if len(candidates) > chunk_size:
+        solutions = np.zeros(candidates.shape[:2], dtype=np.uint8)
+        for start in range(0, len(candidates), chunk_size):
+            solutions[start:start + chunk_size] = solve_candidates(candidates[start:start + chunk_size], topology,
+                                                                   chunk_size)
+        return solutions
+
+    if topology is not None:
+        return solve_tensor(candidates, topology)
+
+    solutions = solve_tensor(candidates, DIAGONAL)
+
+    missing = np.flatnonzero(~solutions.any(axis=1))
+    if len(missing):
+        solutions[missing] = solve_tensor(candidates[missing], CLASSIC)
+
+    return solutions
@@ -0,0 +1,34 @@
+import batch
+import solution
+import unittest
+
+
+class TestSolveBatch(unittest.TestCase):
+    grids = [
+        '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3',
+        '..3.2.6..9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3..',
+        '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......',
+        '33...............................................................................',
+    ]
+
+    def test_matches_solve(self):
+        solved = batch.tensor_to_grids(batch.solve_batch(self.grids))
+        for grid, row in zip(self.grids[:3], solved):
+            values = solution.solve(grid)
+            self.assertEqual(row, ''.join(values[box] for box in solution.boxes))
+
+    def test_unsolvable_is_zero(self):
+        solutions = batch.solve_batch(self.grids)
+        self.assertFalse(solutions[3].any())
+
+    def test_chunks(self):
+        solutions = batch.solve_batch(self.grids)
+        self.assertTrue((batch.solve_batch(self.grids, chunk_size=3) == solutions).all())
+        self.assertTrue((batch.solve_candidates(batch.grids_to_tensor(self.grids), chunk_size=1) == solutions).all())
+
+    def test_grid_length(self):
+        self.assertRaises(ValueError, batch.grids_to_tensor, ['123'])
+
+
+if __name__ == '__main__':
+    unittest.main()
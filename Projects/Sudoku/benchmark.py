@@ -0,0 +1,252 @@
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+
+import solution
+from topology import get_topology
+
+#####################################################################################
+# Corpus
+#
+# Every puzzle has a single solution under its variant. The classic easy puzzles come
+# from Norvig's easy set, the hard ones from his top95 set and the 17-clue ones from
+# Gordon Royle's collection of minimal puzzles. The others were made by removing clues
+# from solved grids while the solution stayed unique.
+
+corpus = {
+    'easy': [
+        ('classic', '..3.2.6..9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3..'),
+        ('classic', '2...8.3...6..7..84.3.5..2.9...1.54.8.........4.27.6...3.1..7.4.72..4..6...4.1...3'),
+        ('classic', '......9.7...42.18....7.5.261..9.4....5.....4....5.7..992.1.8....34.59...5.7......'),
+        ('classic', '.3..5..4...8.1.5..46.....12.7.5.2.8....6.3....4.1.9.3.25.....98..1.2.6...8..6..2.'),
+        ('diagonal', '...83........74.3.....9.52..2..1...9163.8.4.2798.5....4.912..75...9.7.43..654....'),
+        ('diagonal', '271.93......8..19389.51.........592413.9..8.5.597........3.1..6.....93....5...419'),
+        ('diagonal', '.6..3897........34..172.85.....9..42...1.....1..68..9763.95....4.8.7.....17863.2.'),
+        ('diagonal', '36.......1.2...5.4..4.523....654.......8.97.1...6.724.8.....6.26.7.98...42..76.58'),
+    ],
+    'medium': [
+        ('classic', '.839.1....6....8..2..8..4.35.8.3..76..9..4.........2....2.8..1.8...5......5..7...'),
+        ('classic', '2.....376..9......83....2..9.61...3.5....86...8.7....1.9.6..8........1.5..48...9.'),
+        ('classic', '....3...7..5...18...1....2.1.39...........7....8.6731.9.61..5..8..25........43...'),
+        ('classic', '..72.6.4...83..56..6...73..6.354.9....9.....4...1.....2.......8.....8.7...4.6....'),
+        ('diagonal', '..2....6...1.....83.7.9.524..4.1.....6.7.....7..4..3......2.6.5..........7.5438.1'),
+        ('diagonal', '...4.356....8..1........24...7....2..3296......97..63......17...1.......3.52...19'),
+        ('diagonal', '...4....1.....62.4.4..2..5..5.397....73.42...124...3.7....5..1...8...5....7......'),
+        ('diagonal', '....841.......3.8478........76....39......7....86..2......1.67...72..41..2.3...5.'),
+    ],
+    'hard': [
+        ('classic', '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'),
+        ('classic', '52...6.........7.13...........4..8..6......5...........418.........3..2...87.....'),
+        ('classic', '6.....8.3.4.7.................5.4.7.3..2.....1.6.......2.....5.....8.6......1....'),
+        ('classic', '48.3............71.2.......7.5....6....2..8.............1.76...3.....4......5....'),
+        ('classic', '....14....3....2...7..........9...3.6.1.............8.2.....1.4....5.6.....7.8...'),
+        ('classic', '......52..8.4......3...9...5.1...6..2..7........3.....6...1..........7.4.......3.'),
+        ('classic', '6.2.5.........3.4..........43...8....1....2........7..5..27...........81...6.....'),
+        ('classic', '.524.........7.1..............8.2...3.....6...9.5.....1.6.3...........897........'),
+        ('diagonal', '......1.......49..38..9......4...7........4.2....52....3........1...7.........89.'),
+        ('diagonal', '....9.5.....8.......3..62..68.....2.1........4...2.........1..671....3....5....1.'),
+        ('diagonal', '...4.8..........3.3..7.9.....6......97.......1..68.3....2.........2..56....8..4..'),
+        ('diagonal', '...9.4...19....58..........27..............6....6...4.....15..2.....84......7....'),
+    ],
+    '17-clue': [
+        ('classic', '.......1.4.........2...........5.4.7..8...3....1.9....3..4..2...5.1........8.6...'),
+        ('classic', '.......1.4.........2...........5.6.4..8...3....1.9....3..4..2...5.1........8.7...'),
+        ('classic', '.......12....35......6...7.7.....3.....4..8..1...........12.....8.....4..5....6..'),
+        ('classic', '.......12..36..........7...41..2.......5..3..7.....6..28.....4....3..5...........'),
+    ],
+}
+
+
+#####################################################################################
+# Cases
+#
+# A case prepares the arguments of a function outside of the timed region, so only the
+# function itself is measured. Strategies update their sudoku in place and get a fresh
+# one on every call.
+
+def solve_case(method):
+    return lambda grid, variant: (grid, variant, False, None, method), solution.solve
+
+
+def strategy_case(strategy):
+    return lambda grid, variant: (solution.grid_values(grid), get_topology(variant)), strategy
+
+
+cases = {
+    'solve': solve_case('search'),
+    'solve_dlx': solve_case('dlx'),
+    'reduce_puzzle': strategy_case(solution.reduce_puzzle),
+    'eliminate': strategy_case(solution.eliminate),
+    'only_choice': strategy_case(solution.only_choice),
+    'naked_twins': strategy_case(solution.naked_twins),
+}
+
+
+#####################################################################################
+# Measures
+
+def percentile(latencies, q):
+    """
+        Percentile of a list of latencies, interpolating between the closest ranks.
+        Args:
+            latencies(list) - Sorted latencies.
+            q(float) - The percentile, between 0 and 100.
+        Returns:
+            The latency below which q percent of the latencies fall.
+    """
+
+    position = (len(latencies) - 1) * q / 100.0
+    low = int(position)
+    high = min(low + 1, len(latencies) - 1)
+    return latencies[low] + (latencies[high] - latencies[low]) * (position - low)
+
+
+def summarize(latencies):
+    """
+        Summarize the latencies of a function.
+        Args:
+            latencies(list) - The latencies in seconds, one per call.
+        Returns:
+            A dictionary with the count, median/p95/p99/mean latencies in milliseconds and puzzles per second.
+    """
+
+    latencies = sorted(latencies)
+    total = sum(latencies)
+
+    return {
+        'count': len(latencies),
+        'median_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': total / len(latencies) * 1000,
+        'puzzles_per_s': len(latencies) / total if total else 0.0,
+    }
+
+
+def measure(case, puzzles, warmup=1, repeat=5):
+    """
+        Time a case over puzzles.
+            Every puzzle is run warmup times untimed, then repeat times timed. The garbage
+            collector is off while timing, like in timeit.
+        Args:
+            case(tuple) - A (prepare, function) pair, see cases.
+            puzzles(list) - (variant, grid) pairs.
+            warmup(int) - The untimed calls per puzzle.
+            repeat(int) - The timed calls per puzzle.
+        Returns:
+            The latencies in seconds, one per timed call.
+    """
+
+    prepare, function = case
+    latencies = []
+
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for variant, grid in puzzles:
+            for trial in range(warmup + repeat):
+                args = prepare(grid, variant)
+                start = time.perf_counter()
+                function(*args)
+                elapsed = time.perf_counter() - start
+                if trial >= warmup:
+                    latencies.append(elapsed)
+    finally:
+        if enabled:
+            gc.enable()
+
+    return latencies
+
+
+def run(tiers=None, functions=None, warmup=1, repeat=5):
+    """
+        Run the benchmark.
+        Args:
+            tiers(list) - The corpus tiers to run, all of them by default.
+            functions(list) - The cases to run, all of them by default.
+            warmup(int) - The untimed calls per puzzle.
+            repeat(int) - The timed calls per puzzle.
+        Returns:
+            The results as a JSON-serializable dictionary: {'meta': ..., 'results': {tier: {function: summary}}}.
+    """
+
+    results = {}
+    for tier in tiers or corpus:
+        results[tier] = {}
+        for name in functions or cases:
+            results[tier][name] = summarize(measure(cases[name], corpus[tier], warmup, repeat))
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'warmup': warmup,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare(results, baseline, tolerance=0.1, metric='median_ms'):
+    """
+        Find the regressions of a run against a baseline run.
+        Args:
+            results(dict) - The current results, see run().
+            baseline(dict) - The baseline results, see run().
+            tolerance(float) - The relative slowdown allowed, 0.1 for 10%.
+            metric(string) - The summary field compared.
+        Returns:
+            A list of (tier, function, baseline, current) tuples for the cases slower than allowed.
+            Cases missing from either run are ignored.
+    """
+
+    regressions = []
+    for tier, functions in results['results'].items():
+        for name, summary in functions.items():
+            before = baseline['results'].get(tier, {}).get(name)
+            if before is not None and summary[metric] > before[metric] * (1 + tolerance):
+                regressions.append((tier, name, before[metric], summary[metric]))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='benchmark', description='Time the solver over a tiered puzzle corpus.')
+    parser.add_argument('--tiers', nargs='+', choices=list(corpus), help='corpus tiers, all by default')
+    parser.add_argument('--functions', nargs='+', choices=list(cases), help='functions to time, all by default')
+    parser.add_argument('--warmup', type=int, default=1, help='untimed calls per puzzle')
+    parser.add_argument('--repeat', type=int, default=5, help='timed calls per puzzle')
+    parser.add_argument('-o', '--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='relative slowdown allowed by --baseline')
+    args = parser.parse_args(argv)
+
+    results = run(args.tiers, args.functions, args.warmup, args.repeat)
+
+    print('%-10s %-14s %10s %10s %10s %12s' % ('tier', 'function', 'median ms', 'p95 ms', 'p99 ms', 'puzzles/s'))
+    for tier, functions in results['results'].items():
+        for name, summary in functions.items():
+            print('%-10s %-14s %10.3f %10.3f %10.3f %12.1f' % (tier, name, summary['median_ms'], summary['p95_ms'],
+                                                               summary['p99_ms'], summary['puzzles_per_s']))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline), args.tolerance)
+        for tier, name, before, after in regressions:
+            print('Regression: %s %s median %.3f ms -> %.3f ms' % (tier, name, before, after), file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,33 @@
+import benchmark
+import solution
+import unittest
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_corpus(self):
+        for tier, puzzles in benchmark.corpus.items():
+            for variant, grid in puzzles:
+                self.assertEqual(solution.count_solutions(grid, 2, variant), 1, grid)
+        self.assertTrue(all(len(grid) - grid.count('.') == 17 for _, grid in benchmark.corpus['17-clue']))
+
+    def test_percentile(self):
+        latencies = [float(i) for i in range(101)]
+        self.assertEqual(benchmark.percentile(latencies, 50), 50.0)
+        self.assertEqual(benchmark.percentile(latencies, 99), 99.0)
+        self.assertEqual(benchmark.percentile([2.0], 95), 2.0)
+        self.assertEqual(benchmark.percentile([1.0, 2.0], 50), 1.5)
+
+    def test_run_and_compare(self):
+        results = benchmark.run(['easy'], ['solve', 'naked_twins'], warmup=0, repeat=1)
+        summary = results['results']['easy']['solve']
+        self.assertEqual(summary['count'], len(benchmark.corpus['easy']))
+        self.assertLessEqual(summary['median_ms'], summary['p99_ms'])
+        self.assertEqual(benchmark.compare(results, results), [])
+
+        faster = {'results': {'easy': {'solve': dict(summary, median_ms=summary['median_ms'] / 2)}}}
+        self.assertEqual([r[:2] for r in benchmark.compare(results, faster)], [('easy', 'solve')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,1055 @@
+import functools
+import itertools
+from array import array
+from collections import deque, namedtuple
+
+from budget import OutOfBudget
+from topology import CLASSIC
+
+#####################################################################################
+# Bitmask encoding
+#
+# Every box is stored as a candidate mask where bit i stands for the digit i of the topology,
+# e.g. '123456789' -> 0b111111111 and '37' -> 0b001000100 on a 9x9 board.
+
+popcount = int.bit_count
+
+
+@functools.lru_cache(maxsize=None)
+def mask_strings(digits):
+    """
+        Table of the candidate strings of every mask, for alphabets of up to 12 digits.
+        Args:
+            digits(string) - The digit symbols of the topology.
+        Returns:
+            A list indexed by mask.
+    """
+
+    return [''.join(d for i, d in enumerate(digits) if m & (1 << i)) for m in range(1 << len(digits))]
+
+
+def mask_string(mask, digits):
+    """
+        Convert a candidate bitmask into its string of candidate digits.
+        Args:
+            mask(int) - The candidate bitmask, e.g. 0b001000100.
+            digits(string) - The digit symbols of the topology.
+        Returns:
+            The candidates of the box, e.g. '37'.
+    """
+
+    if len(digits) <= 12:
+        return mask_strings(digits)[mask]
+
+    return ''.join(d for i, d in enumerate(digits) if mask & (1 << i))
+
+
+@functools.lru_cache(maxsize=None)
+def mask_lanes(digits):
+    """
+        Table spreading the bits of every mask to one lane of 32 bits per digit.
+            OR-ing the lanes of the boxes of a unit, each shifted by its position, transposes the
+            unit from candidates per box to places per digit in one pass.
+        Args:
+            digits(int) - The number of digits of the masks, up to 12.
+        Returns:
+            A list indexed by mask.
+    """
+
+    return [sum(1 << (32 * d) for d in range(digits) if m >> d & 1) for m in range(1 << digits)]
+
+
+def digits_mask(value, digit_bits=CLASSIC.digit_bits):
+    """
+        Convert a string of candidate digits into its bitmask.
+        Args:
+            value(string) - The candidates of a box, e.g. '37'.
+            digit_bits(dict) - The bit of every digit symbol, see Topology.digit_bits.
+        Returns:
+            The candidate bitmask, e.g. 0b001000100.
+    """
+
+    mask = 0
+    for digit in value:
+        mask |= digit_bits[digit]
+
+    return mask
+
+
+class Board:
+    """
+        A sudoku board stored as an integer array of candidate bitmasks.
+            Board.from_values() and Board.to_values() convert from and to the
+            {'A1': '123456789', ...} dictionary form used by solution.py.
+            Alongside the cells, places indexes where every digit can still go in every unit:
+            places[u * len(digits) + d] is the mask of the positions of unit u whose box has the
+            digit d as a candidate. Board.set() keeps it up to date, so a hidden single or a
+            digit left without a place in a unit is a lookup away.
+            While trail is a list, Board.set() appends the cell and old mask of every change to it,
+            so Board.undo() can take the board back to an earlier state in place.
+            While budget is a Budget, settle() and explore() charge their work to it, see bounded_search().
+    """
+
+    __slots__ = ('topology', 'cells', 'places', 'trace', 'stats', 'strategies', 'trail', 'budget')
+
+    def __init__(self, topology, cells=None, trace=None, stats=None, strategies=None, places=None):
+        typecode = 'H' if len(topology.digits) <= 16 else 'L'
+
+        self.topology = topology
+        self.cells = array(typecode, cells if cells is not None else [topology.all_digits] * len(topology.boxes))
+        self.places = array(typecode, places) if places is not None else self.index_places()
+        self.trace = trace
+        self.stats = stats
+        self.strategies = default_pipeline if strategies is None else strategies
+        self.trail = None
+        self.budget = None
+
+    @classmethod
+    def from_values(cls, values, topology, trace=None, stats=None, strategies=None):
+        """
+            Build a board from a sudoku in dictionary form.
+            Args:
+                values(dict) - The sudoku in dictionary form.
+                topology(Topology) - The unit and peer tables of the sudoku variant.
+                trace(TraceRecorder) - Optional recorder of every candidate change, see recorder.py.
+                stats(Stats) - Optional counters of the work done by the strategies, see stats.py.
+                strategies(tuple) - The strategies run on top of propagation, see pipeline().
+            Returns:
+                The sudoku as a Board.
+        """
+
+        return cls(topology, [digits_mask(values[box], topology.digit_bits) for box in topology.boxes], trace, stats,
+                   strategies)
+
+    def to_values(self):
+        """
+            Convert the board back into dictionary form.
+            Returns:
+                The sudoku in dictionary form.
+        """
+
+        digits = self.topology.digits
+        return dict(zip(self.topology.boxes, [mask_string(m, digits) for m in self.cells]))
+
+    def copy(self):
+        return Board(self.topology, self.cells, self.trace, self.stats, self.strategies, self.places)
+
+    def index_places(self):
+        """
+            Build the digit place index of the board from its cells.
+            Returns:
+                The places array, see Board.
+        """
+
+        cells = self.cells
+        digits = len(self.topology.digits)
+        places = array(cells.typecode, [0]) * (len(self.topology.unit_cells) * digits)
+
+        # Masks wider than 12 digits are spread 8 digits at a time
+        chunk = digits if digits <= 12 else 8
+        lanes = mask_lanes(chunk)
+        low = (1 << chunk) - 1
+        lane = (1 << 32) - 1
+
+        for u, unit in enumerate(self.topology.unit_cells):
+            spread = 0
+            for position, cell in enumerate(unit):
+                mask = cells[cell]
+                shift = position
+                while mask:
+                    spread |= lanes[mask & low] << shift
+                    mask >>= chunk
+                    shift += 32 * chunk
+
+            offset = u * digits
+            for digit in range(digits):
+                places[offset + digit] = spread >> (32 * digit) & lane
+
+        return places
+
+    def set(self, cell, mask):
+        """
+            Set the candidates of a cell, recording the change when the board is traced.
+            Args:
+                cell(int) - The index of the box.
+                mask(int) - The new candidate bitmask.
+        """
+
+        old = self.cells[cell]
+        if old == mask:
+            return
+
+        self.cells[cell] = mask
+
+        places = self.places
+        removed = old & ~mask
+        added = mask & ~old
+        for offset, position, unit in self.topology.cell_places[cell]:
+            bits = removed
+            while bits:
+                bit = bits & -bits
+                bits ^= bit
+                places[offset + bit.bit_length() - 1] &= ~position
+            bits = added
+            while bits:
+                bit = bits & -bits
+                bits ^= bit
+                places[offset + bit.bit_length() - 1] |= position
+
+        if self.trail is not None:
+            self.trail.append(cell)
+            self.trail.append(old)
+        if self.trace is not None:
+            self.trace.record(cell, old, mask)
+        if self.stats is not None:
+            self.stats.change(old, mask)
+
+    def undo(self, mark):
+        """
+            Restore the cells changed since the trail was mark entries long, latest change first.
+            Args:
+                mark(int) - The length of the trail to go back to.
+        """
+
+        trail = self.trail
+        cells = self.cells
+        places = self.places
+        cell_places = self.topology.cell_places
+        changes = {} if self.trace is not None else None
+
+        while len(trail) > mark:
+            old = trail.pop()
+            cell = trail.pop()
+            mask = cells[cell]
+            cells[cell] = old
+
+            # Undoing only ever adds candidates back
+            added = old & ~mask
+            for offset, position, unit in cell_places[cell]:
+                bits = added
+                while bits:
+                    bit = bits & -bits
+                    bits ^= bit
+                    places[offset + bit.bit_length() - 1] |= position
+
+            if changes is not None:
+                changes[cell] = (changes[cell][0] if cell in changes else mask, old)
+
+        if changes is not None:
+            self.trace.undo((cell, old, new) for cell, (old, new) in changes.items())
+
+    def solved_count(self):
+        return sum(1 for m in self.cells if popcount(m) == 1)
+
+    def is_solved(self):
+        return all(popcount(m) == 1 for m in self.cells)
+
+
+#####################################################################################
+# Strategies
+
+def counted(name):
+    """
+        Decorate a sweep strategy so its calls, changes and time are counted on boards with stats.
+        Args:
+            name(string) - The name of the strategy in Stats.
+        Returns:
+            The decorator.
+    """
+
+    def decorate(strategy):
+        @functools.wraps(strategy)
+        def wrapper(board):
+            if board.stats is None:
+                return strategy(board)
+
+            board.stats.enter(name)
+            try:
+                return strategy(board)
+            finally:
+                board.stats.enter(None)
+
+        return wrapper
+
+    return decorate
+
+
+@counted('eliminate')
+def eliminate(board):
+    """
+        Remove the digit of every solved box from the candidates of its peers.
+        Args:
+            board(Board) - The sudoku board, updated in place.
+        Returns:
+            The board.
+    """
+
+    cells = board.cells
+    peers = board.topology.cell_peers
+
+    for cell in range(len(cells)):
+        mask = cells[cell]
+        if popcount(mask) != 1:
+            continue
+
+        for peer in peers[cell]:
+            if cells[peer] & mask:
+                board.set(peer, cells[peer] & ~mask)
+
+    return board
+
+
+@counted('only_choice')
+def only_choice(board):
+    """
+        Assign every digit that fits in only one box of a unit to that box.
+        Args:
+            board(Board) - The sudoku board, updated in place.
+        Returns:
+            The board.
+    """
+
+    cells = board.cells
+    places = board.places
+    digits = len(board.topology.digits)
+
+    stalled = False
+    while not stalled:
+
+        solved_before = board.solved_count()
+
+        for u, unit in enumerate(board.topology.unit_cells):
+            offset = u * digits
+
+            # Digits with a single place in the unit
+            for digit in range(digits):
+                positions = places[offset + digit]
+                if positions and not positions & (positions - 1):
+                    cell = unit[positions.bit_length() - 1]
+                    if popcount(cells[cell]) > 1:
+                        board.set(cell, 1 << digit)
+
+        stalled = solved_before == board.solved_count()
+
+    return board
+
+
+@counted('naked_twins')
+def naked_twins(board):
+    """
+        Eliminate the digits of naked twins from the other boxes of their units.
+        Args:
+            board(Board) - The sudoku board, updated in place.
+        Returns:
+            The board.
+    """
+
+    cells = board.cells
+    topology = board.topology
+
+    stalled = False
+    while not stalled:
+
+        solved_before = board.solved_count()
+
+        twins_candidate = [cell for cell in range(len(cells)) if popcount(cells[cell]) == 2]
+
+        while len(twins_candidate) > 1:
+
+            x_cell = twins_candidate.pop()
+            x_mask = cells[x_cell]
+
+            if not any(cells[peer] == x_mask for peer in topology.cell_peers[x_cell]):
+                continue
+
+            for x_unit in topology.cell_units[x_cell]:
+                if sum(1 for cell in x_unit if cells[cell] == x_mask) > 1:
+                    for cell in x_unit:
+                        if popcount(cells[cell]) > 1 and cells[cell] != x_mask:
+                            board.set(cell, cells[cell] & ~x_mask)
+
+        stalled = solved_before == board.solved_count()
+
+    return board
+
+
+def remove(board, cell, mask, queue):
+    """
+        Remove candidates from a cell and queue the cell if it changed.
+        Args:
+            board(Board) - The sudoku board, updated in place.
+            cell(int) - The index of the box.
+            mask(int) - The candidates to remove.
+            queue(deque) - The work queue of (cell, removed candidates) pairs.
+        Returns:
+            False if the cell was left without candidates, True otherwise.
+    """
+
+    old = board.cells[cell]
+    if not old & mask:
+        return True
+
+    new = old & ~mask
+    if not new:
+        return False
+
+    board.set(cell, new)
+    queue.append((cell, old & mask))
+
+    return True
+
+
+def propagate(board, queue):
+    """
+        Propagate the queued changes until the board stops changing.
+            Only the peers and units of a changed box are revisited:
+            - a box that became solved removes its digit from its peers,
+            - a digit removed from a box is checked for a single remaining place in the box units,
+            - a box left with two candidates looks for a naked twin in its units.
+            It stops as soon as a box or a unit becomes infeasible.
+        Args:
+            board(Board) - The sudoku board, updated in place.
+            queue(deque) - The work queue of (cell, removed candidates) pairs.
+        Returns:
+            False if a contradiction was found, True otherwise.
+    """
+
+    stats = board.stats
+    if stats is None:
+        return _propagate(board, queue, None)
+
+    stats.enter('propagate')
+    try:
+        return _propagate(board, queue, stats)
+    finally:
+        stats.enter(None)
+
+
+def _propagate(board, queue, stats):
+    """
+        The loop of propagate(), telling stats which rule makes the changes unless it is None.
+    """
+
+    cells = board.cells
+    places = board.places
+    topology = board.topology
+
+    while queue:
+        cell, removed = queue.popleft()
+        mask = cells[cell]
+        count = popcount(mask)
+
+        # Eliminate
+        if count == 1:
+            if stats is not None:
+                stats.rule = 'eliminate'
+            for peer in topology.cell_peers[cell]:
+                if cells[peer] & mask and not remove(board, peer, mask, queue):
+                    return False
+
+        # Only choice
+        if stats is not None and removed:
+            stats.rule = 'only_choice'
+        while removed:
+            bit = removed & -removed
+            removed ^= bit
+            digit = bit.bit_length() - 1
+
+            for offset, position, unit in topology.cell_places[cell]:
+                positions = places[offset + digit]
+                if not positions:
+                    return False
+                if not positions & (positions - 1):
+                    place = unit[positions.bit_length() - 1]
+                    if cells[place] != bit and not remove(board, place, cells[place] & ~bit, queue):
+                        return False
+
+        # Naked twins
+        if count == 2:
+            if stats is not None:
+                stats.rule = 'naked_twins'
+            for unit in topology.cell_units[cell]:
+                if any(c != cell and cells[c] == mask for c in unit):
+                    for c in unit:
+                        if cells[c] != mask and cells[c] & mask and not remove(board, c, mask, queue):
+                            return False
+
+    return True
+
+
+#####################################################################################
+# Strategy registry
+#
+# Propagation always runs the eliminate, only choice and naked twins rules on the boxes
+# that change. On top of it, a board runs a pipeline of registered strategies: once the
+# queue is empty they are tried from the cheapest, and as soon as one of them removes a
+# candidate the queue is propagated and the pipeline starts over from the cheapest.
+# A strategy takes the board and the queue, removes candidates with remove() and returns
+# False when it finds a contradiction.
+
+Strategy = namedtuple('Strategy', 'name cost function')
+
+registry = {}
+
+
+def register(name, cost):
+    """
+        Register a strategy under a name.
+        Args:
+            name(string) - The name of the strategy, e.g. 'x_wing'.
+            cost(int) - The relative cost of a call, cheaper strategies run first.
+        Returns:
+            The decorator.
+    """
+
+    def decorate(function):
+        registry[name] = Strategy(name, cost, function)
+        return function
+
+    return decorate
+
+
+def pipeline(names=None):
+    """
+        Build the strategy pipeline of a board.
+        Args:
+            names(iterable) - The names of the registered strategies to run, default_strategies by default.
+        Returns:
+            A tuple of Strategies, cheapest first.
+    """
+
+    if names is None:
+        names = default_strategies
+
+    unknown = set(names) - set(registry)
+    if unknown:
+        raise ValueError("Unknown strategies: %s" % ', '.join(sorted(unknown)))
+
+    return tuple(sorted((registry[name] for name in names), key=lambda strategy: (strategy.cost, strategy.name)))
+
+
+def settle(board, queue):
+    """
+        Propagate the queued changes, then run the strategy pipeline of the board to a fixpoint.
+        Args:
+            board(Board) - The sudoku board, updated in place.
+            queue(deque) - The work queue of (cell, removed candidates) pairs.
+        Returns:
+            False if a contradiction was found, True otherwise.
+    """
+
+    if not propagate(board, queue):
+        return False
+
+    strategies = board.strategies
+    stats = board.stats
+    budget = board.budget
+
+    i = 0
+    while i < len(strategies):
+        strategy = strategies[i]
+
+        if stats is not None:
+            stats.enter(strategy.name)
+        found = strategy.function(board, queue)
+        if stats is not None:
+            stats.enter(None)
+
+        if not found:
+            return False
+
+        if queue:
+            if not propagate(board, queue):
+                return False
+            if budget is not None:
+                budget.check()
+            i = 0
+        else:
+            i += 1
+
+    return True
+
+
+@functools.lru_cache(maxsize=None)
+def intersections(topology):
+    """
+        The boxes shared by a square and another unit, for locked candidates.
+        Args:
+            topology(Topology) - The topology of the board.
+        Returns:
+            A list of (square, line) pairs for the pointing pairs and a list of (line, square) pairs for
+            the box-line reduction, each pair given as (boxes only in the first unit, shared boxes,
+            boxes only in the second unit).
+    """
+
+    side = len(topology.digits)
+    squares = topology.unit_cells[2 * side:3 * side]
+    lines = topology.unit_cells[:2 * side] + topology.unit_cells[3 * side:]
+
+    pointing, box_line = [], []
+    for square in squares:
+        for line in lines:
+            common = tuple(cell for cell in square if cell in line)
+            if len(common) < 2:
+                continue
+            only_square = tuple(cell for cell in square if cell not in common)
+            only_line = tuple(cell for cell in line if cell not in common)
+            pointing.append((only_square, common, only_line))
+            box_line.append((only_line, common, only_square))
+
+    return pointing, box_line
+
+
+def locked_candidates(board, queue, pairs):
+    """
+        Remove the digits that a unit can only place in the boxes it shares with another unit
+        from the rest of the other unit.
+        Args:
+            board(Board) - The sudoku board, updated in place.
+            queue(deque) - The work queue of (cell, removed candidates) pairs.
+            pairs(list) - (only in the first unit, shared, only in the second unit) tuples, see intersections().
+        Returns:
+            False if a contradiction was found, True otherwise.
+    """
+
+    cells = board.cells
+
+    for only_first, common, only_second in pairs:
+        inside = 0
+        for cell in common:
+            inside |= cells[cell]
+
+        outside = 0
+        for cell in only_first:
+            outside |= cells[cell]
+
+        locked = inside & ~outside
+        if not locked:
+            continue
+
+        for cell in only_second:
+            if cells[cell] & locked and not remove(board, cell, locked, queue):
+                return False
+
+    return True
+
+
+@register('pointing_pairs', 10)
+def pointing_pairs(board, queue):
+    """
+        A digit confined to one line within a square is removed from the rest of the line.
+    """
+
+    return locked_candidates(board, queue, intersections(board.topology)[0])
+
+
+@register('box_line_reduction', 10)
+def box_line_reduction(board, queue):
+    """
+        A digit confined to one square within a line is removed from the rest of the square.
+    """
+
+    return locked_candidates(board, queue, intersections(board.topology)[1])
+
+
+@register('hidden_pairs', 20)
+def hidden_pairs(board, queue):
+    """
+        Two digits that fit in the same two boxes of a unit, and nowhere else in it, leave
+        no room for other digits in those boxes.
+    """
+
+    cells = board.cells
+    places = board.places
+    digits = len(board.topology.digits)
+
+    for u, unit in enumerate(board.topology.unit_cells):
+        offset = u * digits
+
+        # Digits with exactly two places in the unit, grouped by places
+        pairs = {}
+        for digit in range(digits):
+            positions = places[offset + digit]
+            if popcount(positions) == 2:
+                pairs.setdefault(positions, []).append(digit)
+
+        for positions, found in pairs.items():
+            if len(found) > 2:
+                return False
+            if len(found) < 2:
+                continue
+
+            keep = (1 << found[0]) | (1 << found[1])
+            for i, cell in enumerate(unit):
+                if positions >> i & 1 and cells[cell] & ~keep:
+                    if not remove(board, cell, cells[cell] & ~keep, queue):
+                        return False
+
+    return True
+
+
+def naked_subsets(board, queue, size):
+    """
+        Remove the digits of size boxes of a unit that hold size digits between them from the
+        other boxes of the unit.
+        Args:
+            board(Board) - The sudoku board, updated in place.
+            queue(deque) - The work queue of (cell, removed candidates) pairs.
+            size(int) - The number of boxes of a subset, 3 for triples.
+        Returns:
+            False if a contradiction was found, True otherwise.
+    """
+
+    cells = board.cells
+
+    for unit in board.topology.unit_cells:
+        candidates = [cell for cell in unit if 1 < popcount(cells[cell]) <= size]
+        if len(candidates) < size:
+            continue
+
+        for subset in itertools.combinations(candidates, size):
+            union = 0
+            for cell in subset:
+                union |= cells[cell]
+
+            count = popcount(union)
+            if count < size:
+                return False
+            if count > size:
+                continue
+
+            for cell in unit:
+                if cell not in subset and cells[cell] & union and not remove(board, cell, union, queue):
+                    return False
+
+    return True
+
+
+@register('naked_triples', 30)
+def naked_triples(board, queue):
+    """
+        Three boxes of a unit holding three digits between them.
+    """
+
+    return naked_subsets(board, queue, 3)
+
+
+@register('naked_quads', 40)
+def naked_quads(board, queue):
+    """
+        Four boxes of a unit holding four digits between them.
+    """
+
+    return naked_subsets(board, queue, 4)
+
+
+@register('x_wing', 50)
+def x_wing(board, queue):
+    """
+        A digit that fits in the same two columns of two rows is removed from the rest of those
+        columns, and the same with rows and columns swapped.
+    """
+
+    cells = board.cells
+    places = board.places
+    unit_cells = board.topology.unit_cells
+    side = len(board.topology.digits)
+
+    # Rows are the first side units and columns the next ones, so the places of a digit in
+    # a row are columns and the places in a column are rows
+    for lines, crossing in ((0, side), (side, 0)):
+        for digit in range(side):
+
+            pairs = {}
+            for i in range(side):
+                positions = places[(lines + i) * side + digit]
+                if popcount(positions) == 2:
+                    pairs.setdefault(positions, []).append(i)
+
+            for positions, found in pairs.items():
+                if len(found) > 2:
+                    return False
+                if len(found) < 2:
+                    continue
+
+                wing = (1 << found[0]) | (1 << found[1])
+                for k in range(side):
+                    if not positions >> k & 1:
+                        continue
+
+                    unit = unit_cells[crossing + k]
+                    others = places[(crossing + k) * side + digit] & ~wing
+                    while others:
+                        position = others & -others
+                        others ^= position
+                        if not remove(board, unit[position.bit_length() - 1], 1 << digit, queue):
+                            return False
+
+    return True
+
+
+# The strategies of a board unless another pipeline is given
+default_strategies = ('pointing_pairs', 'box_line_reduction', 'hidden_pairs')
+
+default_pipeline = pipeline()
+
+
+#####################################################################################
+
+def assign(board, cell, bit):
+    """
+        Assign a digit to a cell and propagate the consequences.
+        Args:
+            board(Board) - The sudoku board, updated in place.
+            cell(int) - The index of the box.
+            bit(int) - The bitmask of the digit.
+        Returns:
+            False if a contradiction was found, True otherwise.
+    """
+
+    queue = deque()
+    return remove(board, cell, board.cells[cell] & ~bit, queue) and settle(board, queue)
+
+
+def reduce_puzzle(board):
+    """
+        Propagate every constraint of the board until nothing changes.
+            The initial queue holds every box with the digits it is already missing,
+            after that only changed boxes are revisited. A board with a budget raises OutOfBudget
+            once it runs out, the board reduced as far as it got.
+        Args:
+            board(Board) - The sudoku board, updated in place.
+        Returns:
+            The board, or False if the board is infeasible.
+    """
+
+    cells = board.cells
+
+    if 0 in cells:
+        return False
+
+    queue = deque((cell, board.topology.all_digits & ~mask) for cell, mask in enumerate(cells))
+    if not settle(board, queue):
+        return False
+
+    return board
+
+
+# Outcome of bounded_search(): status is 'solved', 'no_solution' or why the budget ran out
+Outcome = namedtuple('Outcome', 'status board')
+
+
+def search(board):
+    """
+        Depth-first search with constraint propagation over bitmask boards.
+        Args:
+            board(Board) - The sudoku board, solved in place.
+        Returns:
+            The solved Board, or False if the board has no solution.
+    """
+
+    if board.trace is not None:
+        board.trace.keyframe(board.topology, board.cells)
+
+    if reduce_puzzle(board) is False:
+        return False
+
+    for solved in explore(board):
+        return solved
+
+    return False
+
+
+def bounded_search(board, budget):
+    """
+        Search a board within a budget of nodes, time and cancellation, see budget.Budget.
+        Args:
+            board(Board) - The sudoku board, solved or reduced in place.
+            budget(Budget) - The limits of the search.
+        Returns:
+            An Outcome: ('solved', the solved Board), ('no_solution', False), or the reason the
+            budget ran out ('nodes', 'time' or 'cancelled') with the board as far as propagation
+            reduced it before any guess. Every candidate it dropped is ruled out by the givens.
+    """
+
+    board.budget = budget
+    try:
+        solved = search(board)
+    except OutOfBudget as out:
+        return Outcome(out.reason, board)
+    finally:
+        board.budget = None
+
+    return Outcome('solved', solved) if solved else Outcome('no_solution', False)
+
+
+def explore(board, split=None):
+    """
+        Walk the search tree of a reduced board depth first, without recursion or copies.
+            Every node is a frame of an explicit stack: the box branched on, its candidates left
+            to try and the length of the undo trail when the node was entered. A failed branch is
+            undone in place with Board.undo(), so only the boxes it changed are restored.
+        Args:
+            board(Board) - A board whose constraints are already propagated.
+            split(function) - Polled at every unsolved node below the root. When it returns True the
+                walk stops and hands the rest of the tree back, see parallel.py.
+        Returns:
+            A generator yielding the board itself every time it is solved. Copy it to keep the
+            solution once the generator moves on, leave the generator and the board stays solved.
+            A walk stopped by split returns the boards left to explore (the value of StopIteration),
+            see rest(). A walk out of budget raises OutOfBudget with the board back as it was given.
+    """
+
+    cells = board.cells
+    stats = board.stats
+    budget = board.budget
+    board.trail = trail = []
+    stack = []
+    depth = 0
+
+    try:
+        while True:
+            if stats is not None:
+                stats.node(depth)
+            if budget is not None:
+                budget.node()
+
+            unsolved = [(popcount(m), i) for i, m in enumerate(cells) if popcount(m) > 1]
+            if unsolved:
+                if split is not None and stack and split():
+                    return rest(board, stack)
+                count, cell = min(unsolved)
+                stack.append((cell, cells[cell], len(trail), depth))
+            else:
+                yield board
+
+            # Take the next candidate of the deepest node left, undoing the branch that failed
+            while stack:
+                cell, mask, mark, depth = stack[-1]
+                if len(trail) > mark:
+                    board.undo(mark)
+                    if stats is not None:
+                        stats.backtrack(depth)
+                if not mask:
+                    stack.pop()
+                    continue
+
+                bit = mask & -mask
+                stack[-1] = (cell, mask ^ bit, mark, depth)
+                if stats is not None:
+                    stats.enter('search')
+                if assign(board, cell, bit):
+                    depth += 1
+                    break
+            else:
+                return
+    except OutOfBudget:
+        board.undo(0)
+        raise
+    finally:
+        board.trail = None
+
+
+def rest(board, stack):
+    """
+        Split the part of a search tree explore() has not walked yet into boards.
+        Args:
+            board(Board) - The board at the current node of the walk, undone in the process.
+            stack(list) - The open nodes of the walk, see explore().
+        Returns:
+            A list of reduced Boards whose trees together hold the rest of the walk: the current
+            node first, then the untried branches of every open node from the deepest up.
+    """
+
+    boards = [board.copy()]
+    for cell, mask, mark, depth in reversed(stack):
+        board.undo(mark)
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+
+            branch = board.copy()
+            if assign(branch, cell, bit):
+                boards.append(branch)
+
+    return boards
+
+
+#####################################################################################
+# Enumeration
+
+def solutions(board):
+    """
+        Enumerate the solutions of a board lazily, in the order search() explores them.
+        Args:
+            board(Board) - The sudoku board, left untouched.
+        Returns:
+            A generator of solved Boards.
+    """
+
+    board = reduce_puzzle(board.copy())
+    if board is False:
+        return
+
+    for solved in explore(board):
+        yield solved.copy()
+
+
+def branches(board):
+    """
+        Split a board into the top-level branches of its search tree.
+            The solutions of the branches are disjoint and together are the solutions of the board.
+        Args:
+            board(Board) - The sudoku board, left untouched.
+        Returns:
+            A list of reduced Boards, one per candidate of the box search branches on first.
+            A solved board is its own single branch, a board without solution has none.
+    """
+
+    board = reduce_puzzle(board.copy())
+    if board is False:
+        return []
+
+    cells = board.cells
+
+    unsolved = [(popcount(m), i) for i, m in enumerate(cells) if popcount(m) > 1]
+    if not unsolved:
+        return [board]
+
+    count, cell = min(unsolved)
+
+    result = []
+    mask = cells[cell]
+    while mask:
+        bit = mask & -mask
+        mask ^= bit
+
+        new_board = board.copy()
+        if assign(new_board, cell, bit):
+            result.append(new_board)
+
+    return result
+
+
+def frontier(board, count):
+    """
+        Expand the search tree of a board breadth first until it has at least count leaves.
+            The solutions of the leaves are disjoint and together are the solutions of the board.
+        Args:
+            board(Board) - The sudoku board, left untouched.
+            count(int) - The number of subproblems wanted.
+        Returns:
+            A list of reduced Boards, the solved ones first. It is shorter than count when the
+            whole tree has fewer leaves.
+    """
+
+    solved = []
+    parts = deque(branches(board))
+    while parts and len(solved) + len(parts) < count:
+        part = parts.popleft()
+        if part.is_solved():
+            solved.append(part)
+        else:
+            parts.extend(branches(part))
+
+    return solved + list(parts)
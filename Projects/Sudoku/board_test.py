@@ -0,0 +1,164 @@
+import board
+import solution
+import sys
+import unittest
+from collections import deque
+from topology import CLASSIC, DIAGONAL, get_topology
+
+
+class TestBoard(unittest.TestCase):
+    grid = '..3.2.6..9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3..'
+    open_grid = '....2....9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3..'
+
+    def test_round_trip(self):
+        values = solution.grid_values(self.grid)
+        sudoku = board.Board.from_values(values, CLASSIC)
+        self.assertEqual(sudoku.to_values(), values)
+        self.assertEqual(sudoku.cells[2], board.digits_mask('3'))
+        self.assertEqual(sudoku.cells[0], CLASSIC.all_digits)
+
+    def test_tables(self):
+        self.assertEqual(len(CLASSIC.unit_cells), 27)
+        self.assertTrue(all(len(peers) == 20 for peers in CLASSIC.cell_peers))
+        self.assertTrue(all(len(peers) in (20, 26, 32) for peers in DIAGONAL.cell_peers))
+
+    def test_search(self):
+        sudoku = board.Board.from_values(solution.grid_values(self.grid), CLASSIC)
+        solved = board.search(sudoku)
+        self.assertTrue(solved.is_solved())
+        self.assertEqual(''.join(solved.to_values()[box] for box in solution.boxes),
+                         '483921657967345821251876493548132976729564138136798245372689514814253769695417382')
+
+    def test_reduce_detects_contradiction(self):
+        # Two 3s in the first row
+        values = solution.grid_values('3.3' + self.grid[3:])
+        self.assertFalse(board.reduce_puzzle(board.Board.from_values(values, CLASSIC)))
+
+    def test_reduce_only_revisits_changes(self):
+        class Queue(deque):
+            def popleft(self):
+                item = deque.popleft(self)
+                popped.append(item[0])
+                return item
+
+        sudoku = board.reduce_puzzle(board.Board.from_values(solution.grid_values(self.open_grid), CLASSIC))
+        popped = []
+        sudoku.trail = []
+
+        # Taking one candidate out of a box revisits the boxes that change, once per change
+        cell = max(range(len(sudoku.cells)), key=lambda i: board.popcount(sudoku.cells[i]))
+        queue = Queue()
+        self.assertTrue(board.remove(sudoku, cell, sudoku.cells[cell] & -sudoku.cells[cell], queue))
+        board.propagate(sudoku, queue)
+
+        changed = sudoku.trail[0::2]
+        self.assertEqual(popped[0], cell)
+        self.assertLessEqual(len(popped), len(changed))
+        self.assertTrue(set(popped) <= set(changed))
+        self.assertLess(len(set(popped)), len(sudoku.cells))
+
+    def test_places_follow_changes(self):
+        for topology in (DIAGONAL, get_topology('classic', 4)):
+            sudoku = board.Board(topology)
+            self.assertEqual(sudoku.places[5], (1 << len(topology.digits)) - 1)
+            board.assign(sudoku, 0, 1)
+            sudoku.set(1, sudoku.cells[1] | 1)
+            self.assertEqual(sudoku.places, sudoku.index_places())
+            self.assertEqual(sudoku.places, sudoku.copy().places)
+
+        sudoku = board.search(board.Board.from_values(solution.grid_values(self.open_grid), CLASSIC))
+        self.assertEqual(sudoku.places, sudoku.index_places())
+
+    def test_undo_restores_board(self):
+        sudoku = board.reduce_puzzle(board.Board.from_values(solution.grid_values(self.open_grid), CLASSIC))
+        cells, places = sudoku.cells[:], sudoku.places[:]
+        sudoku.trail = []
+        cell = max(range(len(sudoku.cells)), key=lambda i: board.popcount(sudoku.cells[i]))
+        board.assign(sudoku, cell, sudoku.cells[cell] & -sudoku.cells[cell])
+        self.assertNotEqual(sudoku.cells, cells)
+        sudoku.undo(0)
+        self.assertEqual(sudoku.cells, cells)
+        self.assertEqual(sudoku.places, places)
+        self.assertEqual(sudoku.trail, [])
+
+    def test_explore_runs_deeper_than_recursion_limit(self):
+        # An empty 16x16 board branches on more levels than the recursion limit allows frames
+        sudoku = board.Board(get_topology('classic', 4), strategies=())
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(100)
+        try:
+            solved = board.search(sudoku)
+        finally:
+            sys.setrecursionlimit(limit)
+        self.assertTrue(solved.is_solved())
+        self.assertIsNone(solved.trail)
+
+    def test_split_walk_keeps_solutions(self):
+        sudoku = board.reduce_puzzle(board.Board.from_values(solution.grid_values(self.open_grid), CLASSIC))
+        expected = sorted(tuple(b.cells) for b in board.solutions(sudoku))
+
+        # Stop the walk at the 6th node below the root and search the rest of the tree separately
+        ticks = iter(range(5, -1, -1))
+        walk = board.explore(sudoku.copy(), lambda: next(ticks) == 0)
+        found = []
+        while True:
+            try:
+                found.append(tuple(next(walk).cells))
+            except StopIteration as end:
+                rest = end.value
+                break
+
+        self.assertGreater(len(rest), 1)
+        split = found + [tuple(b.cells) for part in rest for b in board.solutions(part)]
+        self.assertEqual(sorted(split), expected)
+
+    def test_branches_split_solutions(self):
+        values = solution.grid_values(self.open_grid)
+        sudoku = board.Board.from_values(values, CLASSIC)
+        solved = set(tuple(b.cells) for b in board.solutions(sudoku))
+        split = [tuple(b.cells) for branch in board.branches(sudoku) for b in board.solutions(branch)]
+        self.assertGreater(len(solved), 1)
+        self.assertEqual(sorted(split), sorted(solved))
+
+
+class TestStrategies(unittest.TestCase):
+    open_grid = TestBoard.open_grid
+
+    def empty_board(self, missing):
+        # Every candidate everywhere, except the digit 1 in the missing boxes
+        values = dict((box, '123456789') for box in CLASSIC.boxes)
+        for box in missing:
+            values[box] = '23456789'
+        return board.Board.from_values(values, CLASSIC, strategies=())
+
+    def ones(self, sudoku):
+        return [box for box, value in sudoku.to_values().items() if '1' in value]
+
+    def test_pipeline(self):
+        self.assertEqual([strategy.name for strategy in board.pipeline(['x_wing', 'hidden_pairs'])],
+                         ['hidden_pairs', 'x_wing'])
+        self.assertRaises(ValueError, board.pipeline, ['swordfish'])
+
+    def test_pointing_pairs(self):
+        sudoku = self.empty_board(solution.cross('BC', '123'))
+        self.assertTrue(board.pointing_pairs(sudoku, deque()))
+        self.assertEqual(self.ones(sudoku)[:3], ['A1', 'A2', 'A3'])
+        self.assertNotIn('A4', self.ones(sudoku))
+
+    def test_x_wing(self):
+        sudoku = self.empty_board([box for box in solution.cross('AE', solution.cols) if box[1] not in '15'])
+        self.assertTrue(board.x_wing(sudoku, deque()))
+        self.assertEqual(set(self.ones(sudoku)) & set(solution.cross(solution.rows, '15')),
+                         {'A1', 'A5', 'E1', 'E5'})
+
+    def test_strategies_keep_solutions(self):
+        values = solution.grid_values(self.open_grid)
+        expected = len(list(board.solutions(board.Board.from_values(values, CLASSIC, strategies=()))))
+        for names in [[name] for name in board.registry] + [list(board.registry)]:
+            sudoku = board.Board.from_values(values, CLASSIC, strategies=board.pipeline(names))
+            solved = list(board.solutions(sudoku))
+            self.assertEqual(len(solved), expected, names)
+            self.assertTrue(all(b.is_solved() for b in solved))
+
+if __name__ == '__main__':
+    unittest.main()
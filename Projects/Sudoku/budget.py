@@ -0,0 +1,56 @@
+import time
+
+
+class OutOfBudget(Exception):
+    """
+        Raised inside the solver when its Budget runs out.
+            reason is 'nodes', 'time' or 'cancelled'.
+    """
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Budget:
+    """
+        Limits on the work of a search: a number of nodes, a wall time and a cancellation token.
+            The search charges every node it enters with node(), which counts it and looks at the
+            clock and the token once every `every` nodes. Propagation calls check() whenever the
+            strategy pipeline starts over, so a long reduction of a large board stops as well.
+            Either raises OutOfBudget once a limit is reached, see board.bounded_search().
+            A budget can be shared by several searches, e.g. the variants tried by
+            solution.solve_within(), which then have its limits between them.
+    """
+
+    __slots__ = ('nodes', 'deadline', 'cancelled', 'every', 'spent')
+
+    def __init__(self, nodes=None, seconds=None, cancelled=None, every=64, deadline=None):
+        """
+            Args:
+                nodes(int) - The number of search nodes allowed, None for no limit.
+                seconds(float) - The wall time allowed from now, None for no limit.
+                cancelled(function) - The cancellation token, called without arguments and true
+                    once the search should stop, e.g. threading.Event().is_set.
+                every(int) - The number of nodes between two looks at the clock and the token.
+                deadline(float) - The time.monotonic() time to stop at, instead of seconds.
+        """
+
+        self.nodes = nodes
+        self.deadline = time.monotonic() + seconds if seconds is not None else deadline
+        self.cancelled = cancelled
+        self.every = every
+        self.spent = 0
+
+    def node(self):
+        self.spent += 1
+        if self.nodes is not None and self.spent > self.nodes:
+            raise OutOfBudget('nodes')
+        if self.spent % self.every == 0:
+            self.check()
+
+    def check(self):
+        if self.cancelled is not None and self.cancelled():
+            raise OutOfBudget('cancelled')
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise OutOfBudget('time')
@@ -0,0 +1,62 @@
+import board
+import solution
+import unittest
+from budget import Budget
+from topology import CLASSIC
+
+
+class TestBudget(unittest.TestCase):
+    grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+    # Takes seconds of search without the strategies on top of propagation
+    slow_grid = '.....6....59.....82....8....45........3........6..3.54...325..6..................'
+
+    def slow_board(self):
+        return board.Board.from_values(solution.grid_values(self.slow_grid), CLASSIC, strategies=())
+
+    def test_unlimited(self):
+        sudoku = board.Board.from_values(solution.grid_values(self.grid), CLASSIC)
+        status, solved = board.bounded_search(sudoku.copy(), Budget())
+        self.assertEqual(status, 'solved')
+        self.assertEqual(solved.cells, board.search(sudoku).cells)
+
+        status, values = solution.solve_within(self.grid)
+        self.assertEqual((status, values), ('solved', solution.solve(self.grid)))
+        self.assertEqual(solution.solve_within('33' + '.' * 79), ('no_solution', False))
+
+    def test_nodes(self):
+        budget = Budget(nodes=100)
+        status, partial = board.bounded_search(self.slow_board(), budget)
+        self.assertEqual(status, 'nodes')
+        self.assertEqual(budget.spent, 101)
+
+        # The board is left reduced, without the guesses of the search
+        self.assertEqual(partial.cells, board.reduce_puzzle(self.slow_board()).cells)
+        self.assertEqual(partial.places, partial.index_places())
+        self.assertIsNone(partial.trail)
+        self.assertIsNone(partial.budget)
+
+    def test_time(self):
+        status, partial = board.bounded_search(self.slow_board(), Budget(seconds=0.05))
+        self.assertEqual(status, 'time')
+        self.assertFalse(partial.is_solved())
+
+        status, values = solution.solve_within(self.slow_grid, 'classic', seconds=0.05, strategies=())
+        self.assertEqual(status, 'time')
+        self.assertEqual(values['A6'], '6')
+
+    def test_cancelled(self):
+        calls = []
+        budget = Budget(cancelled=lambda: calls.append(1) or len(calls) > 3)
+        status, partial = board.bounded_search(self.slow_board(), budget)
+        self.assertEqual(status, 'cancelled')
+        self.assertEqual(len(calls), 4)
+
+        # Propagation looks at the token too, before the search starts
+        sudoku = board.Board.from_values(solution.grid_values(self.grid), CLASSIC)
+        status, partial = board.bounded_search(sudoku, Budget(cancelled=lambda: True))
+        self.assertEqual(status, 'cancelled')
+        self.assertFalse(partial.is_solved())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,311 @@
+import itertools
+import math
+import shelve
+from collections import OrderedDict
+
+import solution
+from topology import get_topology
+
+
+#####################################################################################
+# Canonical form
+#
+# Two puzzles that differ only by a relabeling of their digits, a transposition, or a
+# permutation of bands, stacks, rows within a band and columns within a stack have the
+# same solutions up to the same transform. The canonical form picks one representative
+# of every such family, so the cache solves it once.
+#
+# Bands (and stacks) are ordered by the sorted clue counts of their lines, lines within
+# a band by their own clue counts, which neither digit relabeling nor the permutations of
+# the other axis change. Lines or bands with equal counts are tried in every order and the
+# smallest relabeled grid wins, up to max_candidates orders; past that ties keep their
+# original order and equivalent puzzles may miss the cache, but never get a wrong answer.
+
+class Transform:
+    """
+        A mapping from a grid to its canonical form.
+            cells[i] is the box of the original grid that moves to box i, digits maps the
+            digits of the original grid to the canonical ones.
+    """
+
+    __slots__ = ('cells', 'digits')
+
+    def __init__(self, cells, digits):
+        self.cells = cells
+        self.digits = digits
+
+    def apply(self, grid):
+        """
+            Args:
+                grid(string) - A grid in string form, one symbol per box and '.' for empty boxes.
+            Returns:
+                The transformed grid.
+        """
+
+        digits = self.digits
+        return ''.join(digits.get(grid[cell], '.') for cell in self.cells)
+
+    def invert(self, grid):
+        """
+            Args:
+                grid(string) - A transformed grid, e.g. the solution of the canonical puzzle.
+            Returns:
+                The grid mapped back to the boxes and digits of the original grid.
+        """
+
+        digits = dict((new, old) for old, new in self.digits.items())
+        result = [None] * len(grid)
+        for i, cell in enumerate(self.cells):
+            result[cell] = digits.get(grid[i], '.')
+
+        return ''.join(result)
+
+
+def relabel(grid, cells, symbols):
+    """
+        Reorder the boxes of a grid and rename its digits in order of first appearance.
+        Args:
+            grid(string) - A grid in string form.
+            cells(list) - The original box of every box of the result.
+            symbols(string) - The digit symbols of the board.
+        Returns:
+            The relabeled grid and the mapping of the original digits to the new ones.
+    """
+
+    digits = {}
+    result = []
+    for cell in cells:
+        d = grid[cell]
+        if d == '.':
+            result.append('.')
+            continue
+        if d not in digits:
+            digits[d] = symbols[len(digits)]
+        result.append(digits[d])
+
+    # Digits missing from the grid still need a label to map the solution back
+    for d in symbols:
+        if d not in digits:
+            digits[d] = symbols[len(digits)]
+
+    return ''.join(result), digits
+
+
+def tied_orders(items, key):
+    """
+        Sort items by a key, trying every order of the items with equal keys.
+        Args:
+            items(list) - The items to sort.
+            key(function) - The sort key.
+        Returns:
+            The number of orders and a generator of them as lists.
+    """
+
+    groups = [list(group) for _, group in itertools.groupby(sorted(items, key=key), key)]
+    count = math.prod(math.factorial(len(group)) for group in groups)
+
+    def orders():
+        for parts in itertools.product(*(itertools.permutations(group) for group in groups)):
+            yield [item for part in parts for item in part]
+
+    return count, orders()
+
+
+def line_orders(grid, size, box):
+    """
+        The orders of the lines of a grid that sort bands and lines by their clue counts.
+        Args:
+            grid(string) - A grid in string form.
+            size(int) - The side of a square of the board.
+            box(function) - The box of a line and a position along it.
+        Returns:
+            The number of orders and a generator of them as lists of line indexes.
+    """
+
+    side = size * size
+    signatures = []
+    for line in range(side):
+        counts = [sum(grid[box(line, block * size + k)] != '.' for k in range(size)) for block in range(size)]
+        signatures.append((sum(counts), sorted(counts)))
+
+    bands = [list(range(band * size, band * size + size)) for band in range(size)]
+    band_count, band_orders = tied_orders(bands, lambda band: sorted(signatures[line] for line in band))
+    line_counts, inner_orders = zip(*(tied_orders(band, signatures.__getitem__) for band in bands))
+    inner_orders = [list(orders) for orders in inner_orders]
+
+    def orders():
+        for band_order in band_orders:
+            for parts in itertools.product(*(inner_orders[band[0] // size] for band in band_order)):
+                yield [line for part in parts for line in part]
+
+    return band_count * math.prod(line_counts), orders()
+
+
+def canonical_form(grid, topology, max_candidates=64):
+    """
+        Find the canonical form of a grid under the symmetries of its variant.
+            Classic boards allow every symmetry above, other variants only digit relabeling
+            and transposition, which keep their diagonals and windows in place.
+        Args:
+            grid(string) - A grid in string form, one symbol per box and '.' for empty boxes.
+            topology(Topology) - The topology whose symmetries are used.
+            max_candidates(int) - The maximum number of orders tried for tied lines.
+        Returns:
+            The canonical grid and the Transform that maps the grid to it.
+    """
+
+    size = topology.size
+    side = size * size
+    best = None
+
+    for transpose in (False, True):
+        if transpose:
+            box = lambda r, c: c * side + r
+        else:
+            box = lambda r, c: r * side + c
+
+        if topology.name != 'classic':
+            candidates = [(list(range(side)), list(range(side)))]
+        else:
+            row_count, row_orders = line_orders(grid, size, box)
+            col_count, col_orders = line_orders(grid, size, lambda c, r: box(r, c))
+            if row_count * col_count > max_candidates:
+                candidates = [(next(row_orders), next(col_orders))]
+            else:
+                candidates = itertools.product(row_orders, list(col_orders))
+
+        for rows, cols in candidates:
+            cells = [box(r, c) for r in rows for c in cols]
+            key, digits = relabel(grid, cells, topology.digits)
+            if best is None or key < best[0]:
+                best = key, Transform(cells, digits)
+
+    return best
+
+
+#####################################################################################
+# Cache
+
+class SolutionCache:
+    """
+        A size-bounded LRU cache of solutions keyed on the canonical form of the puzzles.
+            With a path the solutions are also kept in a shelve database, so they survive
+            restarts. Puzzles without solution are cached too.
+    """
+
+    def __init__(self, maxsize=4096, path=None, max_candidates=64):
+        """
+            Args:
+                maxsize(int) - The maximum number of solutions kept in memory.
+                path(string) - The file of the shelve database, None to keep the cache in memory only.
+                max_candidates(int) - See canonical_form().
+        """
+
+        self.maxsize = maxsize
+        self.max_candidates = max_candidates
+        self.entries = OrderedDict()
+        self.shelf = shelve.open(path) if path is not None else None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, key):
+        """
+            Look a canonical puzzle up, in memory first and then on disk.
+            Args:
+                key(string) - The cache key, see key().
+            Returns:
+                The canonical solution, '' if the puzzle has none, None if it is not cached.
+        """
+
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        if self.shelf is not None and key in self.shelf:
+            solved = self.shelf[key]
+            self._remember(key, solved)
+            return solved
+
+        return None
+
+    def put(self, key, solved):
+        """
+            Store the solution of a canonical puzzle.
+            Args:
+                key(string) - The cache key, see key().
+                solved(string) - The canonical solution, '' if the puzzle has none.
+        """
+
+        self._remember(key, solved)
+        if self.shelf is not None:
+            self.shelf[key] = solved
+
+    def _remember(self, key, solved):
+        self.entries[key] = solved
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def key(self, grid, variant=None):
+        """
+            Find the cache key of a grid.
+            Args:
+                grid(string) - A grid in string form.
+                variant(string) - The sudoku variant, see solution.solve().
+            Returns:
+                The key and the Transform of the grid to its canonical form.
+        """
+
+        values = solution.grid_values(grid)
+        size = solution.values_topology(values).size
+        topology = get_topology(variant or 'diagonal', size)
+
+        canonical, transform = canonical_form(solution.grid_string(values), topology, self.max_candidates)
+        return '%s:%d:%s' % (variant or 'auto', size, canonical), transform
+
+    def solve(self, grid, variant=None, method='search', trace=None):
+        """
+            Solve a grid through the cache, see solution.solve().
+            Args:
+                grid(string) - A grid in string form.
+                variant(string) - The sudoku variant, see solution.solve().
+                method(string) - The search method, see solution.search().
+                trace(TraceRecorder) - Records the search of the grids missing from the cache,
+                    in their canonical form.
+            Returns:
+                The solved sudoku in dictionary form, or False if no solution exists.
+        """
+
+        key, transform = self.key(grid, variant)
+        solved = self.get(key)
+
+        if solved is None:
+            self.misses += 1
+            values = solution.solve(key.rsplit(':', 1)[1], variant, trace=trace, method=method)
+            solved = solution.grid_string(values) if values else ''
+            self.put(key, solved)
+        else:
+            self.hits += 1
+
+        if not solved:
+            return False
+
+        return solution.grid_values(transform.invert(solved))
+
+    def close(self):
+        """
+            Write the disk database back and close it.
+        """
+
+        if self.shelf is not None:
+            self.shelf.close()
+            self.shelf = None
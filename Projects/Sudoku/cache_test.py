@@ -0,0 +1,70 @@
+import os
+import solution
+import tempfile
+import unittest
+from cache import SolutionCache, canonical_form
+from topology import CLASSIC, DIAGONAL
+
+
+def transform(grid, rows, cols, digits, transpose=False):
+    grid = ''.join(digits.get(grid[r * 9 + c], '.') for r in rows for c in cols)
+    if transpose:
+        grid = ''.join(grid[c * 9 + r] for r in range(9) for c in range(9))
+    return grid
+
+
+class TestSolutionCache(unittest.TestCase):
+    grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+    diagonal_grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+
+    # Swap the last two bands, the first two rows of the first band and the last two stacks
+    rows = [1, 0, 2, 6, 7, 8, 3, 4, 5]
+    cols = [0, 1, 2, 6, 8, 7, 3, 4, 5]
+    digits = dict(zip('123456789', '912345678'))
+
+    def assertSolves(self, values, grid):
+        solved = solution.grid_string(values)
+        self.assertTrue(all(g == '.' or g == s for g, s in zip(grid, solved)))
+        self.assertTrue(all(len(set(values[box] for box in unit)) == 9 for unit in CLASSIC.unitlist))
+
+    def test_canonical_form(self):
+        equivalent = transform(self.grid, self.rows, self.cols, self.digits, transpose=True)
+        key, forward = canonical_form(self.grid, CLASSIC)
+        self.assertEqual(canonical_form(equivalent, CLASSIC)[0], key)
+        self.assertEqual(forward.apply(self.grid), key)
+        self.assertEqual(forward.invert(key), self.grid)
+
+    def test_diagonal_symmetries(self):
+        relabeled = transform(self.diagonal_grid, range(9), range(9), self.digits, transpose=True)
+        self.assertEqual(canonical_form(relabeled, DIAGONAL)[0], canonical_form(self.diagonal_grid, DIAGONAL)[0])
+        swapped = transform(self.diagonal_grid, self.rows, range(9), self.digits)
+        self.assertNotEqual(canonical_form(swapped, DIAGONAL)[0], canonical_form(self.diagonal_grid, DIAGONAL)[0])
+
+    def test_solve(self):
+        cache = SolutionCache()
+        equivalent = transform(self.grid, self.rows, self.cols, self.digits)
+        self.assertSolves(cache.solve(self.grid, 'classic'), self.grid)
+        self.assertSolves(cache.solve(equivalent, 'classic'), equivalent)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.solve(self.diagonal_grid), solution.solve(self.diagonal_grid))
+        self.assertFalse(cache.solve('33' + '.' * 79))
+        self.assertFalse(cache.solve('4' + '.' * 8 + '4' + '.' * 71))
+        self.assertEqual(cache.hits, 2)
+
+    def test_lru(self):
+        cache = SolutionCache(maxsize=1)
+        cache.solve(self.grid, 'classic')
+        cache.solve(self.diagonal_grid, 'classic')
+        cache.solve(self.grid, 'classic')
+        self.assertEqual((len(cache), cache.hits, cache.misses), (1, 0, 3))
+
+    def test_persistence(self):
+        path = os.path.join(tempfile.mkdtemp(), 'solutions')
+        with SolutionCache(path=path) as cache:
+            expected = cache.solve(self.grid, 'classic')
+        with SolutionCache(path=path) as cache:
+            self.assertEqual(cache.solve(self.grid, 'classic'), expected)
+            self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+class DancingLinks:
+    """
+        Knuth's Algorithm X over a sparse 0/1 matrix stored as dancing links.
+            The links are kept in flat lists indexed by node: node 0 is the root, nodes
+            1..columns are the column headers and the remaining nodes are the 1s of the rows.
+    """
+
+    def __init__(self, columns, rows):
+        """
+            Args:
+                columns(int) - The number of columns, every one of them must be covered exactly once.
+                rows(list) - The rows as (row id, list of column indexes) pairs.
+        """
+
+        headers = columns + 1
+        self.L = [i - 1 for i in range(headers)]
+        self.R = [i + 1 for i in range(headers)]
+        self.L[0] = columns
+        self.R[columns] = 0
+        self.U = list(range(headers))
+        self.D = list(range(headers))
+        self.C = list(range(headers))
+        self.row = [None] * headers
+        self.size = [0] * headers
+
+        for row_id, row_columns in rows:
+            first = None
+            for column in row_columns:
+                c = column + 1
+                node = len(self.C)
+                self.C.append(c)
+                self.row.append(row_id)
+
+                # Insert at the bottom of the column
+                self.U.append(self.U[c])
+                self.D.append(c)
+                self.D[self.U[c]] = node
+                self.U[c] = node
+                self.size[c] += 1
+
+                # Insert at the end of the row
+                if first is None:
+                    first = node
+                    self.L.append(node)
+                    self.R.append(node)
+                else:
+                    self.L.append(self.L[first])
+                    self.R.append(first)
+                    self.R[self.L[first]] = node
+                    self.L[first] = node
+
+    def cover(self, c):
+        L, R, U, D, C, size = self.L, self.R, self.U, self.D, self.C, self.size
+
+        R[L[c]] = R[c]
+        L[R[c]] = L[c]
+
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                U[D[j]] = U[j]
+                D[U[j]] = D[j]
+                size[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, c):
+        L, R, U, D, C, size = self.L, self.R, self.U, self.D, self.C, self.size
+
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                size[C[j]] += 1
+                U[D[j]] = j
+                D[U[j]] = j
+                j = L[j]
+            i = U[i]
+
+        R[L[c]] = c
+        L[R[c]] = c
+
+    def solutions(self):
+        """
+            Enumerate the exact covers of the matrix.
+            Returns:
+                A generator of lists of row ids. The matrix is restored once the generator is exhausted.
+        """
+
+        R, D, C, size = self.R, self.D, self.C, self.size
+
+        if R[0] == 0:
+            yield []
+            return
+
+        # Branch on the column with the fewest rows left
+        c = R[0]
+        best = size[c]
+        j = R[c]
+        while j != 0 and best > 1:
+            if size[j] < best:
+                c, best = j, size[j]
+            j = R[j]
+
+        if best == 0:
+            return
+
+        self.cover(c)
+
+        r = D[c]
+        while r != c:
+            j = R[r]
+            while j != r:
+                self.cover(C[j])
+                j = R[j]
+
+            for rest in self.solutions():
+                yield [self.row[r]] + rest
+
+            j = self.L[r]
+            while j != r:
+                self.uncover(C[j])
+                j = self.L[j]
+            r = D[r]
+
+        self.uncover(c)
+
+
+def exact_cover(sudoku):
+    """
+        Build the exact cover matrix of a board.
+            There is one column per box (it holds exactly one digit) and one column per unit and digit
+            (the digit appears exactly once in the unit), so the diagonal units of a variant simply
+            add their own columns. There is one row per candidate digit of every box.
+        Args:
+            sudoku(Board) - The sudoku board.
+        Returns:
+            The DancingLinks matrix, its row ids being (cell, digit bit) pairs.
+    """
+
+    topology = sudoku.topology
+    n = len(topology.digits)
+    cells = len(topology.boxes)
+    unit_index = dict((unit, u) for u, unit in enumerate(topology.unit_cells))
+
+    rows = []
+    for cell, mask in enumerate(sudoku.cells):
+        for d in range(n):
+            if mask & (1 << d):
+                columns = [cell] + [cells + unit_index[unit] * n + d for unit in topology.cell_units[cell]]
+                rows.append(((cell, 1 << d), columns))
+
+    return DancingLinks(cells + len(topology.unit_cells) * n, rows)
+
+
+def search(sudoku):
+    """
+        Solve a board with Dancing Links instead of propagation and copies.
+        Args:
+            sudoku(Board) - The sudoku board, left untouched.
+        Returns:
+            The solved Board, or False if the board has no solution.
+    """
+
+    for rows in exact_cover(sudoku).solutions():
+        solved = sudoku.copy()
+        for cell, bit in rows:
+            solved.cells[cell] = bit
+        solved.places = solved.index_places()
+        return solved
+
+    return False
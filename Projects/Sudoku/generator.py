@@ -0,0 +1,238 @@
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import board
+from board import Board, mask_string, popcount
+from topology import get_topology, variants
+
+# Difficulties of generated puzzles, from the easiest
+difficulties = ('easy', 'medium', 'hard')
+
+
+#####################################################################################
+# Full grids
+
+def random_solution(topology, rng):
+    """
+        Build a random solved board.
+            A few boxes get random digits, then search completes the board. Seeds that leave
+            the board without solution are drawn again.
+        Args:
+            topology(Topology) - The unit and peer tables of the sudoku variant.
+            rng(Random) - The source of randomness.
+        Returns:
+            The solved Board.
+    """
+
+    side = len(topology.digits)
+
+    while True:
+        sudoku = Board(topology)
+        for cell in rng.sample(range(len(topology.boxes)), side):
+            mask = sudoku.cells[cell]
+            bit = 1 << rng.choice([d for d in range(side) if mask >> d & 1])
+            if not board.assign(sudoku, cell, bit):
+                break
+        else:
+            solved = board.search(sudoku)
+            if solved:
+                return solved
+
+
+#####################################################################################
+# Puzzles
+#
+# Clues are taken out of a solved board one at a time in random order. A clue can go when
+# the puzzle without it has no solution with another digit in its box: one search that
+# fails instead of counting two solutions. Once a clue has to stay it stays for good, as
+# removing more clues only adds solutions, so a single pass gives a minimal puzzle.
+
+def grade(cells, topology):
+    """
+        Rate a puzzle by the propagation it needs.
+        Args:
+            cells(list) - The candidate masks of the puzzle.
+            topology(Topology) - The unit and peer tables of the sudoku variant.
+        Returns:
+            'easy' if elimination and only choice solve it, 'medium' if the default strategies
+            solve it without search, 'hard' if it takes a search, see difficulties.
+    """
+
+    if board.reduce_puzzle(Board(topology, cells, strategies=())).is_solved():
+        return 'easy'
+
+    if board.reduce_puzzle(Board(topology, cells)).is_solved():
+        return 'medium'
+
+    return 'hard'
+
+
+def is_unique_without(cells, solved, cell, topology):
+    """
+        Check that a puzzle keeps its single solution when a clue is removed.
+        Args:
+            cells(list) - The candidate masks of a puzzle with a single solution.
+            solved(array) - The candidate masks of that solution.
+            cell(int) - The box of the clue removed.
+            topology(Topology) - The unit and peer tables of the sudoku variant.
+        Returns:
+            True if no other digit fits the box.
+    """
+
+    others = list(cells)
+    others[cell] = topology.all_digits & ~solved[cell]
+    return board.search(Board(topology, others)) is False
+
+
+def dig(solved, rng, clues=0, difficulty=None):
+    """
+        Remove clues from a solved board while its solution stays unique.
+        Args:
+            solved(Board) - A solved board.
+            rng(Random) - The source of randomness.
+            clues(int) - Stop once the puzzle is down to this number of clues.
+            difficulty(string) - Keep the clues whose removal would make the puzzle harder
+                than this, see difficulties.
+        Returns:
+            The candidate masks of the puzzle, all digits in the empty boxes.
+    """
+
+    topology = solved.topology
+
+    # Nothing is harder than the last difficulty
+    limit = difficulties.index(difficulty) if difficulty is not None else len(difficulties) - 1
+
+    cells = list(solved.cells)
+    count = len(cells)
+    for cell in rng.sample(range(len(cells)), len(cells)):
+        if count <= clues:
+            break
+
+        cells[cell] = topology.all_digits
+        if (is_unique_without(cells, solved.cells, cell, topology) and
+                (limit == len(difficulties) - 1 or difficulties.index(grade(cells, topology)) <= limit)):
+            count -= 1
+        else:
+            cells[cell] = solved.cells[cell]
+
+    return cells
+
+
+def puzzle_string(cells, topology):
+    """
+        Args:
+            cells(list) - The candidate masks of a puzzle.
+            topology(Topology) - The unit and peer tables of the sudoku variant.
+        Returns:
+            The puzzle in string form, '.' for the boxes that are not clues.
+    """
+
+    digits = topology.digits
+    return ''.join(mask_string(m, digits) if popcount(m) == 1 else '.' for m in cells)
+
+
+def generate(variant='classic', clues=0, difficulty=None, seed=None, size=3, attempts=100):
+    """
+        Generate a random puzzle with a single solution.
+        Args:
+            variant(string) - The sudoku variant, see topology.variants.
+            clues(int) - The number of clues to go down to. Puzzles stop short of it when no
+                clue can be removed without losing uniqueness.
+            difficulty(string) - The exact difficulty of the puzzle, see grade(), any by default.
+            seed(object) - Seed of the random numbers, e.g. an int or a string. The same seed
+                generates the same puzzle.
+            size(int) - The side of a square of the board, 3 for 9x9.
+            attempts(int) - The number of solved boards tried for the difficulty.
+        Returns:
+            The puzzle in string form, or False if no attempt reached the difficulty.
+    """
+
+    if difficulty is not None and difficulty not in difficulties:
+        raise ValueError("Unknown difficulty: %s" % difficulty)
+
+    topology = get_topology(variant, size)
+    rng = random.Random(seed)
+
+    for attempt in range(attempts):
+        cells = dig(random_solution(topology, rng), rng, clues, difficulty)
+        if difficulty is None or grade(cells, topology) == difficulty:
+            return puzzle_string(cells, topology)
+
+    return False
+
+
+def _generate_seeded(args):
+    seed, index, variant, clues, difficulty, size = args
+    return generate(variant, clues, difficulty, '%s:%d' % (seed, index), size)
+
+
+def generate_many(count, variant='classic', clues=0, difficulty=None, seed=0, size=3, workers=None):
+    """
+        Generate puzzles in a pool of worker processes.
+            Puzzle i is generated from the seed '<seed>:<i>', so the puzzles only depend on
+            the seed, not on the number of workers.
+        Args:
+            count(int) - The number of puzzles.
+            variant(string) - The sudoku variant, see generate().
+            clues(int) - The number of clues to go down to, see generate().
+            difficulty(string) - The difficulty of the puzzles, see generate().
+            seed(object) - The seed of the whole run.
+            size(int) - The side of a square of the board.
+            workers(int) - The number of worker processes, defaults to the number of CPUs.
+        Returns:
+            A generator of puzzles in string form, in order, False for the ones that missed the difficulty.
+    """
+
+    workers = workers or os.cpu_count() or 1
+    jobs = ((seed, index, variant, clues, difficulty, size) for index in range(count))
+
+    if workers < 2:
+        yield from map(_generate_seeded, jobs)
+        return
+
+    with ProcessPoolExecutor(workers) as executor:
+        yield from executor.map(_generate_seeded, jobs, chunksize=max(1, min(16, count // (4 * workers))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='generator', description='Generate sudoku puzzles with a single solution.')
+    parser.add_argument('-n', '--count', type=int, default=1, help='number of puzzles')
+    parser.add_argument('--variant', choices=sorted(variants), default='classic', help='sudoku variant')
+    parser.add_argument('--clues', type=int, default=0, help='number of clues to go down to')
+    parser.add_argument('--difficulty', choices=difficulties, help='difficulty of the puzzles, any by default')
+    parser.add_argument('--size', type=int, default=3, help='side of a square of the board, 3 for 9x9')
+    parser.add_argument('--seed', default='0', help='seed of the run, the same seed gives the same puzzles')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='worker processes, defaults to the CPUs')
+    parser.add_argument('-o', '--output', default='-', help='file for the puzzles, - for stdout')
+    args = parser.parse_args(argv)
+
+    target = sys.stdout if args.output == '-' else open(args.output, 'w')
+
+    start = time.perf_counter()
+    count = missed = 0
+
+    try:
+        for grid in generate_many(args.count, args.variant, args.clues, args.difficulty, args.seed, args.size,
+                                  args.workers):
+            if grid:
+                count += 1
+                target.write(grid + '\n')
+            else:
+                missed += 1
+    finally:
+        if target is not sys.stdout:
+            target.close()
+
+    elapsed = time.perf_counter() - start
+    print('Generated %d puzzles (%d missed the difficulty) in %.2fs, %.1f puzzles/s'
+          % (count, missed, elapsed, count / elapsed if elapsed else 0.0), file=sys.stderr)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
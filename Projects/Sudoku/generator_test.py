@@ -0,0 +1,42 @@
+import generator
+import random
+import solution
+import unittest
+from topology import CLASSIC, DIAGONAL
+
+
+class TestGenerator(unittest.TestCase):
+
+    def cells(self, grid, topology):
+        return [topology.all_digits if c == '.' else topology.digit_bits[c] for c in grid]
+
+    def test_random_solution(self):
+        for topology in (CLASSIC, DIAGONAL):
+            solved = generator.random_solution(topology, random.Random(1))
+            self.assertTrue(all(sum(solved.cells[c] for c in unit) == topology.all_digits
+                                for unit in topology.unit_cells))
+
+    def test_unique_and_seeded(self):
+        for variant in ('classic', 'diagonal'):
+            grid = generator.generate(variant, seed=7)
+            self.assertEqual(solution.count_solutions(grid, 2, variant), 1)
+            self.assertEqual(generator.generate(variant, seed=7), grid)
+        self.assertNotEqual(generator.generate(seed=8), grid)
+
+    def test_clue_target(self):
+        grid = generator.generate(clues=40, seed=3)
+        self.assertEqual(81 - grid.count('.'), 40)
+        self.assertEqual(solution.count_solutions(grid, 2, 'classic'), 1)
+
+    def test_difficulty(self):
+        grid = generator.generate(difficulty='easy', seed=2)
+        self.assertEqual(generator.grade(self.cells(grid, CLASSIC), CLASSIC), 'easy')
+        self.assertRaises(ValueError, generator.generate, difficulty='fiendish')
+
+    def test_workers_do_not_change_puzzles(self):
+        self.assertEqual(list(generator.generate_many(4, clues=45, seed='run', workers=2)),
+                         list(generator.generate_many(4, clues=45, seed='run', workers=1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
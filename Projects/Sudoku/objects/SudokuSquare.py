@@ -2,6 +2,14 @@ import pygame
 
 from pygame import *
 
+# Size of a square on the board, in pixels
+TILE_SIZE = (45, 40)
+
+# The font and the square images, made once by get_font() and get_tile()
+_font = None
+_tiles = {}
+
+
 def AAfilledRoundedRect(surface,rect,color,radius=0.4):
 
     """
@@ -13,12 +21,26 @@ def AAfilledRoundedRect(surface,rect,color,radius=0.4):
     radius  : 0 <= radius <= 1
     """
 
-    rect         = Rect(rect)
+    rect = Rect(rect)
+    return surface.blit(roundedRect(rect.size,color,radius),rect.topleft)
+
+
+def roundedRect(size,color,radius=0.4):
+
+    """
+    roundedRect(size,color,radius=0.4)
+
+    size    : width and height
+    color   : rgb or rgba
+    radius  : 0 <= radius <= 1
+
+    Returns the anti-aliased rounded rectangle on a transparent surface.
+    """
+
+    rect         = Rect((0,0),size)
     color        = Color(*color)
     alpha        = color.a
     color.a      = 0
-    pos          = rect.topleft
-    rect.topleft = 0,0
     rectangle    = Surface(rect.size,SRCALPHA)
 
     circle       = Surface([min(rect.size)*3]*2,SRCALPHA)
@@ -39,22 +61,35 @@ def AAfilledRoundedRect(surface,rect,color,radius=0.4):
     rectangle.fill(color,special_flags=BLEND_RGBA_MAX)
     rectangle.fill((255,255,255,alpha),special_flags=BLEND_RGBA_MIN)
 
-    return surface.blit(rectangle,pos)
+    return rectangle
+
+
+def get_font():
+    """The font of the digits, looked up once."""
+    global _font
+    if _font is None:
+        _font = pygame.font.SysFont('opensans', 21)
+    return _font
+
+
+def get_tile(number=None):
+    """The image of a square showing number, None for a blank square, rendered once."""
+    tile = _tiles.get(number)
+    if tile is None:
+        tile = roundedRect(TILE_SIZE, (2, 204, 186) if number is not None else (255, 255, 255))
+        if number is not None:
+            tile.blit(get_font().render(str(number), 1, (255, 255, 255)), (17, 4))
+        if pygame.display.get_surface() is not None:
+            tile = tile.convert_alpha()
+        _tiles[number] = tile
+    return tile
 
 class SudokuSquare:
     """A sudoku square class."""
     def __init__(self, number=None, offsetX=0, offsetY=0, edit="Y", xLoc=0, yLoc=0):
-        if number != None:
-            number = str(number)
-            self.color = (2, 204, 186)
-        else:
-            number = ""
-            self.color = (255, 255, 255)
-        # print("FONTS", pygame.font.get_fonts())
-        self.font = pygame.font.SysFont('opensans', 21)
-        self.text = self.font.render(number, 1, (255, 255, 255))
-        self.textpos = self.text.get_rect()
-        self.textpos = self.textpos.move(offsetX + 17, offsetY + 4)
+        self.number = number
+        self.font = get_font()
+        self.rect = Rect((offsetX, offsetY), TILE_SIZE)
 
         # self.collide = pygame.Surface((25, 22))
         # self.collide = self.collide.convert()
@@ -70,12 +105,22 @@ class SudokuSquare:
         self.offsetX = offsetX
         self.offsetY = offsetY
 
-    def draw(self):
+    def draw(self, background=None):
+        """Blit the square on the screen, over the patch of background it covers if given, and return its rect."""
         screen = pygame.display.get_surface()
-        AAfilledRoundedRect(screen, (self.offsetX, self.offsetY, 45, 40), self.color)
+        if background is not None:
+            screen.blit(background, self.rect, self.rect)
 
         # screen.blit(self.collide, self.collideRect)
-        screen.blit(self.text, self.textpos)
+        return screen.blit(get_tile(self.number), self.rect)
+
+
+    def show(self, number):
+        """Switch the square to number, returns True if it changed and needs a draw()."""
+        if number == self.number:
+            return False
+        self.number = number
+        return True
 
 
     def checkCollide(self, collision):
@@ -105,7 +150,9 @@ class SudokuSquare:
         
         if self.edit == "Y":
             self.text = self.font.render(number, 1, (0, 0, 0))
-            self.draw()
+            screen = pygame.display.get_surface()
+            screen.blit(get_tile(None), self.rect)
+            screen.blit(self.text, self.rect.move(17, 4))
             return 0
         else:
             return 1
@@ -0,0 +1,579 @@
+import argparse
+import math
+import mmap
+import struct
+import sys
+
+import numpy as np
+
+import batch
+import pipeline
+import solution
+from topology import get_topology, labels, variants
+
+
+#####################################################################################
+# Packed corpus format
+#
+# A corpus file is a 32-byte header followed by fixed-size records, so record i starts at
+# 32 + i * record_size and the number of records follows from the size of the file.
+#
+# Header: magic 'SDKP', format version, board size (3 for 9x9), flags, record size
+# (little-endian uint16) and the variant name, NUL-padded to 16 bytes and empty when the
+# solver picks the variant like solution.solve() does.
+#
+# Record: with the SOLUTIONS flag, a status byte (UNSOLVED, SOLVED or NO_SOLUTION) and the
+# packed solution follow the givens.
+#   Givens: one number per box, 0 for an empty box and d for the d-th digit, written with
+#   just enough bits (4 bits for 9x9 boards, 5 for 16x16) most significant bit first.
+#   Solution: the digits minus one read as base-n numbers, grouped in the number of boxes
+#   per group that takes the fewest bytes (three boxes in 10 bits for 9x9 boards).
+
+MAGIC = b'SDKP'
+VERSION = 1
+HEADER = struct.Struct('<4sBBBxH16s6x')
+
+# Header flags
+SOLUTIONS = 1
+
+# Record status, with the SOLUTIONS flag
+UNSOLVED = 0
+SOLVED = 1
+NO_SOLUTION = 2
+
+
+class Layout:
+    """
+        The sizes of the parts of a record for a board size.
+    """
+
+    __slots__ = ('size', 'cells', 'side', 'given_bits', 'given_bytes', 'group', 'group_bits', 'groups',
+                 'solution_bytes', 'solutions', 'record_size')
+
+    def __init__(self, size, solutions=False):
+        """
+            Args:
+                size(int) - The side of a square of the board, 3 for 9x9.
+                solutions(bool) - Whether records hold a status and a solution.
+        """
+
+        labels(size)
+        side = size * size
+
+        self.size = size
+        self.side = side
+        self.cells = side * side
+        self.given_bits = side.bit_length()
+        self.given_bytes = -(-self.cells * self.given_bits // 8)
+
+        def solution_bytes(group):
+            groups = -(-self.cells // group)
+            return -(-groups * (side ** group - 1).bit_length() // 8)
+
+        groups = [group for group in range(1, 5) if side ** group <= 1 << 16]
+        self.group = min(groups, key=lambda group: (solution_bytes(group), group))
+        self.group_bits = (side ** self.group - 1).bit_length()
+        self.groups = -(-self.cells // self.group)
+        self.solution_bytes = solution_bytes(self.group)
+        self.solutions = solutions
+        self.record_size = self.given_bytes + (1 + self.solution_bytes if solutions else 0)
+
+
+#####################################################################################
+# Packing
+
+def _chunk(bits):
+    """
+        Returns:
+            The number of integers of the given bits that fill a whole number of bytes, and
+            that number of bytes.
+    """
+
+    count = math.lcm(bits, 8) // bits
+    return count, count * bits // 8
+
+
+def _pack_bits(values, bits):
+    """
+        Pack rows of small integers with a fixed number of bits each, most significant bit first.
+        Args:
+            values(array) - An (N, k) array of integers below 2 ** bits, bits being at most 16.
+            bits(int) - The bits per integer.
+        Returns:
+            An (N, ceil(k * bits / 8)) uint8 array.
+    """
+
+    rows, count = np.shape(values)
+    size = -(-count * bits // 8)
+
+    # Two digits per byte, high nibble first
+    if bits == 4:
+        values = np.asarray(values, dtype=np.uint8)
+        if count % 2:
+            values = np.pad(values, ((0, 0), (0, 1)))
+        return values[:, 0::2] << 4 | values[:, 1::2]
+
+    # Integers are joined into 64-bit words of whole bytes, e.g. four 10-bit integers in 5 bytes
+    per, width = _chunk(bits)
+    if width > 8:
+        planes = np.unpackbits(np.asarray(values, dtype='>u2').view(np.uint8).reshape(rows, count, 2), axis=2)
+        return np.packbits(planes[:, :, 16 - bits:].reshape(rows, -1), axis=1)
+
+    chunks = -(-count // per)
+    values = np.pad(np.asarray(values, dtype=np.uint64), ((0, 0), (0, chunks * per - count)))
+    values = values.reshape(rows, chunks, per)
+
+    words = values[:, :, 0]
+    for i in range(1, per):
+        words = words << np.uint64(bits) | values[:, :, i]
+
+    data = words.astype('>u8').view(np.uint8).reshape(rows, chunks, 8)[:, :, 8 - width:]
+    return data.reshape(rows, -1)[:, :size]
+
+
+def _unpack_bits(data, count, bits):
+    """
+        Unpack rows packed by _pack_bits().
+        Args:
+            data(array) - An (N, bytes) uint8 array.
+            count(int) - The number of integers per row.
+            bits(int) - The bits per integer.
+        Returns:
+            An (N, count) array of integers.
+    """
+
+    rows = len(data)
+
+    if bits == 4:
+        values = np.empty((rows, data.shape[1] * 2), dtype=np.uint8)
+        values[:, 0::2] = data >> 4
+        values[:, 1::2] = data & 15
+        return values[:, :count]
+
+    per, width = _chunk(bits)
+    if width > 8:
+        planes = np.zeros((rows, count, 16), dtype=np.uint8)
+        planes[:, :, 16 - bits:] = np.unpackbits(data, axis=1, count=count * bits).reshape(rows, count, bits)
+        return np.packbits(planes, axis=2).view('>u2')[:, :, 0].astype(np.uint16)
+
+    chunks = -(-count // per)
+    words = np.zeros((rows, chunks, 8), dtype=np.uint8)
+    padded = np.zeros((rows, chunks * width), dtype=np.uint8)
+    padded[:, :data.shape[1]] = data
+    words[:, :, 8 - width:] = padded.reshape(rows, chunks, width)
+    words = words.view('>u8')[:, :, 0].astype(np.uint64)
+
+    values = np.empty((rows, chunks, per), dtype=np.uint16)
+    mask = np.uint64((1 << bits) - 1)
+    for i in range(per - 1, -1, -1):
+        values[:, :, i] = words & mask
+        words = words >> np.uint64(bits)
+
+    return values.reshape(rows, -1)[:, :count]
+
+
+def pack_givens(digits, layout):
+    """
+        Args:
+            digits(array) - An (N, cells) array of digits, 0 for empty boxes.
+            layout(Layout) - The record layout of the board size.
+        Returns:
+            An (N, given_bytes) uint8 array.
+    """
+
+    return _pack_bits(digits, layout.given_bits)
+
+
+def unpack_givens(data, layout):
+    """
+        Args:
+            data(array) - An (N, given_bytes) uint8 array, see pack_givens().
+            layout(Layout) - The record layout of the board size.
+        Returns:
+            An (N, cells) uint8 array of digits, 0 for empty boxes.
+    """
+
+    return _unpack_bits(data, layout.cells, layout.given_bits).astype(np.uint8)
+
+
+def pack_solutions(digits, layout):
+    """
+        Args:
+            digits(array) - An (N, cells) array of solved digits, from 1 to n. Rows of zeros are
+                packed as rows of ones, the record status tells them apart.
+            layout(Layout) - The record layout of the board size.
+        Returns:
+            An (N, solution_bytes) uint8 array.
+    """
+
+    values = np.maximum(np.asarray(digits, dtype=np.uint16), 1) - 1
+    padding = layout.groups * layout.group - layout.cells
+    values = np.pad(values, ((0, 0), (0, padding))).reshape(len(values), layout.groups, layout.group)
+
+    numbers = values[:, :, -1]
+    for i in range(layout.group - 2, -1, -1):
+        numbers = numbers * layout.side + values[:, :, i]
+
+    return _pack_bits(numbers, layout.group_bits)
+
+
+def unpack_solutions(data, layout):
+    """
+        Args:
+            data(array) - An (N, solution_bytes) uint8 array, see pack_solutions().
+            layout(Layout) - The record layout of the board size.
+        Returns:
+            An (N, cells) uint8 array of digits.
+    """
+
+    numbers = _unpack_bits(data, layout.groups, layout.group_bits)
+
+    values = np.empty((len(data), layout.groups, layout.group), dtype=np.uint8)
+    for i in range(layout.group):
+        values[:, :, i] = numbers % layout.side + 1
+        numbers = numbers // layout.side
+
+    return values.reshape(len(data), -1)[:, :layout.cells]
+
+
+#####################################################################################
+# Grid strings
+
+def grids_to_digits(grids, size=3):
+    """
+        Convert grids in the string form of solution.grid_values() into digit arrays.
+        Args:
+            grids(list) - Grids in string form, '.' or '0' for empty boxes.
+            size(int) - The side of a square of the board.
+        Returns:
+            An (N, cells) uint8 array of digits, 0 for empty boxes.
+    """
+
+    layout = Layout(size)
+    if any(len(grid) != layout.cells for grid in grids):
+        raise ValueError("The length of every grid must be %d" % layout.cells)
+
+    table = np.full(256, 255, dtype=np.uint8)
+    table[ord('.')] = table[ord('0')] = 0
+    for i, symbol in enumerate(labels(size)[2]):
+        table[ord(symbol)] = i + 1
+
+    codes = np.frombuffer(''.join(grids).encode('latin-1'), dtype=np.uint8)
+    digits = table[codes].reshape(-1, layout.cells)
+    if (digits == 255).any():
+        raise ValueError("Grids may only hold the digits of the board, '.' and '0'")
+
+    return digits
+
+
+def digits_to_grids(digits, size=3):
+    """
+        Convert digit arrays back into grids in string form.
+        Args:
+            digits(array) - An (N, cells) array of digits, 0 for empty boxes.
+            size(int) - The side of a square of the board.
+        Returns:
+            A list of grids in string form, '.' for empty boxes.
+    """
+
+    cells = size ** 4
+    table = np.frombuffer(('.' + labels(size)[2]).encode('ascii'), dtype=np.uint8)
+    text = table[np.asarray(digits)].tobytes().decode('ascii')
+
+    return [text[i:i + cells] for i in range(0, len(text), cells)]
+
+
+#####################################################################################
+# Files
+
+class Writer:
+    """
+        Append records to a new corpus file.
+    """
+
+    def __init__(self, path, variant=None, size=3, solutions=False):
+        """
+            Args:
+                path(string) - The corpus file, overwritten.
+                variant(string) - The sudoku variant, None to let the solver pick it.
+                size(int) - The side of a square of the board.
+                solutions(bool) - Whether records hold a status and a solution.
+        """
+
+        if variant is not None and variant not in variants:
+            raise ValueError("Unknown sudoku variant: %s" % variant)
+
+        self.layout = Layout(size, solutions)
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, size, SOLUTIONS if solutions else 0, self.layout.record_size,
+                                    (variant or '').encode('ascii')))
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, digits, solutions=None, status=None):
+        """
+            Write a batch of records.
+            Args:
+                digits(array) - An (N, cells) array of givens, 0 for empty boxes, see grids_to_digits().
+                solutions(array) - An (N, cells) array of solved digits, all zeros for the puzzles
+                    without solution. Required when the corpus holds solutions.
+                status(array) - The (N,) status of the records, by default SOLVED for the non-zero
+                    solutions and NO_SOLUTION for the others.
+        """
+
+        layout = self.layout
+        parts = [pack_givens(digits, layout)]
+
+        if layout.solutions:
+            solutions = np.asarray(solutions)
+            if status is None:
+                status = np.where(solutions.any(axis=1), SOLVED, NO_SOLUTION)
+            parts[:0] = [np.asarray(status, dtype=np.uint8)[:, None]]
+            parts.append(pack_solutions(solutions, layout))
+
+        records = np.hstack(parts)
+        self.file.write(records.tobytes())
+        self.count += len(records)
+
+    def write_grids(self, grids, solved=None):
+        """
+            Write a batch of records from grids in string form.
+            Args:
+                grids(list) - The puzzles in string form.
+                solved(list) - The solutions in string form, None for the puzzles without solution.
+        """
+
+        size = self.layout.size
+        solutions = None
+        if solved is not None:
+            solutions = grids_to_digits([s or '.' * self.layout.cells for s in solved], size)
+
+        self.write(grids_to_digits(grids, size), solutions)
+
+    def close(self):
+        self.file.close()
+
+
+class Corpus:
+    """
+        A corpus file mapped in memory.
+            records is a zero-copy (N, record_size) uint8 view of the file, the other accessors
+            unpack the records they are asked for only.
+    """
+
+    def __init__(self, path):
+        """
+            Args:
+                path(string) - The corpus file.
+        """
+
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.map) < HEADER.size:
+            raise ValueError("Not a packed sudoku corpus: %s" % path)
+
+        magic, version, size, flags, record_size, variant = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError("Not a packed sudoku corpus: %s" % path)
+        if version != VERSION:
+            raise ValueError("Unsupported corpus version: %d" % version)
+
+        self.layout = Layout(size, bool(flags & SOLUTIONS))
+        if record_size != self.layout.record_size:
+            raise ValueError("Corrupt corpus header: %s" % path)
+
+        self.size = size
+        self.variant = variant.rstrip(b'\0').decode('ascii') or None
+        self.records = np.frombuffer(self.map, dtype=np.uint8, offset=HEADER.size,
+                                     count=(len(self.map) - HEADER.size) // record_size * record_size)
+        self.records = self.records.reshape(-1, record_size)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _givens(self, records):
+        start = 1 if self.layout.solutions else 0
+        return records[:, start:start + self.layout.given_bytes]
+
+    def digits(self, start=0, stop=None):
+        """
+            Args:
+                start(int) - The first record.
+                stop(int) - The record after the last one, the end of the corpus by default.
+            Returns:
+                An (N, cells) uint8 array of the givens of the records, 0 for empty boxes.
+        """
+
+        return unpack_givens(self._givens(self.records[start:stop]), self.layout)
+
+    def status(self, start=0, stop=None):
+        """
+            Returns:
+                A zero-copy view of the (N,) status of the records, see digits() for the arguments.
+        """
+
+        if not self.layout.solutions:
+            raise ValueError("The corpus holds no solutions")
+
+        return self.records[start:stop, 0]
+
+    def solutions(self, start=0, stop=None):
+        """
+            Returns:
+                An (N, cells) uint8 array of the solutions of the records, all zeros for the
+                records without one, see digits() for the arguments.
+        """
+
+        status = self.status(start, stop)
+        solutions = unpack_solutions(self.records[start:stop, 1 + self.layout.given_bytes:], self.layout)
+        solutions[status != SOLVED] = 0
+
+        return solutions
+
+    def grid(self, i):
+        """
+            Args:
+                i(int) - The index of the record.
+            Returns:
+                The puzzle in the string form of solution.grid_values().
+        """
+
+        i = range(len(self))[i]
+        return digits_to_grids(self.digits(i, i + 1), self.size)[0]
+
+    def batches(self, batch_size=4096):
+        """
+            Walk the corpus in batches.
+            Args:
+                batch_size(int) - The number of records per batch.
+            Returns:
+                A generator of (start, digits) pairs, see digits().
+        """
+
+        for start in range(0, len(self), batch_size):
+            yield start, self.digits(start, start + batch_size)
+
+    def close(self):
+        """
+            Unmap the file. The views handed out by records and status() must be gone.
+        """
+
+        self.records = None
+        self.map.close()
+
+
+def solve_digits(digits, variant=None, size=3):
+    """
+        Solve a batch of puzzles in digit form.
+            9x9 boards are solved with the vectorized propagation of batch.py, other sizes one
+            at a time with solution.solve().
+        Args:
+            digits(array) - An (N, cells) array of givens, 0 for empty boxes.
+            variant(string) - The sudoku variant, see solution.solve().
+            size(int) - The side of a square of the board.
+        Returns:
+            An (N, cells) uint8 array of solved digits, all zeros for the puzzles without solution.
+    """
+
+    if size == 3:
+        return batch.solve_candidates(batch.digits_to_tensor(digits), variant and get_topology(variant))
+
+    solved = []
+    for grid in digits_to_grids(digits, size):
+        values = solution.solve(grid, variant)
+        solved.append(solution.grid_string(values) if values else '.' * len(grid))
+
+    return grids_to_digits(solved, size)
+
+
+def solve_file(source, target, batch_size=4096):
+    """
+        Solve every puzzle of a corpus into a new corpus with solutions.
+        Args:
+            source(string) - The corpus file to solve.
+            target(string) - The corpus file written.
+            batch_size(int) - The number of puzzles solved at once.
+        Returns:
+            The number of puzzles without solution.
+    """
+
+    unsolved = 0
+    with Corpus(source) as corpus, Writer(target, corpus.variant, corpus.size, solutions=True) as writer:
+        for start, digits in corpus.batches(batch_size):
+            solutions = solve_digits(digits, corpus.variant, corpus.size)
+            unsolved += int((~solutions.any(axis=1)).sum())
+            writer.write(digits, solutions)
+
+    return unsolved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='packed', description='Convert and solve packed sudoku corpora.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    pack = commands.add_parser('pack', help='pack a text file of grids')
+    pack.add_argument('input', help='file with the grids, - for stdin')
+    pack.add_argument('output', help='corpus file written')
+    pack.add_argument('--format', choices=pipeline.formats, help='defaults to the input file extension')
+    pack.add_argument('--field', help='CSV column or JSON key of the grids')
+    pack.add_argument('--variant', choices=sorted(variants), help='sudoku variant, picked by the solver by default')
+    pack.add_argument('--size', type=int, default=3, help='side of a square of the board, 3 for 9x9')
+
+    unpack = commands.add_parser('unpack', help='write the grids of a corpus one per line')
+    unpack.add_argument('input', help='corpus file')
+    unpack.add_argument('--solutions', action='store_true', help='write the solutions instead of the puzzles')
+
+    solve = commands.add_parser('solve', help='solve a corpus into a corpus with solutions')
+    solve.add_argument('input', help='corpus file')
+    solve.add_argument('output', help='corpus file written')
+    solve.add_argument('-b', '--batch-size', type=int, default=4096, help='puzzles solved at once')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'pack':
+        field = int(args.field) if args.field and args.field.isdigit() else args.field
+        source = sys.stdin if args.input == '-' else open(args.input, newline='')
+        try:
+            grids = pipeline.read_puzzles(source, args.format or pipeline.guess_format(args.input), field)
+            with Writer(args.output, args.variant, args.size) as writer:
+                chunk = []
+                for grid in grids:
+                    chunk.append(grid)
+                    if len(chunk) == 4096:
+                        writer.write_grids(chunk)
+                        chunk = []
+                if chunk:
+                    writer.write_grids(chunk)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        print('Packed %d grids' % writer.count, file=sys.stderr)
+
+    elif args.command == 'unpack':
+        with Corpus(args.input) as corpus:
+            for start in range(0, len(corpus), 4096):
+                stop = start + 4096
+                digits = corpus.solutions(start, stop) if args.solutions else corpus.digits(start, stop)
+                sys.stdout.write(''.join(grid + '\n' for grid in digits_to_grids(digits, corpus.size)))
+
+    else:
+        unsolved = solve_file(args.input, args.output, args.batch_size)
+        print('Solved corpus, %d puzzles without solution' % unsolved, file=sys.stderr)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import numpy as np
+import os
+import packed
+import solution
+import tempfile
+import unittest
+
+
+class TestPacking(unittest.TestCase):
+
+    def test_round_trip(self):
+        rng = np.random.default_rng(0)
+        for size in (2, 3, 4, 5):
+            layout = packed.Layout(size)
+            side = size * size
+            givens = rng.integers(0, side + 1, (20, side * side)).astype(np.uint8)
+            solved = rng.integers(1, side + 1, (20, side * side)).astype(np.uint8)
+            self.assertTrue((packed.unpack_givens(packed.pack_givens(givens, layout), layout) == givens).all())
+            self.assertTrue((packed.unpack_solutions(packed.pack_solutions(solved, layout), layout) == solved).all())
+            self.assertTrue((packed.grids_to_digits(packed.digits_to_grids(givens, size), size) == givens).all())
+
+    def test_record_sizes(self):
+        layout = packed.Layout(3, solutions=True)
+        self.assertEqual(layout.given_bytes, 41)
+        self.assertEqual(layout.solution_bytes, 34)
+        self.assertEqual(layout.record_size, 76)
+
+    def test_grids(self):
+        grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+        digits = packed.grids_to_digits([grid, grid.replace('.', '0')])
+        self.assertEqual(digits[0, 0], 2)
+        self.assertEqual(packed.digits_to_grids(digits), [grid, grid])
+        self.assertRaises(ValueError, packed.grids_to_digits, ['x' * 81])
+        self.assertRaises(ValueError, packed.grids_to_digits, ['123'])
+
+
+class TestCorpus(unittest.TestCase):
+    grids = [
+        '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3',
+        '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......',
+        '33...............................................................................',
+    ]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'puzzles.sdk')
+        with packed.Writer(self.path) as writer:
+            writer.write_grids(self.grids[:2])
+            writer.write_grids(self.grids[2:])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_random_access(self):
+        with packed.Corpus(self.path) as corpus:
+            self.assertEqual(len(corpus), 3)
+            self.assertIsNone(corpus.variant)
+            self.assertEqual(corpus.grid(1), self.grids[1])
+            self.assertEqual(corpus.grid(-1), self.grids[2])
+            self.assertEqual(packed.digits_to_grids(corpus.digits(0, 2)), self.grids[:2])
+            self.assertEqual(os.path.getsize(self.path), packed.HEADER.size + 3 * 41)
+
+    def test_solve_file(self):
+        target = os.path.join(self.directory.name, 'solved.sdk')
+        self.assertEqual(packed.solve_file(self.path, target, batch_size=2), 1)
+
+        with packed.Corpus(target) as corpus:
+            self.assertEqual(list(corpus.status()), [packed.SOLVED, packed.SOLVED, packed.NO_SOLUTION])
+            solved = packed.digits_to_grids(corpus.solutions())
+            self.assertEqual(solved[:2], [solution.grid_string(solution.solve(grid)) for grid in self.grids[:2]])
+            self.assertEqual(solved[2], '.' * 81)
+            self.assertEqual(corpus.grid(0), self.grids[0])
+
+    def test_not_a_corpus(self):
+        with open(self.path, 'r+b') as file:
+            file.write(b'NOPE')
+        self.assertRaises(ValueError, packed.Corpus, self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import board
+from board import Board
+
+
+#####################################################################################
+# Parallel search of a single board
+#
+# The search tree is expanded to a frontier of subproblems that are handed to a pool of
+# worker processes. Whenever the pool runs short of work the coordinator asks for as many
+# splits as there are idle workers, in a shared counter: a worker that takes one off the
+# counter stops its walk and sends back the rest of its subtree, split into its open
+# branches, which go to the idle workers. The others keep walking. The first solution
+# found raises the stop flag, which the other workers notice within a few nodes.
+
+# State shared with the worker processes, set by _init_worker(): the stop flag and the
+# number of splits requested
+stop = None
+splits = None
+
+
+def _init_worker(stop_flag, split_requests):
+    global stop, splits
+    stop = stop_flag
+    splits = split_requests
+
+
+def _take_split():
+    """
+        Take one of the requested splits, if any is left.
+        Returns:
+            True if the calling worker should split its walk.
+    """
+
+    # The unlocked read keeps the common case, no request, cheap
+    if splits.value <= 0:
+        return False
+
+    with splits.get_lock():
+        if splits.value <= 0:
+            return False
+        splits.value -= 1
+        return True
+
+
+def _poller(every):
+    """
+        Build the split function of a worker walk, see board.explore().
+        Args:
+            every(int) - The number of nodes between two looks at the shared flags.
+        Returns:
+            A function telling the walk to stop when the search is over or it took a split request.
+    """
+
+    ticks = itertools.count(1)
+    return lambda: next(ticks) % every == 0 and (stop.is_set() or _take_split())
+
+
+def _search_part(sudoku, every):
+    """
+        Search one subproblem in a worker process.
+        Args:
+            sudoku(Board) - A reduced board.
+            every(int) - The number of nodes between two looks at the shared flags.
+        Returns:
+            The solved Board or None, and the boards left to explore when the walk was split.
+    """
+
+    walk = board.explore(sudoku, _poller(every))
+    try:
+        return next(walk), []
+    except StopIteration as end:
+        if end.value is None or stop.is_set():
+            return None, []
+        return None, end.value
+
+
+def search(sudoku, workers=None, parts=None, every=64):
+    """
+        Solve a single board with a pool of worker processes splitting its search tree.
+            Subproblems still running when a solution is found are abandoned within every
+            nodes, and the workers are gone on return. The parallel search is neither traced
+            nor counted.
+        Args:
+            sudoku(Board) - The sudoku board, left untouched.
+            workers(int) - The number of worker processes, defaults to the number of CPUs.
+                With a single worker the board is searched in this process.
+            parts(int) - The size of the initial frontier, 4 subproblems per worker by default.
+            every(int) - The number of nodes a worker walks between two looks at the shared flags.
+        Returns:
+            The solved Board, or False if the board has no solution.
+    """
+
+    workers = workers or os.cpu_count() or 1
+    sudoku = Board(sudoku.topology, sudoku.cells, strategies=sudoku.strategies, places=sudoku.places)
+
+    if workers < 2:
+        return board.search(sudoku)
+
+    frontier = board.frontier(sudoku, parts or 4 * workers)
+    if not frontier:
+        return False
+    if frontier[0].is_solved():
+        return frontier[0]
+
+    context = multiprocessing.get_context()
+    stop_flag, split_requests = context.Event(), context.Value('i', 0)
+    executor = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                   initargs=(stop_flag, split_requests))
+    try:
+        pending = set(executor.submit(_search_part, part, every) for part in frontier)
+
+        while pending:
+            with split_requests.get_lock():
+                split_requests.value = max(workers - len(pending), 0)
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                solved, rest = future.result()
+                if solved is not None:
+                    return solved
+                pending.update(executor.submit(_search_part, part, every) for part in rest)
+    finally:
+        # Running subproblems notice the stop flag within every nodes
+        stop_flag.set()
+        executor.shutdown(cancel_futures=True)
+
+    return False
@@ -0,0 +1,45 @@
+import board
+import multiprocessing
+import parallel
+import solution
+import unittest
+from board import Board
+from topology import CLASSIC
+
+
+class TestParallelSearch(unittest.TestCase):
+    hard_grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+
+    def board(self, grid, strategies=None):
+        return Board.from_values(solution.grid_values(grid), CLASSIC, strategies=strategies)
+
+    def test_solves_like_search(self):
+        expected = solution.solve(self.hard_grid, 'classic')
+        self.assertEqual(solution.solve(self.hard_grid, 'classic', method='parallel'), expected)
+
+        # Splitting as often as possible still lands on the only solution
+        solved = parallel.search(self.board(self.hard_grid, board.pipeline(())), workers=3, parts=2, every=1)
+        self.assertEqual(solved.to_values(), expected)
+
+    def test_no_solution(self):
+        self.assertFalse(parallel.search(self.board('33' + self.hard_grid[2:]), workers=2))
+
+        # A wrong 9 that takes a search to refute without strategies
+        grid = self.hard_grid[:38] + '9' + self.hard_grid[39:]
+        self.assertFalse(parallel.search(self.board(grid, board.pipeline(())), workers=2, parts=2, every=1))
+
+    def test_split_requests(self):
+        # As many walks split as there are requests, not every one looking at the counter
+        self.addCleanup(parallel._init_worker, parallel.stop, parallel.splits)
+        requests = multiprocessing.Value('i', 2)
+        parallel._init_worker(multiprocessing.Event(), requests)
+        self.assertEqual([parallel._take_split() for _ in range(4)], [True, True, False, False])
+        self.assertEqual(requests.value, 0)
+
+    def test_single_worker(self):
+        sudoku = self.board(self.hard_grid)
+        self.assertEqual(parallel.search(sudoku, workers=1).cells, board.search(sudoku.copy()).cells)
+
+
+if __name__ == '__main__':
+    unittest.main()
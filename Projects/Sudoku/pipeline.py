@@ -0,0 +1,248 @@
+import argparse
+import csv
+import io
+import json
+import sys
+
+import solution
+import topology
+
+formats = ('lines', 'csv', 'jsonl')
+
+
+#####################################################################################
+# Readers
+#
+# Every reader is a generator over an open text stream, so only the current line is
+# held in memory whatever the size of the file.
+
+def read_lines(stream):
+    """
+        Read one grid per line, skipping blank lines and '#' comments.
+        Args:
+            stream(file) - A text stream.
+        Returns:
+            A generator of grids in string form.
+    """
+
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+
+def is_grid(text):
+    try:
+        solution.grid_values(text)
+    except ValueError:
+        return False
+    return True
+
+
+def read_csv(stream, column=0):
+    """
+        Read grids from a column of a CSV file, e.g. 'quizzes,solutions' files.
+            A first row whose field solution.grid_values() rejects is taken as the header.
+        Args:
+            stream(file) - A text stream.
+            column(int or string) - The index or the header name of the grid column.
+        Returns:
+            A generator of grids in string form.
+    """
+
+    rows = csv.reader(stream)
+
+    first = next(rows, None)
+    if first is None:
+        return
+
+    if not isinstance(column, int):
+        column = first.index(column)
+    elif is_grid(first[column]):
+        yield first[column]
+
+    for row in rows:
+        if row:
+            yield row[column]
+
+
+def read_jsonl(stream, field='puzzle'):
+    """
+        Read grids from a JSON lines file of objects or bare strings.
+        Args:
+            stream(file) - A text stream.
+            field(string) - The key of the grid in every object.
+        Returns:
+            A generator of grids in string form.
+    """
+
+    for line in read_lines(stream):
+        item = json.loads(line)
+        yield item if isinstance(item, str) else item[field]
+
+
+def read_puzzles(stream, fmt='lines', field=None):
+    """
+        Read grids from a stream in one of the supported formats.
+        Args:
+            stream(file) - A text stream.
+            fmt(string) - One of 'lines', 'csv' or 'jsonl'.
+            field(int or string) - The CSV column or the JSON key of the grids.
+        Returns:
+            A generator of grids in string form.
+    """
+
+    if fmt == 'lines':
+        return read_lines(stream)
+    if fmt == 'csv':
+        return read_csv(stream, 0 if field is None else field)
+    if fmt == 'jsonl':
+        return read_jsonl(stream, 'puzzle' if field is None else field)
+
+    raise ValueError("Unknown format: %s" % fmt)
+
+
+#####################################################################################
+# Solver
+
+def solve_puzzles(grids, skip_invalid=False, variant=None):
+    """
+        Lazily solve grids one at a time with solution.grid_values() and solution.solve().
+        Args:
+            grids(iterable) - Grids in string form.
+            skip_invalid(bool) - Yield None for grids grid_values() rejects instead of raising.
+            variant(string) - The sudoku variant, see solution.solve().
+        Returns:
+            A generator of (grid, solution) pairs, the solution being a grid string or None.
+    """
+
+    for grid in grids:
+        try:
+            solution.grid_values(grid)
+        except ValueError:
+            if not skip_invalid:
+                raise
+            yield grid, None
+            continue
+
+        values = solution.solve(grid, variant)
+
+        yield grid, solution.grid_string(values) if values else None
+
+
+#####################################################################################
+# Writer
+
+def _csv_row(*fields):
+    """
+        Format fields as one CSV line, quoted as csv.reader expects, e.g. grids with commas.
+    """
+
+    line = io.StringIO()
+    csv.writer(line, lineterminator='\n').writerow(fields)
+    return line.getvalue()
+
+
+def format_result(grid, solved, fmt='lines'):
+    """
+        Format a solved grid as one line of output.
+        Args:
+            grid(string) - The puzzle.
+            solved(string) - The solution, or None if there is none.
+            fmt(string) - One of 'lines', 'csv' or 'jsonl'.
+        Returns:
+            The line, including its line break.
+    """
+
+    if fmt == 'lines':
+        return (solved or '.' * len(solution.grid_tokens(grid))) + '\n'
+    if fmt == 'csv':
+        return _csv_row(grid, solved or '')
+    if fmt == 'jsonl':
+        return json.dumps({'puzzle': grid, 'solution': solved}) + '\n'
+
+    raise ValueError("Unknown format: %s" % fmt)
+
+
+def write_solutions(stream, results, fmt='lines', buffer_size=1024):
+    """
+        Write solved grids as they come, holding at most buffer_size lines in memory.
+        Args:
+            stream(file) - A text stream.
+            results(iterable) - (grid, solution) pairs, see solve_puzzles().
+            fmt(string) - One of 'lines', 'csv' or 'jsonl'.
+            buffer_size(int) - The number of lines written at once.
+        Returns:
+            The number of results written.
+    """
+
+    if fmt == 'csv':
+        stream.write(_csv_row('puzzle', 'solution'))
+
+    count = 0
+    buffer = []
+    for grid, solved in results:
+        buffer.append(format_result(grid, solved, fmt))
+        count += 1
+
+        if len(buffer) >= buffer_size:
+            stream.write(''.join(buffer))
+            stream.flush()
+            buffer = []
+
+    stream.write(''.join(buffer))
+    stream.flush()
+
+    return count
+
+
+def guess_format(path):
+    """
+        Guess the format of a file from its extension.
+        Args:
+            path(string) - The file name, '-' for the standard streams.
+        Returns:
+            One of 'lines', 'csv' or 'jsonl'.
+    """
+
+    if path.endswith('.csv'):
+        return 'csv'
+    if path.endswith('.jsonl') or path.endswith('.json'):
+        return 'jsonl'
+
+    return 'lines'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve a file of sudoku grids as a stream.')
+    parser.add_argument('input', nargs='?', default='-', help='file with the grids, - for stdin')
+    parser.add_argument('output', nargs='?', default='-', help='file for the solutions, - for stdout')
+    parser.add_argument('--input-format', choices=formats, help='defaults to the input file extension')
+    parser.add_argument('--output-format', choices=formats, help='defaults to the output file extension')
+    parser.add_argument('--field', help='CSV column or JSON key of the grids')
+    parser.add_argument('--buffer-size', type=int, default=1024, help='lines written at once')
+    parser.add_argument('--variant', choices=sorted(topology.variants),
+                        help='sudoku variant, by default diagonal is tried before classic')
+    parser.add_argument('--skip-invalid', action='store_true', help='write no solution for malformed grids')
+    args = parser.parse_args(argv)
+
+    field = int(args.field) if args.field and args.field.isdigit() else args.field
+
+    source = sys.stdin if args.input == '-' else open(args.input, newline='')
+    target = sys.stdout if args.output == '-' else open(args.output, 'w')
+
+    try:
+        grids = read_puzzles(source, args.input_format or guess_format(args.input), field)
+        results = solve_puzzles(grids, args.skip_invalid, args.variant)
+        write_solutions(target, results, args.output_format or guess_format(args.output), args.buffer_size)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import io
+import json
+import pipeline
+import unittest
+
+
+class TestPipeline(unittest.TestCase):
+    grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+    solved = '267945381853716249491823576576438192384192657129657438642379815935281764718564923'
+
+    def test_read_formats(self):
+        self.assertEqual(list(pipeline.read_puzzles(io.StringIO('# comment\n\n%s\n' % self.grid))), [self.grid])
+        csv_file = io.StringIO('quizzes,solutions\n%s,%s\n' % (self.grid, self.solved))
+        self.assertEqual(list(pipeline.read_puzzles(csv_file, 'csv', 'quizzes')), [self.grid])
+        csv_file = io.StringIO('%s,%s\n' % (self.grid, self.solved))
+        self.assertEqual(list(pipeline.read_puzzles(csv_file, 'csv', 1)), [self.solved])
+        jsonl_file = io.StringIO(json.dumps({'puzzle': self.grid}) + '\n' + json.dumps(self.grid) + '\n')
+        self.assertEqual(list(pipeline.read_puzzles(jsonl_file, 'jsonl')), [self.grid, self.grid])
+
+    def test_larger_boards(self):
+        big = '1' + '.' * 255
+        csv_file = io.StringIO('%s\n%s\n' % (big, big))
+        self.assertEqual(list(pipeline.read_puzzles(csv_file, 'csv', 0)), [big, big])
+        self.assertEqual(pipeline.format_result('11' + '.' * 254, None), '.' * 256 + '\n')
+
+    def test_round_trip(self):
+        output = io.StringIO()
+        results = pipeline.solve_puzzles(pipeline.read_lines(io.StringIO('%s\n%s\n' % (self.grid, '1' * 10))),
+                                         skip_invalid=True)
+        self.assertEqual(pipeline.write_solutions(output, results, 'jsonl', buffer_size=1), 2)
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(lines[0], {'puzzle': self.grid, 'solution': self.solved})
+        self.assertIsNone(lines[1]['solution'])
+
+    def test_csv_round_trip(self):
+        tokens = ','.join(['1'] + ['.'] * 255)
+        results = [(tokens, None), (self.grid, self.solved), ('"quoted",%s' % self.grid, None)]
+        output = io.StringIO()
+        pipeline.write_solutions(output, results, 'csv')
+
+        self.assertEqual(list(pipeline.read_puzzles(io.StringIO(output.getvalue()), 'csv', 'puzzle')),
+                         [grid for grid, solved in results])
+        self.assertEqual(list(pipeline.read_puzzles(io.StringIO(output.getvalue()), 'csv', 'solution')),
+                         ['', self.solved, ''])
+
+    def test_lazy(self):
+        def grids():
+            yield self.grid
+            raise AssertionError('read past the first grid')
+
+        self.assertEqual(next(pipeline.solve_puzzles(grids())), (self.grid, self.solved))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,271 @@
+import pickle
+from array import array
+from collections import deque
+
+import board
+
+
+class Segment:
+    """
+        A keyframe and the deltas recorded after it.
+            The keyframe is the full board at step start, delta i is step start + i + 1 and is
+            stored as three integers (cell, old mask, new mask) in a flat array.
+    """
+
+    __slots__ = ('start', 'topology', 'cells', 'deltas', 'backtracks')
+
+    def __init__(self, start, topology, cells):
+        self.start = start
+        self.topology = topology
+        self.cells = array('L', cells)
+        self.deltas = array('L')
+        self.backtracks = array('L')
+
+    def __len__(self):
+        return len(self.deltas) // 3
+
+    def __getstate__(self):
+        return self.start, self.topology, self.cells, self.deltas, self.backtracks
+
+    def __setstate__(self, state):
+        self.start, self.topology, self.cells, self.deltas, self.backtracks = state
+
+    def frames(self):
+        """
+            Replay the segment.
+            Returns:
+                A generator of (step, cell, old, new, cells) tuples, cells being the board after the step.
+                The same cells array is updated and yielded for every step.
+        """
+
+        cells = array('L', self.cells)
+        deltas = self.deltas
+        for i in range(0, len(deltas), 3):
+            cell, old, new = deltas[i], deltas[i + 1], deltas[i + 2]
+            cells[cell] = new
+            yield self.start + i // 3 + 1, cell, old, new, cells
+
+
+class TraceRecorder:
+    """
+        An opt-in record of every candidate change made while solving.
+            Changes are kept as compact (step, box, old, new) deltas, with a keyframe of the whole
+            board every keyframe_interval steps and at the start of every search. Memory is bounded
+            by max_deltas: once it is reached the oldest segments are written to the spill file if
+            there is one, dropped if ring is set, and otherwise recording stops.
+            Pass a recorder as the trace of solution.solve() or solution.search(), leave it out and
+            nothing is recorded.
+    """
+
+    def __init__(self, keyframe_interval=256, max_deltas=None, ring=False, spill=None):
+        """
+            Args:
+                keyframe_interval(int) - The maximum number of deltas between two keyframes, at most a
+                    quarter of max_deltas so that the oldest segments can be evicted a few at a time.
+                max_deltas(int) - The maximum number of deltas kept in memory, None for no limit.
+                ring(bool) - Drop the oldest deltas instead of stopping when max_deltas is reached.
+                spill(string or file) - A path or a binary file that receives the evicted segments.
+        """
+
+        if max_deltas is not None:
+            keyframe_interval = min(keyframe_interval, max(max_deltas // 4, 1))
+
+        self.keyframe_interval = keyframe_interval
+        self.max_deltas = max_deltas
+        self.ring = ring
+        self.spill = open(spill, 'w+b') if isinstance(spill, str) else spill
+        self.owns_spill = isinstance(spill, str)
+
+        self.segments = deque()
+        self.current = None
+        self.step = 0
+        self.size = 0
+        self.spilled = 0
+        self.dropped = 0
+        self.full = False
+
+    def __len__(self):
+        return self.size
+
+    def keyframe(self, topology, cells):
+        """
+            Start a new segment from a full board, e.g. when a new search starts.
+            Args:
+                topology(Topology) - The topology of the board.
+                cells(array) - The candidate masks of the board.
+        """
+
+        if self.full:
+            return
+
+        self.current = array('L', cells)
+        self.segments.append(Segment(self.step, topology, cells))
+
+    def record(self, cell, old, new):
+        """
+            Record a candidate change of the board of the current segment.
+            Args:
+                cell(int) - The index of the box.
+                old(int) - The candidate mask before the change.
+                new(int) - The candidate mask after the change.
+        """
+
+        if self.full or self.current is None:
+            return
+
+        if self.max_deltas is not None and self.size >= self.max_deltas:
+            self._evict()
+            if self.full:
+                return
+
+        segment = self.segments[-1]
+        if len(segment) >= self.keyframe_interval:
+            segment = Segment(self.step, segment.topology, self.current)
+            self.segments.append(segment)
+
+        segment.deltas.extend((cell, old, new))
+        self.current[cell] = new
+        self.step += 1
+        self.size += 1
+
+    def undo(self, changes):
+        """
+            Record the changes that undo a failed branch in place, see board.Board.undo().
+            Args:
+                changes(iterable) - (cell, old, new) triples, old being the mask of the abandoned
+                    board and new the mask restored.
+        """
+
+        if self.full:
+            return
+
+        for cell, old, new in changes:
+            self.record(cell, old, new)
+        self.segments[-1].backtracks.append(self.step)
+
+    def _evict(self):
+        """
+            Make room once max_deltas is reached, following the spill and ring settings.
+        """
+
+        if self.spill is None and not self.ring:
+            self.full = True
+            return
+
+        # The current segment can only go once a newer one follows it
+        last = self.segments[-1]
+        if len(self.segments) == 1 and len(last):
+            self.segments.append(Segment(self.step, last.topology, self.current))
+
+        while self.size >= self.max_deltas and len(self.segments) > 1:
+            segment = self.segments.popleft()
+            self.size -= len(segment)
+            if self.spill is not None:
+                pickle.dump(segment, self.spill, pickle.HIGHEST_PROTOCOL)
+                self.spilled += len(segment)
+            else:
+                self.dropped += len(segment)
+
+    def iter_segments(self):
+        """
+            Iterate over every segment still available, the spilled ones first.
+            Returns:
+                A generator of Segments in step order.
+        """
+
+        for offset, segment in self.spilled_segments():
+            yield segment
+
+        yield from list(self.segments)
+
+    def spilled_segments(self):
+        """
+            Iterate over the segments written to the spill file.
+            Returns:
+                A generator of (offset, Segment) tuples in step order, see load_segment().
+        """
+
+        if self.spill is None or not self.spilled:
+            return
+
+        self.spill.flush()
+        position = self.spill.tell()
+        self.spill.seek(0)
+        try:
+            offset = 0
+            while offset < position:
+                # The caller may load other segments in between
+                self.spill.seek(offset)
+                segment = pickle.load(self.spill)
+                following = self.spill.tell()
+                yield offset, segment
+                offset = following
+        finally:
+            self.spill.seek(position)
+
+    def load_segment(self, offset):
+        """
+            Read back one spilled segment.
+            Args:
+                offset(int) - Its offset in the spill file, from spilled_segments().
+            Returns:
+                The Segment.
+        """
+
+        position = self.spill.tell()
+        self.spill.seek(offset)
+        try:
+            return pickle.load(self.spill)
+        finally:
+            self.spill.seek(position)
+
+    def frames(self):
+        """
+            Replay the recorded steps.
+            Returns:
+                A generator of (step, topology, cells) tuples, cells being the board after the step.
+        """
+
+        for segment in self.iter_segments():
+            for step, cell, old, new, cells in segment.frames():
+                yield step, segment.topology, cells
+
+    def snapshots(self):
+        """
+            Replay the steps that solve a box as dictionaries, like the old assignments list.
+            Returns:
+                A generator of sudokus in dictionary form.
+        """
+
+        for segment in self.iter_segments():
+            boxes, digits = segment.topology.boxes, segment.topology.digits
+            for step, cell, old, new, cells in segment.frames():
+                if board.popcount(new) == 1:
+                    yield dict(zip(boxes, [board.mask_string(m, digits) for m in cells]))
+
+    def clear(self):
+        """
+            Forget everything recorded so far, including the spilled segments.
+        """
+
+        self.segments.clear()
+        self.current = None
+        self.size = self.spilled = self.dropped = 0
+        self.full = False
+        if self.spill is not None:
+            self.spill.seek(0)
+            self.spill.truncate()
+
+    def close(self):
+        """
+            Close the spill file if the recorder opened it from a path. A file passed in stays open.
+        """
+
+        if self.owns_spill and not self.spill.closed:
+            self.spill.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,69 @@
+import os
+import solution
+import tempfile
+import unittest
+from recorder import TraceRecorder
+
+
+class TestTraceRecorder(unittest.TestCase):
+    grid = '9.1....8.8.5.7..4.2.4....6...7......5..............83.3..6......9................'
+
+    def replay(self, trace):
+        for step, topology, cells in trace.frames():
+            last = step, list(cells)
+        return last
+
+    def test_replay_ends_on_solution(self):
+        trace = TraceRecorder(keyframe_interval=16)
+        values = solution.solve(self.grid, trace=trace)
+        step, cells = self.replay(trace)
+        self.assertEqual(step, trace.step)
+        self.assertEqual(solution.grid_string(dict(zip(solution.boxes, [str(m.bit_length()) for m in cells]))),
+                         solution.grid_string(values))
+        self.assertTrue(any(segment.backtracks for segment in trace.segments))
+        self.assertEqual(list(trace.snapshots())[-1], values)
+
+    def test_ring(self):
+        trace = TraceRecorder(keyframe_interval=16, max_deltas=64, ring=True)
+        solution.solve(self.grid, trace=trace)
+        self.assertLessEqual(len(trace), 64)
+        self.assertEqual(trace.dropped + len(trace), trace.step)
+        self.assertEqual(self.replay(trace)[0], trace.step)
+
+    def test_ring_default_interval(self):
+        peaks = []
+
+        class Recorder(TraceRecorder):
+            def record(self, cell, old, new):
+                super().record(cell, old, new)
+                peaks.append(len(self))
+
+        for max_deltas in (100, 1):
+            trace = Recorder(max_deltas=max_deltas, ring=True)
+            solution.solve(self.grid, trace=trace)
+            self.assertLessEqual(max(peaks), max_deltas)
+            self.assertEqual(trace.dropped + len(trace), trace.step)
+            self.assertEqual(self.replay(trace)[0], trace.step)
+            del peaks[:]
+
+    def test_cap(self):
+        trace = TraceRecorder(max_deltas=10)
+        solution.solve(self.grid, trace=trace)
+        self.assertTrue(trace.full)
+        self.assertEqual(len(trace), 10)
+
+    def test_spill(self):
+        full = TraceRecorder(keyframe_interval=16)
+        solution.solve(self.grid, trace=full)
+
+        with tempfile.TemporaryDirectory() as directory:
+            with TraceRecorder(keyframe_interval=16, max_deltas=64, spill=os.path.join(directory, 'trace')) as trace:
+                solution.solve(self.grid, trace=trace)
+                self.assertGreater(trace.spilled, 0)
+                self.assertEqual([step for step, topology, cells in trace.frames()],
+                                 [step for step, topology, cells in full.frames()])
+            self.assertTrue(trace.spill.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,388 @@
+import argparse
+import asyncio
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import solution
+
+
+#####################################################################################
+# Protocol
+#
+# Clients send one JSON object per line:
+#   {"id": 1, "grid": "2.....", "variant": "classic", "format": "values", "deadline_ms": 500}
+# Only grid is required. format is 'grid' (the default) for the solution as a string, or
+# 'values' for the dictionary solution.solve() returns. The server answers one line per
+# request, in completion order:
+#   {"id": 1, "status": "solved", "solution": "483921657..."}
+# status is 'solved', 'no_solution' (solution false, like solve()), 'timeout' once the
+# deadline has passed, or 'error' with a message for invalid requests.
+#
+# Closing the connection cancels the requests it still has pending, so clients keep it
+# open until they have read their answers.
+
+
+#####################################################################################
+# Workers
+#
+# Workers solve batches of requests. Every request in flight owns a slot of a shared
+# array of cancel flags, which the workers look at before solving it and every few search
+# nodes while they do, as they do at its deadline: a pathological puzzle holds a worker
+# no longer than its request waits for it.
+
+cancelled = None
+
+
+def _init_worker(flags):
+    global cancelled
+    cancelled = flags
+
+
+def _solve_batch(items):
+    """
+        Solve a batch of requests in a worker process.
+        Args:
+            items(list) - (grid, variant, deadline, slot) tuples, the deadline being a time.monotonic()
+                time or None.
+        Returns:
+            A list of (status, result) pairs: ('solved', solution string), ('no_solution', None),
+            ('timeout', None), ('cancelled', None) or ('error', message).
+    """
+
+    results = []
+    for grid, variant, deadline, slot in items:
+        if cancelled[slot]:
+            results.append(('cancelled', None))
+            continue
+        if deadline is not None and time.monotonic() >= deadline:
+            results.append(('timeout', None))
+            continue
+
+        token = functools.partial(cancelled.__getitem__, slot)
+        try:
+            status, values = solution.solve_within(grid, variant, cancelled=token, deadline=deadline)
+        except ValueError as e:
+            results.append(('error', str(e)))
+            continue
+
+        if status == 'solved':
+            results.append(('solved', solution.grid_string(values)))
+        elif status == 'no_solution':
+            results.append(('no_solution', None))
+        else:
+            results.append(('timeout' if status == 'time' else status, None))
+
+    return results
+
+
+#####################################################################################
+# Server
+
+class Job:
+    """
+        A request waiting for its solution.
+    """
+
+    __slots__ = ('grid', 'variant', 'deadline', 'future', 'slot')
+
+    def __init__(self, grid, variant, deadline, future):
+        self.grid = grid
+        self.variant = variant
+        self.deadline = deadline
+        self.future = future
+        self.slot = None
+
+
+class SolverServer:
+    """
+        An asyncio server that solves sudokus in a pool of worker processes.
+            Requests are queued, grouped in batches of up to batch_size requests that arrive within
+            batch_wait seconds of each other, and solved by the workers, at most two batches per
+            worker at a time. When the queue is full the server stops reading from the clients
+            until it drains, so they feel the backpressure through their sockets.
+    """
+
+    def __init__(self, workers=None, batch_size=16, batch_wait=0.002, queue_size=1024, deadline=None):
+        """
+            Args:
+                workers(int) - The number of worker processes, defaults to the number of CPUs.
+                batch_size(int) - The maximum number of requests solved by a worker at once.
+                batch_wait(float) - The seconds a batch waits for more requests.
+                queue_size(int) - The number of requests queued before the clients are throttled.
+                deadline(float) - The seconds allowed to requests without deadline_ms, None for no limit.
+        """
+
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue_size = queue_size
+        self.deadline = deadline
+
+        capacity = 2 * self.workers * batch_size
+        self.flags = multiprocessing.Array('b', capacity, lock=False)
+        self.free_slots = list(range(capacity))
+        self.executor = None
+        self.queue = None
+        self.batches = None
+        self.dispatcher = None
+        self.running = set()
+        self.connections = set()
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        """
+            Start the workers and listen.
+            Args:
+                host(string) - The address to listen on.
+                port(int) - The TCP port, 0 for any free port.
+                path(string) - A Unix socket to listen on instead of TCP.
+            Returns:
+                The socket address the server listens on.
+        """
+
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.flags,))
+        self.queue = asyncio.Queue(self.queue_size)
+        self.batches = asyncio.Semaphore(2 * self.workers)
+        self.dispatcher = asyncio.create_task(self._dispatch())
+
+        # Workers forked later would inherit the client sockets and keep them open
+        await asyncio.get_running_loop().run_in_executor(self.executor, _solve_batch, [])
+
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._serve, path)
+        else:
+            self.server = await asyncio.start_server(self._serve, host, port)
+
+        return self.server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        await self.server.serve_forever()
+
+    async def close(self):
+        """
+            Stop listening and shut the workers down, dropping the requests in flight: the
+            workers stop within a few search nodes. Safe to call when start() failed part way.
+        """
+
+        if self.server is not None:
+            self.server.close()
+        for task in self.connections:
+            task.cancel()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        if self.server is not None:
+            await self.server.wait_closed()
+
+        # The slots in use belong to running batches, their searches would go on otherwise
+        if self.dispatcher is not None:
+            self.dispatcher.cancel()
+        for slot in range(len(self.flags)):
+            self.flags[slot] = 1
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _cancel(self, job):
+        job.future.cancel()
+        if job.slot is not None:
+            self.flags[job.slot] = 1
+
+    def _parse(self, line):
+        """
+            Read a request line.
+            Args:
+                line(bytes) - The JSON request.
+            Returns:
+                The id of the request, its Job and its format.
+        """
+
+        request = json.loads(line)
+        if not isinstance(request, dict) or not isinstance(request.get('grid'), str):
+            raise ValueError("A request is an object with a grid")
+
+        fmt = request.get('format', 'grid')
+        if fmt not in ('grid', 'values'):
+            raise ValueError("Unknown format: %s" % fmt)
+
+        loop = asyncio.get_running_loop()
+        timeout = request['deadline_ms'] / 1000.0 if 'deadline_ms' in request else self.deadline
+        deadline = loop.time() + timeout if timeout is not None else None
+
+        return request.get('id'), Job(request['grid'], request.get('variant'), deadline, loop.create_future()), fmt
+
+    async def _serve(self, reader, writer):
+        """
+            Answer the requests of one connection.
+                A request is queued before the next line is read, so a full queue stops the reading.
+        """
+
+        lock = asyncio.Lock()
+        pending = set()
+
+        connection = asyncio.current_task()
+        self.connections.add(connection)
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ConnectionError:
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                try:
+                    request_id, job, fmt = self._parse(line)
+                except (ValueError, TypeError) as e:
+                    await self._write(writer, lock, {'id': None, 'status': 'error', 'error': 'Invalid request: %s' % e})
+                    continue
+
+                await self.queue.put(job)
+
+                task = asyncio.create_task(self._answer(request_id, job, fmt, writer, lock))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        except asyncio.CancelledError:
+            # close() cancels the connections, asyncio logs handlers that end cancelled
+            pass
+        finally:
+            for task in pending:
+                task.cancel()
+            writer.close()
+            self.connections.discard(connection)
+
+    async def _answer(self, request_id, job, fmt, writer, lock):
+        """
+            Wait for the solution of a request and write the answer.
+        """
+
+        loop = asyncio.get_running_loop()
+        timeout = job.deadline - loop.time() if job.deadline is not None else None
+
+        try:
+            status, result = await asyncio.wait_for(job.future, timeout)
+        except asyncio.TimeoutError:
+            self._cancel(job)
+            status, result = 'timeout', None
+        except asyncio.CancelledError:
+            self._cancel(job)
+            raise
+
+        response = {'id': request_id, 'status': status}
+        if status == 'solved':
+            response['solution'] = result if fmt == 'grid' else solution.grid_values(result)
+        elif status == 'no_solution':
+            response['solution'] = False
+        elif status == 'error':
+            response['error'] = result
+
+        await self._write(writer, lock, response)
+
+    async def _write(self, writer, lock, response):
+        async with lock:
+            writer.write(json.dumps(response).encode() + b'\n')
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    async def _dispatch(self):
+        """
+            Group the queued requests into batches and hand them to the workers.
+        """
+
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self.queue.get()]
+            end = loop.time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                if self.queue.empty():
+                    wait = end - loop.time()
+                    if wait <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), wait))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self.queue.get_nowait())
+
+            # Requests cancelled or out of time while queued are dropped
+            batch = [job for job in batch if not job.future.done()]
+            if not batch:
+                continue
+
+            await self.batches.acquire()
+            for job in batch:
+                job.slot = self.free_slots.pop()
+                self.flags[job.slot] = 0
+            task = asyncio.create_task(self._run(batch))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def _run(self, batch):
+        """
+            Solve a batch in a worker and hand the results to the waiting requests.
+        """
+
+        loop = asyncio.get_running_loop()
+
+        # The loop clock is time.monotonic(), which worker processes share
+        items = [(job.grid, job.variant, job.deadline, job.slot) for job in batch]
+        try:
+            results = await loop.run_in_executor(self.executor, _solve_batch, items)
+        except Exception as e:
+            results = [('error', str(e))] * len(batch)
+        finally:
+            for job in batch:
+                self.free_slots.append(job.slot)
+                job.slot = None
+            self.batches.release()
+
+        for job, result in zip(batch, results):
+            if not job.future.done():
+                job.future.set_result(result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='server', description='Serve sudoku solutions as JSON lines.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='TCP port to listen on')
+    parser.add_argument('--unix', help='Unix socket to listen on instead of TCP')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='worker processes, defaults to the CPUs')
+    parser.add_argument('--batch-size', type=int, default=16, help='requests solved by a worker at once')
+    parser.add_argument('--batch-wait', type=float, default=2.0, help='milliseconds a batch waits for requests')
+    parser.add_argument('--queue-size', type=int, default=1024, help='requests queued before throttling clients')
+    parser.add_argument('--deadline', type=float, default=None, help='default deadline of a request in milliseconds')
+    args = parser.parse_args(argv)
+
+    async def serve():
+        server = SolverServer(args.workers, args.batch_size, args.batch_wait / 1000.0, args.queue_size,
+                              args.deadline and args.deadline / 1000.0)
+        async with server:
+            address = await server.start(args.host, args.port, args.unix)
+            print('Serving on %s' % (address,), file=sys.stderr)
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
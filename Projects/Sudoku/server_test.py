@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import server
+import solution
+import tempfile
+import time
+import unittest
+
+
+class TestSolverServer(unittest.IsolatedAsyncioTestCase):
+    grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+    hard_grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+    # An empty 25x25 board, seconds of search
+    slow_grid = ' '.join('.' * 625)
+
+    async def asyncSetUp(self):
+        self.server = server.SolverServer(workers=1, batch_size=4, queue_size=2)
+        self.address = await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def ask(self, requests, address=None, unix=False):
+        if unix:
+            reader, writer = await asyncio.open_unix_connection(address)
+        else:
+            reader, writer = await asyncio.open_connection(*(address or self.address))
+
+        for request in requests:
+            writer.write((request if isinstance(request, str) else json.dumps(request)).encode() + b'\n')
+        await writer.drain()
+
+        answers = [json.loads(await reader.readline()) for _ in requests]
+        writer.close()
+        return dict((answer['id'], answer) for answer in answers)
+
+    async def test_same_results_as_solve(self):
+        answers = await self.ask([
+            {'id': 1, 'grid': self.grid},
+            {'id': 2, 'grid': self.grid, 'format': 'values'},
+            {'id': 3, 'grid': self.hard_grid, 'variant': 'classic'},
+            {'id': 4, 'grid': '33' + '.' * 79},
+        ])
+        self.assertEqual(answers[1]['solution'], solution.grid_string(solution.solve(self.grid)))
+        self.assertEqual(answers[2]['solution'], solution.solve(self.grid))
+        self.assertEqual(answers[3]['solution'], solution.grid_string(solution.solve(self.hard_grid, 'classic')))
+        self.assertEqual(answers[4], {'id': 4, 'status': 'no_solution', 'solution': False})
+
+    async def test_errors(self):
+        answers = await self.ask(['not json', {'id': 1, 'grid': '123'}, {'id': 2, 'grid': self.grid, 'format': 'xml'}])
+        self.assertEqual(answers[1]['status'], 'error')
+        self.assertEqual(answers[None]['status'], 'error')
+
+    async def test_deadline(self):
+        answers = await self.ask([{'id': 1, 'grid': self.hard_grid, 'deadline_ms': 0}, {'id': 2, 'grid': self.grid}])
+        self.assertEqual(answers[1], {'id': 1, 'status': 'timeout'})
+        self.assertEqual(answers[2]['status'], 'solved')
+
+    async def test_backpressure(self):
+        # Far more requests than the queue holds are all answered
+        answers = await self.ask([{'id': i, 'grid': self.grid} for i in range(40)])
+        self.assertEqual(sorted(answers), list(range(40)))
+        self.assertTrue(all(answer['status'] == 'solved' for answer in answers.values()))
+
+    async def test_disconnect(self):
+        reader, writer = await asyncio.open_connection(*self.address)
+        for i in range(8):
+            writer.write(json.dumps({'id': i, 'grid': self.hard_grid}).encode() + b'\n')
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+        answers = await self.ask([{'id': 1, 'grid': self.grid}])
+        self.assertEqual(answers[1]['status'], 'solved')
+        for _ in range(100):
+            if not self.server.connections:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(len(self.server.connections), 0)
+
+    async def test_disconnect_stops_the_search(self):
+        reader, writer = await asyncio.open_connection(*self.address)
+        for i in range(4):
+            writer.write(json.dumps({'id': i, 'grid': self.slow_grid}).encode() + b'\n')
+        await writer.drain()
+        await asyncio.sleep(0.2)
+        writer.close()
+        await writer.wait_closed()
+
+        # The only worker is free again long before the batch would be solved
+        start = time.monotonic()
+        answers = await self.ask([{'id': 1, 'grid': self.grid}])
+        self.assertEqual(answers[1]['status'], 'solved')
+        self.assertLess(time.monotonic() - start, 2)
+
+    async def test_deadline_stops_the_search(self):
+        start = time.monotonic()
+        answers = await self.ask([{'id': 1, 'grid': self.slow_grid, 'deadline_ms': 100}, {'id': 2, 'grid': self.grid}])
+        self.assertEqual(answers[1], {'id': 1, 'status': 'timeout'})
+        self.assertEqual(answers[2]['status'], 'solved')
+        self.assertLess(time.monotonic() - start, 2)
+
+    async def test_close_stops_the_search(self):
+        async with server.SolverServer(workers=1) as closing:
+            address = await closing.start()
+            reader, writer = await asyncio.open_connection(*address)
+            for i in range(4):
+                writer.write(json.dumps({'id': i, 'grid': self.slow_grid}).encode() + b'\n')
+            await writer.drain()
+            await asyncio.sleep(0.2)
+
+        start = time.monotonic()
+        await asyncio.get_running_loop().run_in_executor(None, closing.executor.shutdown)
+        self.assertLess(time.monotonic() - start, 2)
+        writer.close()
+
+    async def test_port_in_use(self):
+        second = server.SolverServer(workers=1)
+        with self.assertRaises(OSError):
+            async with second:
+                await second.start(*self.address)
+
+        # The workers and the dispatcher are gone all the same
+        await asyncio.sleep(0)
+        self.assertTrue(second.dispatcher.cancelled())
+        self.assertRaises(RuntimeError, second.executor.submit, server._solve_batch, [])
+
+    async def test_unix_socket(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'solver.sock')
+            async with server.SolverServer(workers=1) as unix_server:
+                await unix_server.start(path=path)
+                answers = await self.ask([{'id': 1, 'grid': self.grid}], path, unix=True)
+        self.assertEqual(answers[1]['status'], 'solved')
+
+    def test_cancelled_requests_are_skipped(self):
+        self.addCleanup(server._init_worker, server.cancelled)
+        server._init_worker([1, 0])
+        results = server._solve_batch([(self.grid, None, None, 0), (self.grid, None, None, 1)])
+        self.assertEqual(results[0], ('cancelled', None))
+        self.assertEqual(results[1][0], 'solved')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,308 +1,606 @@
-import collections
-
-
-def cross(A, B):
-    """
-        Cross product of elements in A and elements in B.
-        Args:
-            A(string) - Left part.
-            B(string) - Right part.
-        Returns:
-            An array with the cross product.
-    """
-
-    return [s + t for s in A for t in B]
+import atexit
+import functools
+import itertools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import board
+import dlx
+import parallel
+from board import Board
+from budget import Budget, OutOfBudget
+from recorder import TraceRecorder
+from stats import Stats
+from topology import CLASSIC, DIAGONAL, get_topology, sizes, cross, rows, cols, boxes, row_units, column_units, \
+    square_units, diagonal_units
 
 
 #####################################################################################
 # Global Variables
 
-assignments = []
-
-rows = 'ABCDEFGHI'
-cols = '123456789'
+# Worker processes used by solve(grid, race=True), started on first use and kept for the
+# next races, and their stop flags. A race owns a slot of race_flags, which is set once a
+# variant has won, until it has returned and all of its searches have ended.
+race_executor = None
+race_workers = 0
+race_flags = None
+race_slots = []
+race_lock = threading.Condition()
 
-boxes = cross(rows, cols)
+# Set in the worker processes of count_solutions() once the limit is reached
+count_stop = None
 
-row_units = [cross(r, cols) for r in rows]
-column_units = [cross(rows, c) for c in cols]
-square_units = [cross(rs, cs) for rs in ('ABC', 'DEF', 'GHI') for cs in ('123', '456', '789')]
-diagonal_units = [[rows[i] + cols[i] for i in range(len(row_units))],
-                  [rows[i] + cols[::-1][i] for i in range(len(row_units))]]
-unitlist = row_units + column_units + square_units + diagonal_units
+# Search engines selectable with the method argument of search() and solve()
+methods = {
+    'search': board.search,
+    'dlx': dlx.search,
+    'parallel': parallel.search,
+}
 
-units = dict((s, [u for u in unitlist if s in u]) for s in boxes)
-peers = dict((s, set(sum(units[s], [])) - set([s])) for s in boxes)
+# Read-only tables of the diagonal sudoku, the default topology of every function below.
+# Solving never rebinds them: pass a topology.Topology to work on another variant.
+unitlist = DIAGONAL.unitlist
+units = DIAGONAL.units
+peers = DIAGONAL.peers
 
 
 #####################################################################################
 
-def set_units_peers(is_diagonal):
+def assign_value(values, box, value):
     """
-        Set the values of the global variables: unitlist, units and peers.
+        Assigns a value to a given box.
+            Traces are recorded by search() on the bitmask board, see recorder.TraceRecorder.
         Args:
-            is_diagonal(bool) - If the sudoku is diagonal or not.
+            values(dict) - The sudoku in dictionary form.
+            box(string) - The key of the box.
+            value(string) - The value of the box.
+        Returns:
+            The sudoku in dictionary form.
     """
 
-    global unitlist, units, peers
-    unitlist = row_units + column_units + square_units + (diagonal_units if is_diagonal else [])
+    values[box] = value
 
-    units = dict((s, [u for u in unitlist if s in u]) for s in boxes)
-    peers = dict((s, set(sum(units[s], [])) - set([s])) for s in boxes)
+    return values
 
 
-def assign_value(values, box, value):
+def grid_tokens(grid):
     """
-        Assigns a value to a given box. If it updates the board record it.
+        Split a grid in string form into the tokens of its boxes.
+            Grids with spaces or commas hold one token per box, e.g. '10' on a 16x16 board,
+            other grids hold one character per box.
         Args:
-            values(dict) - The sudoku in dictionary form.
-            box(string) - The key of the box.
-            value(string) - The value of the box.
+            grid(string) - A grid in string form.
         Returns:
-            The sudoku in dictionary form.
+            A list of tokens.
     """
 
-    # Don't waste memory appending actions that don't actually change any values
-    if values[box] == value:
-        return values
+    if any(separator in grid for separator in ' ,\t\n'):
+        return grid.replace(',', ' ').split()
 
-    values[box] = value
-    if len(value) == 1:
-        assignments.append(values.copy())
+    return list(grid)
 
-    return values
 
+def board_size(count):
+    """
+        Find the size of a board from its number of boxes.
+        Args:
+            count(int) - The number of boxes, 81 for a 9x9 board.
+        Returns:
+            The side of a square of the board, 3 for a 9x9 board.
+    """
 
-def grid_values(grid):
+    for size in sizes:
+        if size ** 4 == count:
+            return size
+
+    raise ValueError("The length of the parameter must be 81, or n**4 for a board of n*n by n*n boxes")
+
+
+def grid_values(grid, topology=None):
     """
         Convert grid into a dict of {square: char} with '123456789' for empties.
+            Boards larger than 9x9 write digits past 9 as letters ('A' for 10) or, in grids of
+            separated tokens, as numbers ('10'). Empty boxes are written '.' or '0'.
         Args:
             grid(string) - A grid in string form.
+            topology(Topology) - The topology of the board, by default the classic one of its size.
         Returns:
             A grid in dictionary form
                 Keys: The boxes, e.g., 'A1'
                 Values: The value in each box, e.g., '8'. If the box has no value, then the value will be '123456789'.
     """
-    all_digits = '123456789'
 
-    if len(grid) != 81:
-        raise ValueError("The length of the parameter must be 81")
+    tokens = grid_tokens(grid)
+
+    if topology is None:
+        topology = get_topology('classic', board_size(len(tokens)))
+    elif len(tokens) != len(topology.boxes):
+        raise ValueError("The length of the parameter must be %d" % len(topology.boxes))
+
+    all_digits = topology.digits
 
     gridDict = dict()
 
-    for item in zip(boxes, grid):
-        gridDict[item[0]] = item[1] if item[1] != '.' else all_digits
+    for box, token in zip(topology.boxes, tokens):
+        if not token.strip('.0'):
+            gridDict[box] = all_digits
+        elif token in topology.digit_bits:
+            gridDict[box] = token
+        elif token.isdigit() and int(token) <= len(all_digits):
+            gridDict[box] = all_digits[int(token) - 1]
+        else:
+            raise ValueError("Unknown digit %r" % token)
 
     return gridDict
 
 
-def display(values):
+def values_topology(values):
     """
-        Display the values as a 2-D grid.
+        The classic topology of the board a sudoku in dictionary form belongs to.
         Args:
-            values(dict): The sudoku in dictionary form.
+            values(dict) - The sudoku in dictionary form.
+        Returns:
+            The classic Topology of the size of the board.
     """
 
-    width = 1 + max(len(values[s]) for s in boxes)
-    line = '+'.join(['-' * (width * 3)] * 3)
-    for r in rows:
-        print(''.join(values[r + c].center(width) + ('|' if c in '36' else '')
-                      for c in cols))
-        if r in 'CF': print(line)
-    return
+    return CLASSIC if len(values) == 81 else get_topology('classic', board_size(len(values)))
 
 
-def naked_twins(values):
+def grid_string(values):
     """
-        Eliminate values using the naked twins strategy.
+        Convert a sudoku in dictionary form back into a grid in string form.
         Args:
-            values(dict): a dictionary of the form {'box_name': '123456789', ...}.
+            values(dict) - The sudoku in dictionary form.
         Returns:
-            the values dictionary with the naked twins eliminated from peers.
+            A grid in string form, with '.' for the boxes that are not solved.
     """
 
-    stalled = False
-    while not stalled:
-
-        solved_boxes_before = len([unit_key for unit_key in boxes if len(values[unit_key]) == 1])
+    return ''.join(values[box] if len(values[box]) == 1 else '.' for box in values_topology(values).boxes)
 
-        twins_candidate = [unit_key for (unit_key, unit_value) in values.items() if len(unit_value) == 2]
 
-        while len(twins_candidate) > 1:
+def display(values):
+    """
+        Display the values as a 2-D grid.
+        Args:
+            values(dict): The sudoku in dictionary form.
+    """
 
-            x_key = twins_candidate.pop()
+    topology = values_topology(values)
+    size = topology.size
 
-            if len([k for k in peers[x_key] if values[k] == values[x_key]]) >= 1:
+    width = 1 + max(len(values[s]) for s in topology.boxes)
+    line = '+'.join(['-' * (width * size)] * size)
+    for i, r in enumerate(topology.rows):
+        print(''.join(values[r + c].center(width) + ('|' if j % size == size - 1 and j < len(topology.cols) - 1 else '')
+                      for j, c in enumerate(topology.cols)))
+        if i % size == size - 1 and i < len(topology.rows) - 1: print(line)
+    return
 
-                x_value = values[x_key]
 
-                for x_unit in units[x_key]:
-                    if len([k for k in x_unit if values[k] == x_value]) > 1:
-                        for box in x_unit:
-                            if len(values[box]) > 1 and values[box] != x_value:
-                                for digit in x_value:
-                                    values = assign_value(values, box, values[box].replace(digit, ''))
+def _apply_strategy(values, strategy, topology):
+    """
+        Run a bitmask strategy from board.py over a sudoku in dictionary form.
+        Args:
+            values(dict) - Sudoku in dictionary form, updated in place.
+            strategy(function) - A function that takes a Board and returns it, or False.
+            topology(Topology) - The unit and peer tables of the sudoku variant.
+        Returns:
+            Resulting Sudoku in dictionary form, or False if the strategy found a contradiction.
+    """
 
-        solved_boxes_after = len([unit_key for unit_key in boxes if len(values[unit_key]) == 1])
+    sudoku = Board.from_values(values, topology)
+    if strategy(sudoku) is False:
+        return False
 
-        stalled = solved_boxes_before == solved_boxes_after
+    for box, value in sudoku.to_values().items():
+        values = assign_value(values, box, value)
 
     return values
 
 
-def eliminate(values):
+def naked_twins(values, topology=DIAGONAL):
+    """
+        Eliminate values using the naked twins strategy.
+        Args:
+            values(dict): a dictionary of the form {'box_name': '123456789', ...}.
+            topology(Topology): the unit and peer tables of the sudoku variant.
+        Returns:
+            the values dictionary with the naked twins eliminated from peers.
+    """
+
+    return _apply_strategy(values, board.naked_twins, topology)
+
+
+def eliminate(values, topology=DIAGONAL):
     """
         Eliminate values from peers of each box with a single value.
             Go through all the boxes, and whenever there is a box with a single value,
             eliminate this value from the set of values of all its peers.
         Args:
             values: Sudoku in dictionary form.
+            topology: The unit and peer tables of the sudoku variant.
         Returns:
             Resulting Sudoku in dictionary form after eliminating values.
     """
 
-    solved_values = [box for box in boxes if len(values[box]) == 1]
-
-    for box in solved_values:
+    return _apply_strategy(values, board.eliminate, topology)
 
-        box_value = values[box]
 
-        for peer in peers[box]:
-            values = assign_value(values, peer, values[peer].replace(box_value, ''))
-
-    return values
-
-
-def only_choice(values):
+def only_choice(values, topology=DIAGONAL):
     """
         Finalize all values that are the only choice for a unit.
             Go through all the units, and whenever there is a unit with a value
             that only fits in one box, assign the value to this box.
         Args:
             values(dict) - Sudoku in dictionary form.
+            topology(Topology) - The unit and peer tables of the sudoku variant.
         Returns:
             Resulting Sudoku in dictionary form after filling in only choices.
     """
 
-    stalled = False
-    while not stalled:
-
-        solved_boxes_before = len([unit_key for unit_key in boxes if len(values[unit_key]) == 1])
+    return _apply_strategy(values, board.only_choice, topology)
 
-        for unit in unitlist:
 
-            all_unit_digits = {unit_key: unit_value for (unit_key, unit_value) in values.items() if
-                               unit_key in unit and len(unit_value)}
+def reduce_puzzle(values, topology=DIAGONAL):
+    """
+        Eliminate the most possibilities as possible from sudoku boxes.
+        Args:
+            values(dict) - Sudoku in dictionary form.
+            topology(Topology) - The unit and peer tables of the sudoku variant.
+        Returns:
+            Resulting Sudoku in dictionary form.
+    """
 
-            all_unit_digits_str = ''.join(all_unit_digits.values())
+    return _apply_strategy(values, board.reduce_puzzle, topology)
 
-            digit_counter = {digit_key for (digit_key, digit_count) in collections.Counter(all_unit_digits_str).items()
-                             if digit_count == 1}
 
-            for digit_key in digit_counter:
-                unit_keys = []
-                for unit_key in unit:
+def search(values, topology=DIAGONAL, trace=None, method='search', stats=None, strategies=None):
+    """
+        Using depth-first search and propagation, create a search tree and solve the sudoku.
+            The search itself runs on a bitmask Board, see board.search().
+        Args:
+            values(dict) - Sudoku in dictionary form.
+            topology(Topology) - The unit and peer tables of the sudoku variant.
+            trace(TraceRecorder) - Optional recorder of every candidate change made by the search.
+            method(string) - 'search', 'dlx' to solve it as an exact cover problem with Dancing Links,
+                see dlx.search(), or 'parallel' to split the search tree over worker processes, see
+                parallel.search(). Neither is traced.
+            stats(Stats) - Optional counters of the work done by the strategies and the search, see stats.py.
+                The Dancing Links and parallel solvers are not counted.
+            strategies(list) - The names of the strategies run on top of propagation at every node,
+                board.default_strategies by default, see board.registry.
+        Returns:
+            Resulting Sudoku in dictionary form or False if there is no further solutions to look at.
+    """
 
-                    if len(values[unit_key]) > 1 and values[unit_key].find(digit_key) > -1:
-                        unit_keys.append(unit_key)
+    if method not in methods:
+        raise ValueError("Unknown search method: %s" % method)
 
-                    for u in unit_keys:
-                        values = assign_value(values, u, digit_key)
+    if strategies is not None:
+        strategies = board.pipeline(strategies)
 
-        solved_boxes_after = len([unit_key for unit_key in boxes if len(values[unit_key]) == 1])
+    solved = methods[method](Board.from_values(values, topology, trace, stats, strategies))
 
-        stalled = solved_boxes_before == solved_boxes_after
+    if solved is False:
+        return False
 
-    return values
+    return solved.to_values()
 
 
-def reduce_puzzle(values):
+def fits_diagonals(values):
     """
-        Eliminate the most possibilities as possible from sudoku boxes.
+        Check that the solved boxes do not repeat a digit on either diagonal.
+            It is a cheap test that rules out the diagonal variant before searching it.
         Args:
             values(dict) - Sudoku in dictionary form.
         Returns:
-            Resulting Sudoku in dictionary form.
+            False if a digit is repeated on a diagonal, True otherwise.
     """
 
-    stalled = False
-    while not stalled:
+    for unit in get_topology('diagonal', values_topology(values).size).unitlist[-2:]:
+        solved = [values[box] for box in unit if len(values[box]) == 1]
+        if len(solved) != len(set(solved)):
+            return False
 
-        # Check how many boxes have a determined value
-        solved_values_before = len([box for box in boxes if len(values[box]) == 1])
+    return True
 
-        values = eliminate(values)
-        values = only_choice(values)
-        values = naked_twins(values)
 
-        # Check how many boxes have a determined value, to compare
-        solved_values_after = len([box for box in values.keys() if len(values[box]) == 1])
-        # If no new values were added, stop the loop.
-        stalled = solved_values_before == solved_values_after
+def _init_race(flags):
+    global race_flags
+    race_flags = flags
 
-        # Sanity check, return False if there is a box with zero available values:
-        if len([box for box in boxes if len(values[box]) == 0]):
-            return False
 
-    return values
+def _shutdown_race():
+    if race_executor is not None:
+        race_executor.shutdown(cancel_futures=True)
 
 
-def search(values):
+def _search_variant(grid, variant, size, method, strategies, slot):
     """
-        Using depth-first search and propagation, create a search tree and solve the sudoku.
+        Search a grid under one variant, in a race worker process.
         Args:
-            values(dict) - Sudoku in dictionary form.
+            grid(string) - A grid in string form.
+            variant(string) - The name of the sudoku variant.
+            size(int) - The size of the board.
+            method(string) - The search method, see search().
+            strategies(list) - The names of the strategies run on top of propagation, see search().
+            slot(int) - The stop flag of the race.
         Returns:
-            Resulting Sudoku in dictionary form or False if there is no further solutions to look at.
+            The solved sudoku in dictionary form, or False, also when another variant won first.
     """
 
-    # First, reduce the puzzle using the previous function
-    values = reduce_puzzle(values)
+    if method != 'search':
+        return search(grid_values(grid), get_topology(variant, size), method=method, strategies=strategies)
 
-    if values is False:
-        return False;
-    if all(len(values[s]) == 1 for s in boxes):
-        return values
+    token = functools.partial(race_flags.__getitem__, slot)
+    status, values = solve_within(grid, variant, cancelled=token, strategies=strategies)
+    return values if status == 'solved' else False
 
-    # Choose one of the unfilled squares with the fewest possibilities
-    box_val_len, box_key = min([(len(values[s]), s) for s in boxes if (len(values[s]) > 1)])
 
-    # Now use recursion to solve each one of the resulting sudokus, and if one returns a value (not False), return that answer!
-    for digit in values[box_key]:
+def race_variants(grid, variants=('diagonal', 'classic'), method='search', size=3, strategies=None):
+    """
+        Search a grid under several variants in parallel worker processes.
+            The workers are started by the first race and serve the next ones. Once a variant is
+            solved the others stop within a few search nodes, see budget.Budget. The 'dlx' and
+            'parallel' methods cannot be stopped: their searches run to the end.
+        Args:
+            grid(string) - A grid in string form.
+            variants(tuple) - The names of the variants to try.
+            method(string) - The search method, see search().
+            size(int) - The size of the board, 3 for 9x9.
+            strategies(list) - The names of the strategies run on top of propagation, see search().
+        Returns:
+            The first solution found, in dictionary form, or False if no variant has one.
+    """
 
-        new_sudoku = values.copy()
-        new_sudoku[box_key] = digit
+    global race_executor, race_workers, race_flags
+
+    with race_lock:
+        if race_flags is None:
+            race_flags = multiprocessing.Array('b', 64, lock=False)
+            race_slots.extend(range(len(race_flags)))
+            atexit.register(_shutdown_race)
+        if race_workers < len(variants):
+            # The searches of the races in flight go on in the old workers
+            if race_executor is not None:
+                race_executor.shutdown(wait=False)
+            race_executor = ProcessPoolExecutor(len(variants), initializer=_init_race, initargs=(race_flags,))
+            race_workers = len(variants)
+
+        while not race_slots:
+            race_lock.wait()
+        slot = race_slots.pop()
+        race_flags[slot] = 0
+
+        futures = [race_executor.submit(_search_variant, grid, variant, size, method, strategies, slot)
+                   for variant in variants]
+
+    # The slot goes back once the searches have ended and the flag is set
+    remaining = [len(futures) + 1]
+
+    def release(future):
+        with race_lock:
+            remaining[0] -= 1
+            if not remaining[0]:
+                race_slots.append(slot)
+                race_lock.notify()
+
+    for future in futures:
+        future.add_done_callback(release)
 
-        values_new_sudoku = search(new_sudoku)
+    try:
+        for future in as_completed(futures):
+            values = future.result()
+            if values:
+                return values
+    finally:
+        race_flags[slot] = 1
+        release(None)
 
-        if values_new_sudoku:
-            return values_new_sudoku
+    return False
 
 
-def solve(grid):
+def solve(grid, variant=None, race=False, trace=None, method='search', stats=None, strategies=None):
     """
         Find the solution to a Sudoku grid.
-            Try to find the solution considering the sudoku diagonal, if no solution is found,
-            it is made an attempt with non-diagonal sudoku approach.
+            Unless a variant is given, try to find the solution considering the sudoku diagonal,
+            if no solution is found, it is made an attempt with non-diagonal sudoku approach.
+            The diagonal attempt is skipped when the givens already repeat a digit on a diagonal.
         Args:
             grid(string): a string representing a sudoku grid.
                 Example: '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+            variant(string): the sudoku variant to solve, e.g. 'classic' or 'diagonal', see topology.variants.
+                The size of the board follows from the length of the grid, see grid_values().
+            race(bool): search the diagonal and classic variants in parallel worker processes and
+                return whichever solution comes first, see race_variants(). Races are not traced.
+            trace(TraceRecorder): optional recorder of every candidate change made while solving.
+            method(string): 'search', 'dlx' or 'parallel', see search().
+            stats(Stats): optional counters of the work done while solving, see profile(). Races are not counted.
+            strategies(list): the names of the strategies run on top of propagation, see search().
         Returns:
             The dictionary representation of the final sudoku grid. False if no solution exists.
     """
 
     values = grid_values(grid)
-    values = search(values)
+    size = values_topology(values).size
 
-    if values is False:
-        set_units_peers(False)
+    if variant is not None:
+        return search(values, get_topology(variant, size), trace, method, stats, strategies)
 
-        values = grid_values(grid)
-        values = search(values)
+    if not fits_diagonals(values):
+        return search(values, get_topology('classic', size), trace, method, stats, strategies)
 
-        set_units_peers(True)
-    return values
+    if race:
+        return race_variants(grid, method=method, size=size, strategies=strategies)
+
+    solved = search(values, get_topology('diagonal', size), trace, method, stats, strategies)
+
+    if solved is False:
+        solved = search(values, get_topology('classic', size), trace, method, stats, strategies)
+
+    return solved
+
+
+def profile(grid, variant=None, callbacks=(), strategies=None):
+    """
+        Solve a grid and count the work done by every strategy and by the search.
+        Args:
+            grid(string) - A grid in string form.
+            variant(string) - The sudoku variant, see solve().
+            callbacks(list) - Functions called on the events of the solver, see Stats.subscribe().
+            strategies(list) - The names of the strategies run on top of propagation, see search().
+        Returns:
+            The solved sudoku in dictionary form (False if no solution exists) and its Stats.
+    """
+
+    stats = Stats(callbacks)
+    return solve(grid, variant, stats=stats, strategies=strategies), stats
+
+
+def solve_within(grid, variant=None, nodes=None, seconds=None, cancelled=None, strategies=None, deadline=None):
+    """
+        Solve a grid like solve(), giving up once a budget of nodes, time or cancellation runs out.
+            The variants solve() tries share the budget, see budget.Budget.
+        Args:
+            grid(string) - A grid in string form.
+            variant(string) - The sudoku variant, see solve().
+            nodes(int) - The number of search nodes allowed, None for no limit.
+            seconds(float) - The wall time allowed, None for no limit.
+            cancelled(function) - Called without arguments, true once solving should stop.
+            strategies(list) - The names of the strategies run on top of propagation, see search().
+            deadline(float) - The time.monotonic() time to give up at, instead of seconds.
+        Returns:
+            The status and the sudoku in dictionary form: ('solved', the solution),
+            ('no_solution', False), or the reason the budget ran out ('nodes', 'time' or
+            'cancelled') with the grid as far as propagation reduced it under the variant being tried,
+            see board.bounded_search().
+    """
+
+    budget = Budget(nodes, seconds, cancelled, deadline=deadline)
+    if strategies is not None:
+        strategies = board.pipeline(strategies)
+
+    values = grid_values(grid)
+    size = values_topology(values).size
+
+    if variant is not None:
+        names = [variant]
+    elif not fits_diagonals(values):
+        names = ['classic']
+    else:
+        names = ['diagonal', 'classic']
+
+    for name in names:
+        status, sudoku = board.bounded_search(Board.from_values(values, get_topology(name, size), strategies=strategies),
+                                              budget)
+        if status != 'no_solution':
+            return status, sudoku.to_values()
+
+    return status, False
+
+
+#####################################################################################
+# Counting solutions
+
+def _variant_topology(values, variant):
+    """
+        Pick the topology a grid is counted under, like solve() picks the one it solves.
+        Args:
+            values(dict) - Sudoku in dictionary form.
+            variant(string) - The sudoku variant, or None to count the diagonal solutions if there
+                are any, and the classic ones otherwise.
+        Returns:
+            The Topology.
+    """
+
+    size = values_topology(values).size
+
+    if variant is not None:
+        return get_topology(variant, size)
+
+    diagonal = get_topology('diagonal', size)
+    if fits_diagonals(values) and next(board.solutions(Board.from_values(values, diagonal)), False):
+        return diagonal
+
+    return get_topology('classic', size)
+
+
+def iter_solutions(grid, variant=None):
+    """
+        Enumerate the solutions of a grid lazily, with the propagation of search().
+        Args:
+            grid(string) - A grid in string form.
+            variant(string) - The sudoku variant, see _variant_topology().
+        Returns:
+            A generator of solved sudokus in dictionary form.
+    """
 
+    values = grid_values(grid)
+    for solved in board.solutions(Board.from_values(values, _variant_topology(values, variant))):
+        yield solved.to_values()
+
+
+def _init_count(event):
+    global count_stop
+    count_stop = event
+
+
+def _count_branch(sudoku, limit):
+    """
+        Count the solutions of one top-level branch, in a worker process.
+            The walk gives up within a few nodes once the stop event is set.
+        Args:
+            sudoku(Board) - The reduced board of the branch.
+            limit(int) - Stop counting at this number of solutions, None for no limit.
+        Returns:
+            The number of solutions found, 0 once stopped.
+    """
+
+    sudoku.budget = Budget(cancelled=count_stop.is_set)
+    try:
+        return sum(1 for _ in itertools.islice(board.explore(sudoku), limit))
+    except OutOfBudget:
+        return 0
+
+
+def count_solutions(grid, limit=None, variant=None, workers=None):
+    """
+        Count the solutions of a grid, stopping as soon as limit is reached.
+            count_solutions(grid, 2) == 1 checks that a puzzle is unique.
+        Args:
+            grid(string) - A grid in string form.
+            limit(int) - Stop counting at this number of solutions, None to count them all.
+            variant(string) - The sudoku variant, see _variant_topology().
+            workers(int) - Count the top-level branches of the search in this many worker
+                processes. Branches still running when limit is reached stop within a few
+                nodes, and the workers are gone on return.
+        Returns:
+            The number of solutions, at most limit.
+    """
+
+    values = grid_values(grid)
+    sudoku = Board.from_values(values, _variant_topology(values, variant))
+
+    if not workers or workers < 2:
+        return sum(1 for _ in itertools.islice(board.solutions(sudoku), limit))
+
+    stop = multiprocessing.Event()
+    executor = ProcessPoolExecutor(workers, initializer=_init_count, initargs=(stop,))
+    try:
+        futures = [executor.submit(_count_branch, branch, limit) for branch in board.branches(sudoku)]
+
+        count = 0
+        for future in as_completed(futures):
+            count += future.result()
+            if limit is not None and count >= limit:
+                return limit
+    finally:
+        # Running branches notice the stop event within a few nodes
+        stop.set()
+        executor.shutdown(cancel_futures=True)
+
+    return count
 
 
 if __name__ == '__main__':
@@ -321,14 +619,25 @@ if __name__ == '__main__':
         '9.1....8.8.5.7..4.2.4....6...7......5..............83.3..6......9................'
     ]
 
+    from cache import SolutionCache
+
+    # Repeated grids, or grids equivalent up to symmetry, are solved once
+    solutions = SolutionCache()
+    trace = TraceRecorder()
+
     for grid in grids:
-        values = solve(grid)
+        misses = solutions.misses
+        values = solutions.solve(grid)
+        if solutions.misses > misses:
+            # The cache searched the canonical form of the grid. The replay is deliberately a
+            # second solve, of the grid as given, so that it shows the boards printed here
+            solve(grid, trace=trace)
         display(values)
         print('\n=====================\n')
 
     try:
         from visualize import visualize_assignments
-        visualize_assignments(assignments)
+        visualize_assignments(trace)
     except SystemExit:
         pass
     except:
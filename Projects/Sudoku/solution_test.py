@@ -1,5 +1,12 @@
+import board
+import itertools
+import multiprocessing
+import pickle
 import solution
+import time
+import topology
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 
 class TestNakedTwins(unittest.TestCase):
@@ -93,5 +100,146 @@ class TestDiagonalSudoku(unittest.TestCase):
     def test_solve(self):
         self.assertEqual(solution.solve(self.diagonal_grid), self.solved_diag_sudoku)
 
+    def test_solve_dlx(self):
+        self.assertEqual(solution.solve(self.diagonal_grid, method='dlx'), self.solved_diag_sudoku)
+        self.assertRaises(ValueError, solution.solve, self.diagonal_grid, method='unknown')
+
+
+class TestTopology(unittest.TestCase):
+    classic_grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+
+    def test_cached_and_immutable(self):
+        self.assertIs(topology.get_topology('diagonal'), topology.DIAGONAL)
+        self.assertEqual(len(topology.get_topology('hyper').unitlist), 31)
+        self.assertRaises(AttributeError, setattr, topology.CLASSIC, 'unitlist', ())
+        self.assertRaises(ValueError, topology.get_topology, 'unknown')
+
+    def test_one_instance_per_variant(self):
+        for variant, size in (('classic', 3), ('diagonal', 3), ('classic', 4)):
+            shared = topology.get_topology(variant, size)
+            self.assertIs(topology.get_topology(variant=variant, size=size), shared)
+            self.assertIs(pickle.loads(pickle.dumps(shared)), shared)
+        self.assertIs(topology.get_topology(), topology.CLASSIC)
+        self.assertIs(topology.get_topology('classic', 3), topology.CLASSIC)
+        self.assertIs(topology.get_topology(size=3), topology.CLASSIC)
+        self.assertIs(pickle.loads(pickle.dumps(topology.DIAGONAL)), topology.DIAGONAL)
+
+    def test_explicit_topology(self):
+        values = solution.grid_values(self.classic_grid)
+        self.assertFalse(solution.search(dict(values), topology.DIAGONAL))
+        self.assertTrue(solution.search(dict(values), topology.CLASSIC))
+
+    def test_variant(self):
+        self.assertFalse(solution.solve(self.classic_grid, variant='diagonal'))
+        self.assertEqual(solution.solve(self.classic_grid, variant='classic'), solution.solve(self.classic_grid))
+        self.assertEqual(solution.solve(TestDiagonalSudoku.diagonal_grid, variant='diagonal'),
+                         TestDiagonalSudoku.solved_diag_sudoku)
+
+    def test_fits_diagonals(self):
+        self.assertTrue(solution.fits_diagonals(solution.grid_values(TestDiagonalSudoku.diagonal_grid)))
+        self.assertFalse(solution.fits_diagonals(solution.grid_values('1' + '.' * 9 + '1' + '.' * 70)))
+
+    def test_dlx_classic(self):
+        self.assertEqual(solution.solve(self.classic_grid, method='dlx'), solution.solve(self.classic_grid))
+        self.assertFalse(solution.solve('33' + '.' * 79, method='dlx'))
+
+    def test_race(self):
+        self.assertEqual(solution.solve(self.classic_grid, race=True), solution.solve(self.classic_grid))
+
+    def test_race_stops_the_loser(self):
+        # Without strategies the diagonal variant is solved at once, the classic one takes minutes
+        grid = '.....6....59.....82....8....45........3........6..3.54...325..6..................'
+        start = time.monotonic()
+        self.assertEqual(solution.solve(grid, race=True, strategies=()), solution.solve(grid, 'diagonal', strategies=()))
+        executor = solution.race_executor
+
+        # The race owns its stop flag until the classic search has stopped too
+        while len(solution.race_slots) < len(solution.race_flags) and time.monotonic() - start < 10:
+            time.sleep(0.01)
+        self.assertEqual(len(solution.race_slots), len(solution.race_flags))
+        self.assertLess(time.monotonic() - start, 10)
+
+        # The next races run in the same workers
+        with ThreadPoolExecutor(4) as threads:
+            results = list(threads.map(lambda _: solution.solve(self.classic_grid, race=True), range(8)))
+        self.assertEqual(results, [solution.solve(self.classic_grid)] * 8)
+        self.assertIs(solution.race_executor, executor)
+
+    def test_threads(self):
+        grids = [self.classic_grid, TestDiagonalSudoku.diagonal_grid] * 4
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(solution.solve, grids))
+        self.assertEqual(results, [solution.solve(grid) for grid in grids])
+
+class TestBoardSizes(unittest.TestCase):
+    small_grid = '1..4..1..1..4..1'
+
+    # A 16x16 pattern solution with every third box left blank
+    solved_grid = ''.join(topology.symbols[(4 * (i // 16 % 4) + i // 64 + i) % 16] for i in range(256))
+    large_grid = ''.join('.' if i % 3 == 0 else d for i, d in enumerate(solved_grid))
+
+    def test_small(self):
+        values = solution.solve(self.small_grid, variant='classic')
+        self.assertEqual(solution.grid_string(values), '1234341221434321')
+
+    def test_large(self):
+        for method in solution.methods:
+            values = solution.solve(self.large_grid, variant='classic', method=method)
+            self.assertEqual(solution.grid_string(values), self.solved_grid)
+
+    def test_tokens(self):
+        tokens = ' '.join('0' if d == '.' else str(topology.symbols.index(d) + 1) for d in self.large_grid)
+        self.assertEqual(solution.grid_values(tokens), solution.grid_values(self.large_grid))
+        self.assertRaises(ValueError, solution.grid_values, '1' * 82)
+
+    def test_tables(self):
+        large = topology.get_topology('classic', 4)
+        self.assertEqual(len(large.boxes), 256)
+        self.assertEqual(len(large.unitlist), 48)
+        self.assertTrue(all(len(peers) == 39 for peers in large.cell_peers))
+        self.assertEqual(large.all_digits, 0xFFFF)
+        self.assertRaises(ValueError, topology.get_topology, 'hyper', 4)
+
+
+class TestCountSolutions(unittest.TestCase):
+    unique_grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+    open_grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1........'
+
+    def test_unique(self):
+        self.assertEqual(solution.count_solutions(self.unique_grid, 2), 1)
+        self.assertEqual(solution.count_solutions('33' + '.' * 79), 0)
+
+    def test_limit(self):
+        self.assertEqual(solution.count_solutions(self.open_grid, 2), 2)
+        self.assertEqual(solution.count_solutions(self.open_grid, 50, workers=2), 50)
+
+    def test_workers(self):
+        grid = TestDiagonalSudoku.diagonal_grid[:-1] + '.'
+        self.assertEqual(solution.count_solutions(grid, variant='diagonal', workers=2),
+                         solution.count_solutions(grid, variant='diagonal'))
+
+    def test_iter_solutions(self):
+        solutions = list(itertools.islice(solution.iter_solutions(self.open_grid), 10))
+        self.assertEqual(len(set(solution.grid_string(values) for values in solutions)), 10)
+        self.assertEqual(solutions[0], solution.solve(self.open_grid))
+        self.assertEqual(list(solution.iter_solutions(TestDiagonalSudoku.diagonal_grid)),
+                         [TestDiagonalSudoku.solved_diag_sudoku])
+
+    def test_stop_running_branches(self):
+        # An empty 16x16 board has more solutions than could ever be counted
+        self.addCleanup(solution._init_count, solution.count_stop)
+        stop = multiprocessing.Event()
+        solution._init_count(stop)
+        branch = board.branches(board.Board(topology.get_topology('classic', 4)))[0]
+
+        stop.set()
+        self.assertEqual(solution._count_branch(branch, None), 0)
+
+        # The branches still running are stopped, not left to the workers
+        start = time.monotonic()
+        self.assertEqual(solution.count_solutions(' '.join('.' * 256), 2, workers=2), 2)
+        self.assertLess(time.monotonic() - start, 10)
+
+
 if __name__ == '__main__':
     unittest.main()
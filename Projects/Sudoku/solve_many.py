@@ -0,0 +1,187 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pipeline
+import solution
+import topology
+
+
+def _init_worker():
+    """
+        Warm up a worker process so its first chunk does not pay for the setup.
+            Importing solution builds the unit and peer tables once per worker,
+            solving a puzzle loads the rest of the solver.
+    """
+
+    solution.solve('2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3')
+
+
+def _solve_chunk(chunk, variant=None):
+    """
+        Solve a chunk of puzzles inside a worker.
+            A malformed grid does not fail the chunk, its error is handed back in its place.
+        Args:
+            chunk(list) - A list of (index, grid) pairs.
+            variant(string) - The sudoku variant, see solution.solve().
+        Returns:
+            A list of (index, solution) pairs, the solution being a grid string, None or the
+            ValueError solution.grid_values() raised.
+    """
+
+    results = []
+    for index, grid in chunk:
+        try:
+            values = solution.solve(grid, variant)
+        except ValueError as e:
+            results.append((index, e))
+            continue
+        results.append((index, solution.grid_string(values) if values else None))
+
+    return results
+
+
+def _chunk_results(future, skip_invalid):
+    """
+        The results of a chunk, raising the error of its first malformed grid unless skip_invalid is set.
+    """
+
+    for index, solved in future.result():
+        if isinstance(solved, ValueError):
+            if not skip_invalid:
+                raise ValueError("Grid %d: %s" % (index, solved))
+            solved = None
+        yield index, solved
+
+
+def chunked(grids, size):
+    """
+        Group grids into numbered chunks.
+        Args:
+            grids(iterable) - Grids in string form.
+            size(int) - The number of grids per chunk.
+        Returns:
+            A generator of lists of (index, grid) pairs.
+    """
+
+    chunk = []
+    for item in enumerate(grids):
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def solve_many(grids, workers=None, chunk_size=64, order='input', variant=None, skip_invalid=False):
+    """
+        Solve grids in a pool of long-lived worker processes.
+            At most two chunks per worker are in flight, so the grids can come from a stream.
+        Args:
+            grids(iterable) - Grids in string form.
+            workers(int) - The number of worker processes, defaults to the number of CPUs.
+            chunk_size(int) - The number of grids sent to a worker at once.
+            order(string) - 'input' yields results in input order, 'completion' as soon as chunks finish.
+            variant(string) - The sudoku variant, see solution.solve().
+            skip_invalid(bool) - Yield None for grids solution.grid_values() rejects instead of raising.
+                Either way the results before a malformed grid are yielded first.
+        Returns:
+            A generator of (index, solution) pairs, the solution being a grid string or None.
+    """
+
+    if order not in ('input', 'completion'):
+        raise ValueError("order must be 'input' or 'completion'")
+
+    workers = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker) as executor:
+
+        pending = deque() if order == 'input' else set()
+
+        for chunk in chunked(grids, chunk_size):
+            if len(pending) >= 2 * workers:
+                if order == 'input':
+                    yield from _chunk_results(pending.popleft(), skip_invalid)
+                else:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from _chunk_results(future, skip_invalid)
+
+            future = executor.submit(_solve_chunk, chunk, variant)
+            if order == 'input':
+                pending.append(future)
+            else:
+                pending.add(future)
+
+        while pending:
+            if order == 'input':
+                yield from _chunk_results(pending.popleft(), skip_invalid)
+            else:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from _chunk_results(future, skip_invalid)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='solve-many',
+                                     description='Solve many sudoku grids in parallel.')
+    parser.add_argument('input', nargs='?', default='-', help='file with the grids, - for stdin')
+    parser.add_argument('-o', '--output', default='-', help='file for the solved grids, - for stdout')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='worker processes, defaults to the CPUs')
+    parser.add_argument('-c', '--chunk-size', type=int, default=64, help='grids sent to a worker at once')
+    parser.add_argument('--format', choices=pipeline.formats, help='defaults to the input file extension')
+    parser.add_argument('--field', help='CSV column or JSON key of the grids')
+    parser.add_argument('--variant', choices=sorted(topology.variants),
+                        help='sudoku variant, by default diagonal is tried before classic')
+    parser.add_argument('--order', choices=('input', 'completion'), default='input',
+                        help='write results in input order, or as soon as they are ready prefixed '
+                             'with the line number of the grid')
+    parser.add_argument('--skip-invalid', action='store_true', help='write no solution for malformed grids')
+    args = parser.parse_args(argv)
+
+    field = int(args.field) if args.field and args.field.isdigit() else args.field
+
+    source = sys.stdin if args.input == '-' else open(args.input, newline='')
+    grids = pipeline.read_puzzles(source, args.format or pipeline.guess_format(args.input), field)
+    target = sys.stdout if args.output == '-' else open(args.output, 'w')
+
+    # The number of boxes of the grids in flight, for the placeholders of the unsolved ones
+    widths = {}
+
+    def measured(grids):
+        for index, grid in enumerate(grids):
+            widths[index] = len(solution.grid_tokens(grid))
+            yield grid
+
+    start = time.perf_counter()
+    count = unsolved = 0
+
+    try:
+        for index, solved in solve_many(measured(grids), args.workers, args.chunk_size, args.order, args.variant,
+                                           args.skip_invalid):
+            count += 1
+            width = widths.pop(index)
+            if solved is None:
+                unsolved += 1
+                solved = '.' * width
+            target.write(solved + '\n' if args.order == 'input' else '%d\t%s\n' % (index, solved))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+    elapsed = time.perf_counter() - start
+    print('Solved %d puzzles (%d without solution) in %.2fs, %.1f puzzles/s'
+          % (count, unsolved, elapsed, count / elapsed if elapsed else 0.0), file=sys.stderr)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
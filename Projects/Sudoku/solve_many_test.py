@@ -0,0 +1,41 @@
+import solve_many
+import solution
+import unittest
+
+
+class TestSolveMany(unittest.TestCase):
+    grids = [
+        '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3',
+        '..3.2.6..9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3..',
+        '33...............................................................................',
+    ] * 3
+
+    def test_input_order(self):
+        results = list(solve_many.solve_many(self.grids, workers=2, chunk_size=2))
+        self.assertEqual([index for index, solved in results], list(range(len(self.grids))))
+        for index, solved in results:
+            values = solution.solve(self.grids[index])
+            self.assertEqual(solved, ''.join(values[box] for box in solution.boxes) if values else None)
+
+    def test_completion_order(self):
+        results = list(solve_many.solve_many(self.grids, workers=2, chunk_size=2, order='completion'))
+        self.assertEqual(sorted(index for index, solved in results), list(range(len(self.grids))))
+
+
+    def test_invalid_grid(self):
+        grids = self.grids[:4] + ['123'] + self.grids[4:]
+        results = dict(solve_many.solve_many(grids, workers=2, chunk_size=2, skip_invalid=True))
+        self.assertEqual(len(results), len(grids))
+        self.assertIsNone(results[4])
+        self.assertEqual(results[5], dict(solve_many.solve_many(self.grids, workers=1))[4])
+
+        # Without skip_invalid the grids before the bad one are still solved
+        results = []
+        with self.assertRaises(ValueError):
+            for result in solve_many.solve_many(grids, workers=2, chunk_size=2):
+                results.append(result)
+        self.assertEqual([index for index, solved in results], [0, 1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import time
+from collections import Counter
+
+from board import popcount
+
+
+class Stats:
+    """
+        Opt-in counters of the work done while solving.
+            For every strategy: the number of calls, the candidates it eliminated, the boxes it
+            solved and its wall time. For the search: the nodes visited, the backtracks and the
+            maximum depth reached. Strategies are 'eliminate', 'only_choice' and 'naked_twins',
+            the strategies of the board pipeline (see board.registry) and 'search' for the digits
+            the search tries.
+            Queue propagation (board.propagate()) counts as one call of 'propagate', which gets its
+            time. While it runs, the rule making each change is kept in rule, so the eliminations and
+            assignments still go to 'eliminate', 'only_choice' and 'naked_twins', without calls or time
+            of their own.
+            Pass a Stats as the stats of solution.solve() or solution.search(), leave it out and
+            nothing is counted.
+    """
+
+    __slots__ = ('calls', 'eliminations', 'assignments', 'time', 'nodes', 'backtracks', 'max_depth',
+                 'callbacks', 'current', 'rule', 'started')
+
+    def __init__(self, callbacks=()):
+        """
+            Args:
+                callbacks(list) - Functions called as callback(stats, event, value), see subscribe().
+        """
+
+        self.calls = Counter()
+        self.eliminations = Counter()
+        self.assignments = Counter()
+        self.time = Counter()
+        self.nodes = 0
+        self.backtracks = 0
+        self.max_depth = 0
+        self.callbacks = list(callbacks)
+        self.current = None
+        self.rule = None
+        self.started = 0.0
+
+    def subscribe(self, callback):
+        """
+            Register a callback for the events of the solver.
+                Events are ('strategy', name) when a strategy returns, ('node', depth) when the search
+                enters a node and ('backtrack', depth) when it abandons one.
+            Args:
+                callback(function) - Called as callback(stats, event, value).
+        """
+
+        self.callbacks.append(callback)
+
+    def emit(self, event, value):
+        for callback in self.callbacks:
+            callback(self, event, value)
+
+    def enter(self, strategy):
+        """
+            Switch the strategy the following changes and time are counted for.
+            Args:
+                strategy(string) - The strategy starting, None when the current one stops.
+        """
+
+        now = time.perf_counter()
+        current = self.current
+        if current is not None:
+            self.time[current] += now - self.started
+            if self.callbacks:
+                self.emit('strategy', current)
+
+        if strategy is not None:
+            self.calls[strategy] += 1
+
+        self.current = strategy
+        self.rule = None
+        self.started = now
+
+    def change(self, old, new):
+        """
+            Count a candidate change of a box for the current propagation rule or strategy.
+            Args:
+                old(int) - The candidate mask before the change.
+                new(int) - The candidate mask after the change.
+        """
+
+        name = self.rule or self.current
+        self.eliminations[name] += popcount(old & ~new)
+        if popcount(new) == 1:
+            self.assignments[name] += 1
+
+    def node(self, depth):
+        self.nodes += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if self.callbacks:
+            self.emit('node', depth)
+
+    def backtrack(self, depth):
+        self.backtracks += 1
+        if self.callbacks:
+            self.emit('backtrack', depth)
+
+    def as_dict(self):
+        """
+            Returns:
+                The counters as a JSON-serializable dictionary.
+        """
+
+        strategies = sorted((set(self.calls) | set(self.eliminations)) - {None})
+        return {
+            'strategies': dict((name, {
+                'calls': self.calls[name],
+                'eliminations': self.eliminations[name],
+                'assignments': self.assignments[name],
+                'time_ms': self.time[name] * 1000,
+            }) for name in strategies),
+            'nodes': self.nodes,
+            'backtracks': self.backtracks,
+            'max_depth': self.max_depth,
+        }
+
+    def report(self):
+        """
+            Returns:
+                The counters as a printable table.
+        """
+
+        summary = self.as_dict()
+        lines = ['%-18s %8s %12s %12s %10s' % ('strategy', 'calls', 'eliminated', 'assigned', 'time ms')]
+        for name, counters in summary['strategies'].items():
+            lines.append('%-18s %8d %12d %12d %10.3f' % (name, counters['calls'], counters['eliminations'],
+                                                        counters['assignments'], counters['time_ms']))
+        lines.append('nodes %d, backtracks %d, max depth %d' % (self.nodes, self.backtracks, self.max_depth))
+
+        return '\n'.join(lines)
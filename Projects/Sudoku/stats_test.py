@@ -0,0 +1,50 @@
+import board
+import solution
+import unittest
+from stats import Stats
+from topology import CLASSIC
+
+
+class TestStats(unittest.TestCase):
+    grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+
+    def test_profile(self):
+        values, stats = solution.profile(self.grid, 'classic', strategies=())
+        self.assertEqual(values, solution.solve(self.grid, 'classic'))
+        self.assertGreater(stats.nodes, 1)
+        self.assertEqual(stats.nodes - 1, stats.calls['search'] - stats.backtracks)
+        self.assertTrue(all(stats.eliminations[name] > 0 for name in ('eliminate', 'only_choice', 'naked_twins')))
+
+        # Propagation is one call, its rules only get the changes they make
+        self.assertEqual(stats.calls['propagate'], stats.calls['search'] + 1)
+        self.assertGreater(stats.time['propagate'], 0)
+        self.assertTrue(all(stats.calls[name] == 0 for name in ('eliminate', 'only_choice', 'naked_twins')))
+
+        # Without backtracks every candidate removed on the way to the solution is counted once
+        givens = sum(1 for d in self.grid if d != '.')
+        self.assertEqual(stats.backtracks, 0)
+        self.assertEqual(sum(stats.eliminations.values()), (81 - givens) * 8)
+        self.assertEqual(sum(stats.assignments.values()), 81 - givens)
+
+    def test_callbacks(self):
+        events = []
+        solution.profile(self.grid, 'classic', [lambda stats, event, value: events.append((event, value))], ())
+        nodes = [value for event, value in events if event == 'node']
+        self.assertEqual(nodes[0], 0)
+        self.assertTrue(('strategy', 'propagate') in events)
+        self.assertFalse(('strategy', 'only_choice') in events)
+
+    def test_sweeps(self):
+        stats = Stats()
+        sudoku = board.Board.from_values(solution.grid_values(self.grid), CLASSIC, stats=stats)
+        board.eliminate(sudoku)
+        board.only_choice(sudoku)
+        self.assertEqual(stats.calls['eliminate'], 1)
+        self.assertEqual(stats.calls['only_choice'], 1)
+        self.assertGreater(stats.eliminations['eliminate'], 0)
+        self.assertIsNone(stats.current)
+        self.assertIn('eliminate', stats.report())
+
+
+if __name__ == '__main__':
+    unittest.main()
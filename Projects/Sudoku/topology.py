@@ -0,0 +1,196 @@
+import functools
+import string
+from types import MappingProxyType
+
+
+def cross(A, B):
+    """
+        Cross product of elements in A and elements in B.
+        Args:
+            A(string) - Left part.
+            B(string) - Right part.
+        Returns:
+            An array with the cross product.
+    """
+
+    return [s + t for s in A for t in B]
+
+
+#####################################################################################
+# Boards of any size
+#
+# A board of size n has n * n rows, columns, squares and digits. Rows are labelled with
+# letters and columns with numbers, so boxes read 'A1' to 'I9' on a 9x9 board and 'A1' to
+# 'P16' on a 16x16 board. Digits are written with one symbol each: 1 to 9 followed by
+# letters, e.g. '123456789ABCDEFG' on a 16x16 board.
+
+symbols = string.digits[1:] + string.ascii_uppercase
+
+sizes = range(2, 6)
+
+
+def labels(size):
+    """
+        Labels of the rows, columns and digits of a board.
+        Args:
+            size(int) - The side of a square of the board, 3 for a 9x9 board.
+        Returns:
+            The row labels, the column labels and the digit symbols.
+    """
+
+    if size not in sizes:
+        raise ValueError("Board size must be between %d and %d" % (sizes[0], sizes[-1]))
+
+    side = size * size
+    return string.ascii_uppercase[:side], [str(i + 1) for i in range(side)], symbols[:side]
+
+
+def standard_units(size):
+    """
+        The row, column and square units of a board.
+        Args:
+            size(int) - The side of a square of the board.
+        Returns:
+            The list of row units, the list of column units and the list of square units.
+    """
+
+    rows, cols, _ = labels(size)
+    row_bands = [rows[i:i + size] for i in range(0, len(rows), size)]
+    col_stacks = [cols[i:i + size] for i in range(0, len(cols), size)]
+
+    return ([cross(r, cols) for r in rows],
+            [cross(rows, [c]) for c in cols],
+            [cross(rs, cs) for rs in row_bands for cs in col_stacks])
+
+
+def diagonal_units_of(size):
+    """
+        The two main diagonals of a board.
+        Args:
+            size(int) - The side of a square of the board.
+        Returns:
+            A list with the two diagonal units.
+    """
+
+    rows, cols, _ = labels(size)
+    return [[rows[i] + cols[i] for i in range(len(rows))],
+            [rows[i] + cols[::-1][i] for i in range(len(rows))]]
+
+
+def hyper_units_of(size):
+    """
+        The extra windows of a hyper (windoku) board, only defined for 9x9 boards.
+        Args:
+            size(int) - The side of a square of the board.
+        Returns:
+            A list with the four window units.
+    """
+
+    if size != 3:
+        raise ValueError("The hyper variant only exists for 9x9 boards")
+
+    return [cross(rs, cs) for rs in ('BCD', 'FGH') for cs in ('234', '678')]
+
+
+# Units added on top of the rows, columns and squares by every variant
+variants = {
+    'classic': lambda size: [],
+    'diagonal': diagonal_units_of,
+    'hyper': hyper_units_of,
+}
+
+
+# The tables of the 9x9 board
+rows, cols, _ = labels(3)
+cols = ''.join(cols)
+
+boxes = cross(rows, cols)
+
+row_units, column_units, square_units = standard_units(3)
+diagonal_units = diagonal_units_of(3)
+hyper_units = hyper_units_of(3)
+
+
+class Topology:
+    """
+        The immutable unit and peer tables of a sudoku variant.
+            String tables (unitlist, units, peers) serve the dictionary form of solution.py,
+            integer tables (cell_units, cell_peers, unit_cells, cell_places) serve board.Board, where
+            boxes are addressed by their position in boxes. Topologies are built once per variant
+            and size by get_topology() and shared freely between threads.
+    """
+
+    __slots__ = ('name', 'size', 'rows', 'cols', 'digits', 'all_digits', 'digit_bits', 'boxes', 'unitlist',
+                 'units', 'peers', 'index', 'unit_cells', 'cell_units', 'cell_peers', 'cell_places')
+
+    def __init__(self, name, size, unitlist):
+        rows, cols, digits = labels(size)
+        boxes = cross(rows, cols)
+        index = dict((box, i) for i, box in enumerate(boxes))
+        unit_cells = tuple(tuple(index[box] for box in unit) for unit in unitlist)
+        cell_units = tuple(tuple(unit for unit in unit_cells if i in unit) for i in range(len(boxes)))
+
+        init = functools.partial(object.__setattr__, self)
+        init('name', name)
+        init('size', size)
+        init('rows', rows)
+        init('cols', tuple(cols))
+        init('digits', digits)
+        init('all_digits', (1 << len(digits)) - 1)
+        init('digit_bits', MappingProxyType(dict((d, 1 << i) for i, d in enumerate(digits))))
+        init('boxes', tuple(boxes))
+        init('unitlist', tuple(tuple(unit) for unit in unitlist))
+        init('units', MappingProxyType(dict((s, tuple(u for u in self.unitlist if s in u)) for s in boxes)))
+        init('peers', MappingProxyType(dict((s, frozenset(b for u in self.units[s] for b in u) - {s}) for s in boxes)))
+        init('index', MappingProxyType(index))
+        init('unit_cells', unit_cells)
+        init('cell_units', cell_units)
+        init('cell_peers', tuple(tuple(sorted(set(sum(cell_units[i], ())) - {i})) for i in range(len(boxes))))
+
+        # For every box and unit of the box: the offset of the unit in a digit place index, where
+        # index[offset + d] holds the positions of the unit that can take the digit d (see
+        # board.Board.places), the bit of the position of the box, and the boxes of the unit
+        init('cell_places', tuple(tuple((u * len(digits), 1 << unit.index(i), unit)
+                                        for u, unit in enumerate(unit_cells) if i in unit)
+                                  for i in range(len(boxes))))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Topology is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Topology is immutable")
+
+    def __repr__(self):
+        return 'Topology(%r, %d)' % (self.name, self.size)
+
+    def __reduce__(self):
+        # Unpickle to the cached instance of the same variant
+        return get_topology, (self.name, self.size)
+
+
+def get_topology(variant='classic', size=3):
+    """
+        Get the topology of a sudoku variant, building it on first use.
+        Args:
+            variant(string) - One of the keys of variants, e.g. 'classic' or 'diagonal'.
+            size(int) - The side of a square of the board, 3 for 9x9, 4 for 16x16, 5 for 25x25.
+        Returns:
+            The shared Topology of the variant.
+    """
+
+    # lru_cache keys on the arguments as passed, get_topology('classic') and
+    # get_topology('classic', 3) must find the same entry
+    return _get_topology(variant, size)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_topology(variant, size):
+    if variant not in variants:
+        raise ValueError("Unknown sudoku variant: %s" % variant)
+
+    row_units, column_units, square_units = standard_units(size)
+    return Topology(variant, size, row_units + column_units + square_units + variants[variant](size))
+
+
+CLASSIC = get_topology('classic')
+DIAGONAL = get_topology('diagonal')
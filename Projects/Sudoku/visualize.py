@@ -1,17 +1,334 @@
-from PySudoku import play
+import argparse
+import functools
+import itertools
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+
+import pygame
+
+import PySudoku
+import solution
+from board import mask_string, popcount
+from PySudoku import play, render_frames
+from recorder import TraceRecorder
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+def filter_assignments(assignments):
+    """ The assignments that solve a box the previous one had not solved, from a list of
+    snapshots or a recorder.TraceRecorder"""
+    if hasattr(assignments, 'snapshots'):
+        assignments = assignments.snapshots()
 
-def visualize_assignments(assignments):
-    """ Visualizes the set of assignments created by the Sudoku AI"""
     last_assignment = None
-    filtered_assignments = []
 
-    for i in range(len(assignments)):
+    for assignment in assignments:
         if last_assignment:
             last_assignment_items = [item for item in last_assignment.items() if len(item[1]) == 1]
-            current_assignment_items = [item for item in assignments[i].items() if len(item[1]) == 1]
+            current_assignment_items = [item for item in assignment.items() if len(item[1]) == 1]
             shared_items = set(last_assignment_items) & set(current_assignment_items)
             if len(shared_items) < len(current_assignment_items):
-                filtered_assignments.append(assignments[i])
-        last_assignment = assignments[i]
+                yield assignment
+        last_assignment = assignment
+
+
+def visualize_assignments(assignments):
+    """ Visualizes the set of assignments created by the Sudoku AI, a list of
+    snapshots or a recorder.TraceRecorder, which is replayed lazily, see Replay"""
+    if hasattr(assignments, 'iter_segments'):
+        play(Replay(assignments))
+    else:
+        play(list(filter_assignments(assignments)))
+
+
+#####################################################################################
+# Trace replay
+#
+# A trace is a list of segments, each a keyframe and the deltas after it. The frames are
+# found in one pass over the deltas, which keeps the step of every frame and nothing else,
+# and any step is rebuilt from the keyframe before it: at most keyframe_interval deltas.
+# Segments spilled to disk are only remembered by their offset and read back when needed.
+
+class Replay:
+    """
+        The frames filter_assignments() keeps from a recorder.TraceRecorder, without a snapshot per step.
+            It is a sequence of sudokus in dictionary form, built on access: replay[i] seeks to frame
+            i, iterating streams the frames in order.
+    """
+
+    def __init__(self, trace, cache_size=8):
+        """
+            Args:
+                trace(TraceRecorder) - The trace, which should not record anything more.
+                cache_size(int) - The number of spilled segments kept in memory once read back.
+        """
+
+        self.trace = trace
+        # A Segment, or the offset of a segment in the spill file
+        self.segments = []
+        self.starts = array('L')
+        self.ends = array('L')
+        self.steps = array('L')
+        self.backtracks = array('L')
+        self._load = functools.lru_cache(maxsize=cache_size)(trace.load_segment)
+        self._index()
+
+    def _index(self):
+        """
+            Find the frames: the steps that solve a box, and show a solved box that was not
+            solved the same way at the previous step solving a box.
+        """
+
+        steps = self.steps
+        cells = None
+        last = None
+        changed = set()
+
+        kept = ((segment, segment) for segment in list(self.trace.segments))
+        for entry, segment in itertools.chain(self.trace.spilled_segments(), kept):
+            self.segments.append(entry)
+            self.starts.append(segment.start)
+            self.ends.append(segment.start + len(segment))
+            self.backtracks.extend(segment.backtracks)
+
+            # A keyframe starting a new search changes the board at once
+            if cells is not None:
+                changed.update(cell for cell, (old, new) in enumerate(zip(cells, segment.cells)) if old != new)
+            cells = array('L', segment.cells)
+
+            deltas = segment.deltas
+            for i in range(0, len(deltas), 3):
+                cell, new = deltas[i], deltas[i + 2]
+                cells[cell] = new
+                changed.add(cell)
+                if popcount(new) != 1:
+                    continue
+
+                if last is None:
+                    last = [m if popcount(m) == 1 else 0 for m in cells]
+                else:
+                    if any(cells[c] != last[c] and popcount(cells[c]) == 1 for c in changed):
+                        steps.append(segment.start + i // 3 + 1)
+                    for c in changed:
+                        last[c] = cells[c] if popcount(cells[c]) == 1 else 0
+                changed.clear()
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __getitem__(self, index):
+        return self.values(self.steps[index])
+
+    def __iter__(self):
+        return self.iter_steps(self.steps)
+
+    def iter_steps(self, steps):
+        """
+            Stream the board at a few steps, with one pass over the segments that hold them.
+            Args:
+                steps(sequence) - Steps of the trace, in increasing order, e.g. some of self.steps.
+            Returns:
+                A generator of sudokus in dictionary form.
+        """
+
+        k = 0
+        for s, end in enumerate(self.ends):
+            if k == len(steps):
+                return
+            if end < steps[k]:
+                continue
+
+            segment = self._get(s)
+            for step, cell, old, new, cells in segment.frames():
+                if step == steps[k]:
+                    yield self._values(segment, cells)
+                    k += 1
+                    if k == len(steps):
+                        return
+
+    def _get(self, s):
+        segment = self.segments[s]
+        return self._load(segment) if isinstance(segment, int) else segment
+
+    def _segment(self, step):
+        # The segment holding the delta of step, the first one for the steps before any delta
+        return self._get(max(bisect_left(self.starts, step) - 1, 0))
+
+    def _values(self, segment, cells):
+        digits = segment.topology.digits
+        return dict(zip(segment.topology.boxes, [mask_string(m, digits) for m in cells]))
+
+    def board(self, step):
+        """
+            Args:
+                step(int) - A step of the trace.
+            Returns:
+                The candidate masks of the board after the step.
+        """
+
+        return self._board(self._segment(step), step)
+
+    def _board(self, segment, step):
+        cells = array('L', segment.cells)
+        deltas = segment.deltas
+        for i in range(0, 3 * min(max(step - segment.start, 0), len(segment)), 3):
+            cells[deltas[i]] = deltas[i + 2]
+        return cells
+
+    def values(self, step):
+        """
+            Args:
+                step(int) - A step of the trace.
+            Returns:
+                The sudoku in dictionary form after the step.
+        """
+
+        segment = self._segment(step)
+        return self._values(segment, self._board(segment, step))
+
+    def frame(self, step):
+        """
+            Returns:
+                The index of the last frame at or before step, -1 if there is none.
+        """
+
+        return bisect_right(self.steps, step) - 1
+
+    def next_backtrack(self, index):
+        """
+            Find the first frame after the next backtrack of the search.
+            Args:
+                index(int) - The index of the current frame.
+            Returns:
+                The index of that frame, or None when the search does not backtrack again.
+        """
+
+        b = bisect_right(self.backtracks, self.steps[index])
+        if b == len(self.backtracks):
+            return None
+
+        following = bisect_left(self.steps, self.backtracks[b])
+        return following if following < len(self.steps) else None
+
+
+#####################################################################################
+# Headless export
+#
+# Frames travel to the worker processes as grid strings, and every worker renders a run
+# of consecutive frames so it only redraws the squares that change between them.
+
+def frame_string(values):
+    return ''.join(values[box] if len(values[box]) == 1 else '.' for box in PySudoku.boxes)
+
+
+def _render_chunk(args):
+    """
+        Render a run of frames in a worker process.
+        Args:
+            args(tuple) - The grid strings, the PNG path pattern or None for GIF frames, the number
+                of the first frame and the background image.
+        Returns:
+            The number of PNG files written, or the list of GIF frames as palette Images.
+    """
+
+    frames, pattern, first, background = args
+
+    if pattern is None:
+        return [Image.frombytes('RGB', PySudoku.size, pygame.image.tobytes(screen, 'RGB')).quantize(64)
+                for screen in render_frames(frames, background)]
+
+    for index, screen in enumerate(render_frames(frames, background), first):
+        pygame.image.save(screen, pattern % index)
+    return len(frames)
+
+
+def export_assignments(assignments, path, stride=1, duration=200, workers=None,
+                       background=PySudoku.background_path):
+    """
+        Render the assignments visualize_assignments() plays to image files, without a window.
+        Args:
+            assignments(list) - A list of snapshots or a recorder.TraceRecorder.
+            path(string) - Either a '.gif' file for an animated GIF, which needs Pillow, or a PNG path
+                pattern with one integer field numbering the frames, e.g. 'frames/step_%05d.png'.
+            stride(int) - Keep one frame in stride, the last frame is always kept.
+            duration(int) - The milliseconds every frame of a GIF is shown.
+            workers(int) - The number of worker processes rendering frames, defaults to the number of CPUs.
+            background(string) - The board image the squares are drawn on.
+        Returns:
+            The number of frames written.
+    """
+
+    gif = path.lower().endswith('.gif')
+    if gif and Image is None:
+        raise ImportError("Exporting a GIF needs Pillow")
+    if not gif and '%' not in path:
+        raise ValueError("A PNG path needs a frame number field, e.g. 'step_%05d.png'")
+
+    if hasattr(assignments, 'iter_segments'):
+        replay = Replay(assignments)
+        kept = replay.iter_steps(replay.steps[:-1][::stride] + replay.steps[-1:])
+    else:
+        assignments = list(filter_assignments(assignments))
+        kept = assignments[:-1][::stride] + assignments[-1:]
+
+    frames = [frame_string(values) for values in kept]
+    if not frames:
+        return 0
+
+    workers = workers or os.cpu_count() or 1
+    length = -(-len(frames) // (4 * workers)) if workers > 1 else len(frames)
+    chunks = [(frames[i:i + length], None if gif else path, i, background) for i in range(0, len(frames), length)]
+
+    if len(chunks) < 2:
+        _write(map(_render_chunk, chunks), path, gif, duration)
+    else:
+        with ProcessPoolExecutor(min(workers, len(chunks))) as executor:
+            _write(executor.map(_render_chunk, chunks), path, gif, duration)
+
+    return len(frames)
+
+
+def _write(results, path, gif, duration):
+    """
+        Collect the rendered chunks, in order, and assemble the GIF. Its frames are handed to
+        Pillow as the chunks come back, rather than gathered in a list first.
+    """
+
+    if not gif:
+        # The workers write the files, wait for them
+        list(results)
+        return
+
+    images = (image for chunk in results for image in chunk)
+    first = next(images)
+    first.save(path, save_all=True, append_images=images, duration=duration, loop=0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='visualize', description='Export the solving of a sudoku as images.')
+    parser.add_argument('grid', help='the sudoku in string form')
+    parser.add_argument('-o', '--output', default='solve.gif',
+                        help="a .gif file or a PNG pattern, e.g. 'step_%%05d.png'")
+    parser.add_argument('--variant', help='sudoku variant, see solution.solve()')
+    parser.add_argument('--stride', type=int, default=1, help='keep one frame in stride')
+    parser.add_argument('--duration', type=int, default=200, help='milliseconds per GIF frame')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='worker processes, defaults to the CPUs')
+    args = parser.parse_args(argv)
+
+    trace = TraceRecorder()
+    solution.solve(args.grid, args.variant, trace=trace)
+    count = export_assignments(trace, args.output, args.stride, args.duration, args.workers)
+    print('Wrote %d frames to %s' % (count, args.output), file=sys.stderr)
+
+    return 0
+
 
-    play(filtered_assignments)
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import os
+import pygame
+import random
+import solution
+import tempfile
+import unittest
+import visualize
+from recorder import TraceRecorder
+
+
+class TestExport(unittest.TestCase):
+    grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.background = os.path.join(self.directory.name, 'board.png')
+        board = pygame.Surface((700, 700))
+        board.fill((230, 230, 230))
+        pygame.image.save(board, self.background)
+
+        self.trace = TraceRecorder()
+        solution.solve(self.grid, trace=self.trace)
+        self.frames = list(visualize.filter_assignments(self.trace))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_png_sequence(self):
+        count = visualize.export_assignments(self.trace, self.path('a_%03d.png'), stride=3, workers=1,
+                                             background=self.background)
+        self.assertEqual(count, len(self.frames[:-1][::3]) + 1)
+        self.assertTrue(os.path.exists(self.path('a_%03d.png' % (count - 1))))
+        self.assertFalse(os.path.exists(self.path('a_%03d.png' % count)))
+
+        # Workers render the same frames
+        self.assertEqual(visualize.export_assignments(self.trace, self.path('b_%03d.png'), stride=3, workers=2,
+                                                      background=self.background), count)
+        # And the snapshots pick the same frames as the trace
+        self.assertEqual(visualize.export_assignments(list(self.trace.snapshots()), self.path('c_%03d.png'), stride=3,
+                                                      workers=1, background=self.background), count)
+        for index in (0, 1, count // 2, count - 1):
+            first = pygame.image.load(self.path('a_%03d.png' % index))
+            for name in ('b_%03d.png', 'c_%03d.png'):
+                second = pygame.image.load(self.path(name % index))
+                self.assertEqual(pygame.image.tobytes(first, 'RGB'), pygame.image.tobytes(second, 'RGB'))
+
+    @unittest.skipIf(visualize.Image is None, "Pillow is not installed")
+    def test_gif(self):
+        path = self.path('solve.gif')
+        count = visualize.export_assignments(self.trace, path, workers=2, background=self.background)
+        self.assertEqual(count, len(self.frames))
+        self.assertEqual(visualize.Image.open(path).n_frames, count)
+
+        count = visualize.export_assignments(self.trace, path, stride=4, workers=1, background=self.background)
+        self.assertEqual(count, len(self.frames[:-1][::4]) + 1)
+        self.assertEqual(visualize.Image.open(path).n_frames, count)
+
+    def test_bad_path(self):
+        self.assertRaises(ValueError, visualize.export_assignments, self.trace, self.path('frame.png'))
+
+
+class TestReplay(unittest.TestCase):
+    # Solved with backtracking, after the diagonal variant failed
+    grid = '9.1....8.8.5.7..4.2.4....6...7......5..............83.3..6......9................'
+
+    def setUp(self):
+        self.trace = TraceRecorder(keyframe_interval=16)
+        solution.solve(self.grid, trace=self.trace)
+        self.replay = visualize.Replay(self.trace)
+        self.frames = list(visualize.filter_assignments(self.trace))
+
+    def test_same_frames(self):
+        self.assertGreater(len(self.trace.segments), 10)
+        self.assertEqual(len(self.replay), len(self.frames))
+        self.assertEqual(list(self.replay), self.frames)
+        self.assertEqual(self.replay[-1], solution.solve(self.grid))
+
+    def test_seek(self):
+        indexes = list(range(len(self.frames)))
+        random.Random(0).shuffle(indexes)
+        for index in indexes[:50]:
+            self.assertEqual(self.replay[index], self.frames[index])
+            self.assertEqual(self.replay.frame(self.replay.steps[index]), index)
+
+        # Any step, not only the frames
+        for step, topology, cells in self.trace.frames():
+            if step % 7 == 0:
+                self.assertEqual(list(self.replay.board(step)), list(cells))
+
+    def test_spilled(self):
+        with tempfile.TemporaryFile() as spill:
+            trace = TraceRecorder(keyframe_interval=16, max_deltas=64, spill=spill)
+            solution.solve(self.grid, trace=trace)
+            replay = visualize.Replay(trace, cache_size=2)
+            self.assertGreater(trace.spilled, 0)
+
+            # Only the offsets of the spilled segments are kept
+            self.assertTrue(any(isinstance(segment, int) for segment in replay.segments))
+            self.assertEqual(list(replay), self.frames)
+            for index in (len(self.frames) - 1, 0, len(self.frames) // 2, 1):
+                self.assertEqual(replay[index], self.frames[index])
+            self.assertEqual(list(replay.steps), list(self.replay.steps))
+            self.assertLessEqual(replay._load.cache_info().currsize, 2)
+
+    def test_next_backtrack(self):
+        backtracks = [step for segment in self.trace.segments for step in segment.backtracks]
+        self.assertTrue(backtracks)
+
+        index = 0
+        while index is not None:
+            following = self.replay.next_backtrack(index)
+            later = [b for b in backtracks if b > self.replay.steps[index]]
+            if following is not None:
+                self.assertGreaterEqual(self.replay.steps[following], later[0])
+                self.assertLess(self.replay.steps[following - 1], later[0])
+            index = following
+
+
+if __name__ == '__main__':
+    unittest.main()